@@ -11,6 +11,25 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 DB_PATH = os.path.join(DATA_DIR, "knowledge_db", "athena.db")
 LOG_DIR = os.path.join(DATA_DIR, "logs")
 
+# Log Rotation (JSONL logs in LOG_DIR; rotated segments are gzip-compressed)
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_ROTATE_INTERVAL_SECONDS = 24 * 3600 # Also start a new segment every day
+LOG_BACKUP_COUNT = 10
+
+# Tracing (core/tracing.py): per-stage latency summaries, exported after every turn
+METRICS_PATH = os.path.join(LOG_DIR, "metrics.prom")
+TRACE_SAMPLES = 1000 # Recent samples per stage used for p50/p95/p99
+# Per-turn cProfile/tracemalloc artifacts written by `python main.py --profile`
+PROFILES_DIR = os.path.join(LOG_DIR, "profiles")
+
+# SQLite Tuning (applied to every connection by modules.database)
+SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",     # Safe with WAL; avoids an fsync per commit
+    "cache_size": -8000,         # Negative = KiB (8 MB page cache)
+    "mmap_size": 64 * 1024 * 1024,
+    "busy_timeout_ms": 5000      # Wait for the other thread's write instead of failing
+}
+
 MODELS_DIR = os.path.join(BASE_DIR, "models")
 BIN_DIR = os.path.join(BASE_DIR, "bin")
 
@@ -44,4 +63,94 @@ PREFERRED_MODELS = [
 PREFERRED_MODEL = PREFERRED_MODELS[0]
 
 # System Settings
-POLL_INTERVAL_SECONDS = 60
+# The Monitor sleeps until the next due task and is woken by scheduler.add_task.
+# It re-syncs its in-memory queue with SQLite every RECONCILE_INTERVAL_SECONDS,
+# loading pending tasks due within the next two intervals.
+RECONCILE_INTERVAL_SECONDS = 300
+# Longest single sleep. Sleeps run on the monotonic clock, which stops while the machine
+# is suspended, so the Monitor wakes at least this often to notice a wall-clock jump.
+MONITOR_MAX_SLEEP_SECONDS = 30
+# Max pending deliveries per channel (notification, speech) before reminders are deferred
+DELIVERY_QUEUE_SIZE = 100
+# A reminder deferred because its channel was full is retried after this many seconds
+DELIVERY_RETRY_SECONDS = 5
+# Reminders due within this many seconds of each other (or piled up after sleep / DND)
+# are delivered as one digest listing at most DIGEST_MAX_ITEMS names plus "+N more".
+DIGEST_WINDOW_SECONDS = 1
+DIGEST_MAX_ITEMS = 5
+# The Monitor starts background reflection once the user has been quiet this long (state IDLE);
+# a new turn cancels it.
+REFLECTION_IDLE_SECONDS = 10 * 60
+
+# Voice
+# One speech worker owns the pyttsx3 engine (see modules/voice.py)
+TTS_RATE = 170   # Words per minute
+TTS_VOLUME = 1.0 # 0-1
+TTS_VOICE = None # pyttsx3 voice id; None = system default
+# Recurring reminders, pre-rendered replies and sentences spoken at least TTS_CACHE_MIN_REPEATS
+# times are cached on disk and played back; everything else is spoken live. Least recently
+# used files are evicted once the cache exceeds TTS_CACHE_MAX_BYTES (0 disables the cache).
+TTS_CACHE_DIR = os.path.join(DATA_DIR, "tts_cache")
+TTS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+TTS_CACHE_MIN_REPEATS = 2
+
+# Turn Budget
+# Hard upper bound for one user turn (NLU + routing + generation).
+# Stages only use what is left; below MIN_LLM_STAGE_SECONDS they skip the LLM and degrade.
+TURN_BUDGET_SECONDS = 20
+MIN_LLM_STAGE_SECONDS = 1.5
+
+# Batch Mode (`python main.py --batch FILE`)
+# Utterances processed in parallel; each worker makes its own LM Studio requests.
+BATCH_CONCURRENCY = 4
+
+# Schedule Answers
+# Schedule data handed to the LLM (or rendered directly) is limited to a date window
+# and at most SCHEDULE_PAGE_SIZE tasks.
+SCHEDULE_PAGE_SIZE = 10
+SCHEDULE_LOOKAHEAD_DAYS = 7
+
+# Calendar Import/Export (modules/calendar_io.py)
+# Bulk imports insert this many events per transaction; exports fetch this many rows at a time.
+IMPORT_BATCH_SIZE = 10000
+
+# Reflection (core/learner.py)
+# Only interactions logged since the last checkpoint are analyzed. Backlogs longer than
+# one chunk are condensed chunk by chunk before the profile update.
+REFLECTION_CHUNK_CHARS = 6000
+REFLECTION_TIMEOUT_SECONDS = 120 # Per LLM call
+# The model returns a patch of the profile; larger patches are rejected as runaway output.
+MAX_PROFILE_PATCH_OPS = 50
+PROFILE_HISTORY_SIZE = 5 # Previous profile versions kept in data/profile_history/
+
+# Knowledge Retrieval (modules/librarian.py)
+# FAISS is over-fetched by KNOWLEDGE_CANDIDATES; chunks at least KNOWLEDGE_DUPLICATE_SIMILARITY
+# (cosine) similar to a better match are dropped, the rest is re-ranked by maximal marginal
+# relevance (KNOWLEDGE_MMR_LAMBDA: 1 = relevance only, 0 = diversity only) and added to the
+# answer prompt until KNOWLEDGE_CONTEXT_TOKENS is spent.
+KNOWLEDGE_CANDIDATES = 20
+KNOWLEDGE_DUPLICATE_SIMILARITY = 0.95
+KNOWLEDGE_MMR_LAMBDA = 0.7
+KNOWLEDGE_CONTEXT_TOKENS = 600
+CHARS_PER_TOKEN = 4 # Rough estimate for budgeting prompt text
+
+# Answer Cache (modules/answer_cache.py)
+# A knowledge question at least ANSWER_CACHE_SIMILARITY (cosine) similar to a cached one,
+# that retrieves the same chunks under the same profile, reuses the cached answer.
+# Questions about the time or date are never cached. 0 entries disables the cache.
+ANSWER_CACHE_SIMILARITY = 0.92
+ANSWER_CACHE_MAX_ENTRIES = 500
+
+# Conversation Memory (modules/memory.py)
+# Every understood exchange is stored in SQLite with a full-text index. Knowledge answers
+# get at most MEMORY_RECALL_LIMIT relevant past exchanges, capped at MEMORY_CONTEXT_CHARS.
+MEMORY_RECALL_LIMIT = 3
+MEMORY_CONTEXT_CHARS = 1500
+# Also embed each exchange for semantic recall (one embedding call per turn).
+# Vector search scans the newest MEMORY_VECTOR_SCAN exchanges.
+MEMORY_EMBEDDINGS = False
+MEMORY_VECTOR_SCAN = 2000
+
+# Startup
+# Budget for `import main` (everything before the LM Studio check). Checked by test/test_startup.py.
+STARTUP_IMPORT_BUDGET_SECONDS = 0.5
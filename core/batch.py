@@ -0,0 +1,168 @@
+"""
+Batch: Non-interactive runs over many utterances (`python main.py --batch FILE`).
+Utterances are read from a file or stdin and run through the normal turn
+(NLU + routing, same turn budget) on a pool of worker threads. Speech, the Monitor
+and the interaction log/memory are left out: a batch is a replay, not a conversation.
+By default it also runs against a scratch copy of the database (scratch_database), so
+replayed reminders never reach the live schedule.
+One JSONL record per utterance is written in input order, with per-stage timings.
+"""
+import contextlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from core import tracing
+from core.logger import log_decision
+from modules import database
+
+# Submitted turns per worker before the reader waits (bounds memory on huge inputs)
+QUEUE_PER_WORKER = 4
+
+
+@contextlib.contextmanager
+def scratch_database():
+    """
+    Points database.DB_PATH at a temporary copy of the live database for the duration
+    (same notes, schedule and history to answer from); the copy is deleted afterwards.
+    Yields the scratch path.
+    """
+    live_path = database.DB_PATH
+    workdir = tempfile.mkdtemp(prefix="athena_batch_")
+    scratch_path = os.path.join(workdir, os.path.basename(live_path))
+    if os.path.exists(live_path):
+        source, target = sqlite3.connect(live_path), sqlite3.connect(scratch_path)
+        try:
+            source.backup(target) # Consistent even while another process writes
+        finally:
+            source.close()
+            target.close()
+    database.DB_PATH = scratch_path
+    log_decision("BATCH", "SCRATCH_DB", "COPY", f"{live_path} -> {scratch_path}")
+    try:
+        yield scratch_path
+    finally:
+        database.close_connection(scratch_path)
+        database.DB_PATH = live_path
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def iter_utterances(lines):
+    """
+    Utterances from text lines: one per line; blank lines and '#' comments are skipped.
+    JSON lines are accepted too ({"text": ...}), so interaction logs can be replayed;
+    records with a role other than "user" are skipped.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+                continue
+            if record.get("role", "user") == "user" and record.get("text"):
+                yield record["text"]
+            continue
+        yield line
+
+
+def _run_one(handle_turn, index, text, run_id):
+    turn_id = f"{run_id}-{index}"
+    start = time.perf_counter()
+    response, understood, error = None, False, None
+    try:
+        response, understood = handle_turn(text, turn_id)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - start
+
+    # Same-named spans (e.g. two embeddings) are summed per stage
+    stages = defaultdict(float)
+    trace = tracing.last_trace()
+    if trace is not None and trace.turn_id == turn_id:
+        for name, _, duration, _ in trace.spans:
+            stages[name] += duration * 1000
+    return {
+        "index": index,
+        "turn_id": turn_id,
+        "input": text,
+        "response": response,
+        "understood": understood,
+        "error": error,
+        "wall_ms": round(wall * 1000, 3),
+        "stages_ms": {name: round(ms, 3) for name, ms in stages.items()},
+    }
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def run_batch(utterances, out, handle_turn, concurrency=1, run_id=None):
+    """
+    Runs every utterance through `handle_turn(text, turn_id) -> (response, understood)`
+    with `concurrency` worker threads, writing one JSON line per utterance to `out`
+    (in input order). Returns a summary dict (see format_summary).
+    """
+    run_id = run_id or time.strftime("batch-%Y%m%d-%H%M%S")
+    concurrency = max(1, concurrency)
+    walls, stages = [], defaultdict(list)
+    counts = {"turns": 0, "understood": 0, "errors": 0}
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        counts["turns"] += 1
+        counts["understood"] += record["understood"]
+        counts["errors"] += record["error"] is not None
+        walls.append(record["wall_ms"])
+        for name, ms in record["stages_ms"].items():
+            stages[name].append(ms)
+
+    log_decision("BATCH", run_id, "START", f"concurrency={concurrency}")
+    start = time.perf_counter()
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="athena-batch") as pool:
+        for index, text in enumerate(utterances):
+            pending.append(pool.submit(_run_one, handle_turn, index, text, run_id))
+            if len(pending) >= concurrency * QUEUE_PER_WORKER:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+    out.flush()
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        **counts,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(counts["turns"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "wall_ms": {f"p{int(q * 100)}": _percentile(walls, q) for q in (0.5, 0.95, 0.99)},
+        "stages_ms": {
+            name: {"count": len(values), "p50": _percentile(values, 0.5), "p95": _percentile(values, 0.95)}
+            for name, values in sorted(stages.items())
+        },
+    }
+    log_decision("BATCH", run_id, "DONE", f"{counts['turns']} turns in {elapsed:.1f}s ({summary['turns_per_second']}/s)")
+    return summary
+
+
+def format_summary(summary):
+    lines = [
+        f"{summary['turns']} turns in {summary['seconds']:.2f}s with {summary['concurrency']} worker(s): "
+        f"{summary['turns_per_second']:.1f} turns/s",
+        f"understood {summary['understood']}, errors {summary['errors']}; "
+        f"turn p50 {summary['wall_ms']['p50']:.1f} ms, p95 {summary['wall_ms']['p95']:.1f} ms, p99 {summary['wall_ms']['p99']:.1f} ms",
+        f"{'stage':<18}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}",
+    ]
+    for name, stats in summary["stages_ms"].items():
+        lines.append(f"{name:<18}{stats['count']:>8}{stats['p50']:>10.1f}{stats['p95']:>10.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,57 @@
+"""
+Turn Deadline: A per-turn time budget shared by every stage of a user turn.
+Each stage asks for the remaining budget instead of using its own fixed timeout,
+and degrades to a cheaper path when there is not enough time left.
+"""
+import time
+
+from config import TURN_BUDGET_SECONDS, MIN_LLM_STAGE_SECONDS
+
+
+class Deadline:
+    """
+    Monotonic deadline. Deadline(None) never expires.
+    Example:
+        deadline = Deadline(20)
+        requests.post(url, json=payload, timeout=deadline.timeout(30))
+    """
+
+    def __init__(self, budget_seconds=TURN_BUDGET_SECONDS):
+        self.budget = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = None if budget_seconds is None else self.started_at + budget_seconds
+
+    def remaining(self):
+        """Seconds left (never negative). None if unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def allows(self, seconds=MIN_LLM_STAGE_SECONDS):
+        """True if at least `seconds` of budget are left (e.g. enough for an LLM call)."""
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+    def timeout(self, cap=None):
+        """Timeout for the next blocking call: the remaining budget, capped at `cap`."""
+        remaining = self.remaining()
+        if remaining is None:
+            return cap
+        if cap is None:
+            return remaining
+        return min(cap, remaining)
+
+    def __repr__(self):
+        remaining = self.remaining()
+        return f"Deadline(remaining={'inf' if remaining is None else f'{remaining:.2f}s'})"
+
+
+def ensure_deadline(deadline):
+    """Callers may omit the deadline; treat that as unbounded."""
+    return deadline if deadline is not None else Deadline(None)
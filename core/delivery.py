@@ -0,0 +1,125 @@
+"""
+Delivery Workers: Hand reminders to the OS off the Monitor thread.
+Each channel (notification, speech) has its own bounded queue and worker, so a
+slow TTS utterance never delays detection or the other channel.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+from modules import actions, voice
+from config import DELIVERY_QUEUE_SIZE
+from core.logger import log_decision, log_error
+
+LATENCY_SAMPLES = 500 # Per channel, for percentile stats
+
+
+class Channel:
+    NOTIFICATION = "notification"
+    SPEECH = "speech"
+
+
+def _deliver_notification(job):
+    actions.send_notification(job["title"], job["message"])
+
+def _deliver_speech(job):
+    # Only queues the utterance; the voice worker speaks it ahead of any chat answer
+    voice.speak(job["message"], priority=voice.Priority.REMINDER, cache=job["cache"])
+
+HANDLERS = {
+    Channel.NOTIFICATION: _deliver_notification,
+    Channel.SPEECH: _deliver_speech,
+}
+
+
+class DeliveryWorkers:
+    """
+    One bounded queue + worker thread per channel.
+    Usage:
+        workers = DeliveryWorkers()
+        workers.start()
+        workers.submit(Channel.SPEECH, message="Reminder: Stretch", due=due_epoch)
+    """
+
+    def __init__(self, maxsize=DELIVERY_QUEUE_SIZE):
+        self.queues = {channel: queue.Queue(maxsize=maxsize) for channel in HANDLERS}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._latencies = {channel: deque(maxlen=LATENCY_SAMPLES) for channel in HANDLERS}
+        self._counts = {channel: {"delivered": 0, "dropped": 0, "failed": 0} for channel in HANDLERS}
+
+    def start(self):
+        for channel in HANDLERS:
+            thread = threading.Thread(target=self._work, args=(channel,), name=f"athena-delivery-{channel}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, channel, message, title=None, due=None, cache=False):
+        """
+        Queues a delivery without blocking. Returns False if the channel is full.
+        `due` (epoch seconds) is used to measure delivery latency; `cache` keeps
+        spoken text in the audio cache (recurring reminders).
+        """
+        job = {"title": title, "message": message, "due": due if due is not None else time.time(), "cache": cache}
+        try:
+            self.queues[channel].put_nowait(job)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._counts[channel]["dropped"] += 1
+            log_error("DELIVERY", f"{channel} queue full, deferring: {message}")
+            return False
+
+    def _work(self, channel):
+        q = self.queues[channel]
+        handler = HANDLERS[channel]
+        while True:
+            job = q.get()
+            if job is None: # Shutdown sentinel
+                q.task_done()
+                return
+            try:
+                handler(job)
+                latency = time.time() - job["due"]
+                with self._lock:
+                    self._counts[channel]["delivered"] += 1
+                    self._latencies[channel].append(latency)
+            except Exception as e:
+                with self._lock:
+                    self._counts[channel]["failed"] += 1
+                log_error("DELIVERY", f"{channel} delivery failed: {e}")
+            finally:
+                q.task_done()
+
+    def flush(self):
+        """Blocks until every queued delivery has been handled."""
+        for q in self.queues.values():
+            q.join()
+
+    def stop(self, timeout=5):
+        """Stops the workers after the queued deliveries. A channel still full after `timeout` is abandoned."""
+        for channel, q in self.queues.items():
+            try:
+                q.put(None, timeout=timeout)
+            except queue.Full:
+                log_error("DELIVERY", f"{channel} queue still full at shutdown, {q.qsize()} deliveries dropped")
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        log_decision("DELIVERY", "SHUTDOWN", "STATS", str(self.stats()))
+
+    def stats(self):
+        """Per-channel counts, queue depth and delivery latency (seconds after due time)."""
+        result = {}
+        with self._lock:
+            for channel in HANDLERS:
+                samples = sorted(self._latencies[channel])
+                result[channel] = {
+                    **self._counts[channel],
+                    "queued": self.queues[channel].qsize(),
+                    "latency_p50": samples[len(samples) // 2] if samples else None,
+                    "latency_p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else None,
+                    "latency_max": samples[-1] if samples else None,
+                }
+        return result
@@ -4,7 +4,10 @@ Core Engine: Handles NLU and Intent Classification using LM Studio.
 import requests
 import json
 import logging
+import re
 from .prompts import SCHEDULER_PROMPT
+from .deadline import ensure_deadline
+from . import tracing
 from config import LM_STUDIO_URL, LM_STUDIO_SETTINGS, PREFERRED_MODELS, PREFERRED_MODEL
 from core.logger import log_decision, log_error
 
@@ -83,10 +86,102 @@ def validate_model_connection():
     except Exception as e:
         log_error("ENGINE", f"Model Validation Failed: {e}")
         return False, None, False
-def process_input(user_text, model_id=None):
+
+def _post_chat(payload, timeout, stage, session=None):
+    """
+    POSTs a chat completion inside a tracing span, records token usage and returns the JSON body.
+    `session` (a requests.Session) is used instead of a one-off connection if given.
+    """
+    with tracing.span(f"llm.{stage}"):
+        response = (session or requests).post(f"{LM_STUDIO_URL}/chat/completions", json=payload, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    tracing.record_tokens(payload.get("model"), data.get("usage"))
+    return data
+
+# Rule-based NLU patterns (used when the LLM fails or the turn is out of budget)
+_REMIND_PATTERN = re.compile(
+    r"remind me(?: to)?\s+(?P<task>.+?)\s+(?P<time>(?:in|at|on|by|tomorrow|tonight|next)\b.*)$",
+    re.IGNORECASE
+)
+_STATE_KEYWORDS = [
+    ("do not disturb", "DO_NOT_DISTURB"),
+    ("dnd", "DO_NOT_DISTURB"),
+    ("deep work", "DEEP_WORK"),
+    ("focus mode", "DEEP_WORK"),
+    ("idle", "IDLE"),
+]
+_SCHEDULE_WORDS = ("schedule", "tasks", "reminders", "meetings", "agenda", "calendar")
+
+def rule_based_intent(user_text):
+    """
+    Cheap keyword/regex intent classifier. Returns an NLU dict or None if nothing matched.
+    """
+    lower_input = user_text.lower()
+
+    if "prefer" in lower_input or "set" in lower_input and "format" in lower_input:
+        log_decision("ENGINE", "FALLBACK", "RULE_MATCH", "Preference Update")
+        return {
+            "intent": "preference_update",
+            "preference_data": user_text, # Just pass the whole text
+            "original_input": user_text
+        }
+
+    for keyword, state in _STATE_KEYWORDS:
+        if re.search(rf"\b{keyword}\b", lower_input):
+            log_decision("ENGINE", "FALLBACK", "RULE_MATCH", f"State Change ({state})")
+            return {"intent": "state_change", "new_state": state, "original_input": user_text}
+
+    match = _REMIND_PATTERN.search(user_text)
+    if match:
+        log_decision("ENGINE", "FALLBACK", "RULE_MATCH", "Schedule Add")
+        return {
+            "intent": "schedule_add",
+            "task_name": match.group("task").strip().capitalize(),
+            "relative_time": match.group("time").strip(),
+            "original_input": user_text
+        }
+
+    if any(word in lower_input for word in _SCHEDULE_WORDS):
+        log_decision("ENGINE", "FALLBACK", "RULE_MATCH", "Query Schedule")
+        return {"intent": "query_schedule", "task_name": None, "relative_time": None, "original_input": user_text}
+
+    return None
+
+def _with_input(result, user_text):
+    """
+    Attaches the original input to a parsed NLU result. Several commands come back as
+    {"intent": "batch", "intents": [...]}; each command keeps the part of the input it came from.
+    """
+    if isinstance(result, list):
+        result = {"intents": result}
+    commands = result.get("intents")
+    if isinstance(commands, list):
+        commands = [command for command in commands if isinstance(command, dict)]
+        for command in commands:
+            command["original_input"] = command.pop("text", None) or user_text
+        if not commands:
+            return {"error": "Failed to parse intent"}
+        if len(commands) == 1:
+            result = commands[0]
+        else:
+            log_decision("ENGINE", "PROCESSING", "MULTI_INTENT", f"{len(commands)} commands")
+            result = {"intent": "batch", "intents": commands}
+    result['original_input'] = user_text
+    return result
+
+def process_input(user_text, model_id=None, deadline=None):
     """
     Sends user text to the LLM and returns structured JSON.
+    Compound inputs are classified in the same call and returned as one "batch" intent.
+    With a `deadline`, the LLM call only gets the remaining turn budget;
+    if that is too small (or the call times out) the rule-based classifier is used.
     """
+    deadline = ensure_deadline(deadline)
+    if not deadline.allows():
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "No budget for NLU, using rule-based intent")
+        return rule_based_intent(user_text) or {"error": "Ran out of time understanding that"}
+
     # Load User Profile
     system_prompt = SCHEDULER_PROMPT
     try:
@@ -106,31 +201,21 @@ def process_input(user_text, model_id=None):
     }
     
     try:
-        response = requests.post(
-            f"{LM_STUDIO_URL}/chat/completions", 
-            json=payload,
-            timeout=LM_STUDIO_SETTINGS["timeout"]
-        )
-        response.raise_for_status()
-        
-        data = response.json()
+        data = _post_chat(payload, deadline.timeout(LM_STUDIO_SETTINGS["timeout"]), "nlu")
         content = data['choices'][0]['message']['content']
         
         # Robust JSON extraction
-        import re
-        
         # 1. Remove <think>...</think> blocks (common in reasoning models)
         clean_content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
         
         # 2. Look for markdown code blocks ```json ... ``` or ``` ... ```
-        match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', clean_content, re.DOTALL)
+        match = re.search(r'```(?:json)?\s*([\{\[].*?[\}\]])\s*```', clean_content, re.DOTALL)
         if match:
             json_str = match.group(1)
             try:
                 result = json.loads(json_str)
                 log_decision("ENGINE", "PROCESSING", "EXTRACT_JSON", "Success (Code Block)")
-                result['original_input'] = user_text
-                return result
+                return _with_input(result, user_text)
             except:
                 pass # Code block content wasn't valid, try fallback
 
@@ -143,8 +228,7 @@ def process_input(user_text, model_id=None):
                 json_str = content[start_index : end_index + 1]
                 result = json.loads(json_str)
                 log_decision("ENGINE", "PROCESSING", "EXTRACT_JSON", "Success (Raw)")
-                result['original_input'] = user_text
-                return result
+                return _with_input(result, user_text)
         except json.JSONDecodeError:
              # Try one more aggressive cleanup: remove everything that looks like a <tag>
              try:
@@ -155,25 +239,30 @@ def process_input(user_text, model_id=None):
                      json_str = cleaner[start : end + 1]
                      result = json.loads(json_str)
                      log_decision("ENGINE", "PROCESSING", "EXTRACT_JSON", "Success (Aggressive)")
-                     result['original_input'] = user_text
-                     return result
+                     return _with_input(result, user_text)
              except:
                  pass
+
+        # 4. A bare list of commands: [{...}, {...}]
+        try:
+            start_index = clean_content.find('[')
+            end_index = clean_content.rfind(']')
+            if start_index != -1 and end_index != -1:
+                result = json.loads(clean_content[start_index : end_index + 1])
+                if isinstance(result, list):
+                    log_decision("ENGINE", "PROCESSING", "EXTRACT_JSON", "Success (List)")
+                    return _with_input(result, user_text)
+        except json.JSONDecodeError:
+            pass
             
         log_error("ENGINE", f"No JSON found in response: {content[:100]}...")
         
         # FALLBACK: Rule-based NLU
-        lower_input = user_text.lower()
-        if "prefer" in lower_input or "set" in lower_input and "format" in lower_input:
-             log_decision("ENGINE", "FALLBACK", "RULE_MATCH", "Preference Update")
-             return {
-                 "intent": "preference_update",
-                 "preference_data": user_text, # Just pass the whole text
-                 "original_input": user_text
-             }
-        
-        return {"error": "Failed to parse intent"}
+        return rule_based_intent(user_text) or {"error": "Failed to parse intent"}
         
+    except requests.Timeout:
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "NLU timed out, using rule-based intent")
+        return rule_based_intent(user_text) or {"error": "Ran out of time understanding that"}
     except requests.RequestException as e:
         log_error("ENGINE", f"LLM API Error: {e}")
         return {"error": "LLM API Unavailable"}
@@ -185,12 +274,28 @@ import datetime
 
 # ... (Previous imports)
 
-def generate_summary(data_block, user_query=""):
+def render_schedule_fallback(data_block):
+    """
+    Templated schedule answer used when there is no budget for an LLM summary.
+    Turns the [DATA START]...[DATA END] block into a plain spoken list.
+    """
+    lines = [line[2:].strip() for line in data_block.splitlines() if line.startswith("- ")]
+    if not lines:
+        return data_block.strip()
+    return "Here is your schedule: " + "; ".join(lines) + "."
+
+def generate_summary(data_block, user_query="", deadline=None):
     """
     Pass 2: Converts raw data block into natural language.
+    Falls back to a templated list if the turn deadline leaves no room for the LLM.
     """
     from .prompts import SUMMARY_TRANSLATOR_PROMPT
     
+    deadline = ensure_deadline(deadline)
+    if not deadline.allows():
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "No budget for summary, using template")
+        return render_schedule_fallback(data_block)
+
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M %p")
     
     prompt = SUMMARY_TRANSLATOR_PROMPT.format(
@@ -211,25 +316,29 @@ def generate_summary(data_block, user_query=""):
     payload["temperature"] = 0.7
     
     try:
-        response = requests.post(f"{LM_STUDIO_URL}/chat/completions", json=payload)
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
+        data = _post_chat(payload, deadline.timeout(LM_STUDIO_SETTINGS["timeout"]), "generation")
+        content = data['choices'][0]['message']['content']
         
         # Remove any <think> blocks if they appear
-        import re
         content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
         
         log_decision("ENGINE", "GENERATION", "SUMMARIZE", "Success")
         return content.strip()
         
+    except requests.Timeout:
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "Summary timed out, using template")
+        return render_schedule_fallback(data_block)
     except Exception as e:
         log_error("ENGINE", f"Summary Generation Error: {e}")
         return "I have the data, but I'm having trouble reading it out loud."
 
-def generate_answer_from_notes(user_question):
+def generate_answer_from_notes(user_question, deadline=None):
     """
     RAG Answer Generation: Reads notes and answers the question.
+    Under a tight turn deadline, retrieval gets the remaining budget and generation
+    is skipped in favour of quoting the best matching note.
     """
+    deadline = ensure_deadline(deadline)
     context = ""
     now = datetime.datetime.now()
     # Pre-calculate common formats for the LLM to pick from or assemble
@@ -254,10 +363,17 @@ def generate_answer_from_notes(user_question):
     # DEBUG: Check what profile is loaded
     # log_decision("ENGINE", "DEBUG", "PROFILE_LOADED", f"Length: {len(profile)}")
 
+    results = []
+    chunk_ids = []
     try:
         from modules import librarian
         librarian.ingest_file("data/notes/athena.txt")
-        results = librarian.query_knowledge(user_question, n_results=3)
+        if deadline.expired():
+            log_decision("ENGINE", "DEADLINE", "DEGRADE", "No budget for retrieval")
+        else:
+            chunks = librarian.search_knowledge(user_question, timeout=deadline.timeout())
+            results = [chunk["content"] for chunk in chunks]
+            chunk_ids = [chunk["id"] for chunk in chunks]
         context = "\n\n".join(results)
         
         if not context:
@@ -267,6 +383,36 @@ def generate_answer_from_notes(user_question):
         log_error("ENGINE", f"Librarian Error: {e}")
         return "I'm having trouble accessing my memory."
 
+    # Past exchanges relevant to this question (bounded; never the whole history)
+    history = ""
+    exchanges = []
+    if not deadline.expired():
+        try:
+            from modules import memory
+            exchanges = memory.recall(user_question, timeout=deadline.timeout())
+            history = memory.format_exchanges(exchanges)
+        except Exception as e:
+            log_error("ENGINE", f"Memory Recall Error: {e}")
+
+    # Semantic answer cache: a similar question answered from the same chunks and the
+    # same past exchanges (never time/date)
+    question_vector = None
+    history_ids = []
+    if chunk_ids:
+        from modules import answer_cache
+        if answer_cache.is_cacheable(user_question):
+            history_ids = answer_cache.history_key_ids(exchanges)
+            # Already embedded for retrieval (librarian keeps recent embeddings)
+            question_vector = librarian.get_embedding(user_question, timeout=deadline.timeout())
+            cached = answer_cache.lookup(question_vector, chunk_ids, profile, history_ids)
+            if cached is not None:
+                log_decision("ENGINE", "GENERATION", "ANSWER_CACHE", "Hit")
+                return cached
+
+    if not deadline.allows():
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "No budget for answer generation")
+        return _quick_answer(results)
+
     prompt = f"""
     You are Project Athena.
     
@@ -284,8 +430,11 @@ def generate_answer_from_notes(user_question):
     Context:
     {context}
     
+    Past Conversations:
+    {history or "None"}
+    
     Instructions:
-    1. Answer the question based on the Context above.
+    1. Answer the question based on the Context above, and the Past Conversations if the question refers to them.
     2. If asked for the time:
        - CHECK 'time_format', 'time_presentation_for_just_time', or 'time_presentation_for_full_time' in User Profile.
        - IF FOUND, use that format string/instruction.
@@ -308,16 +457,25 @@ def generate_answer_from_notes(user_question):
     payload["temperature"] = 0.7
     
     try:
-        response = requests.post(f"{LM_STUDIO_URL}/chat/completions", json=payload)
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
+        data = _post_chat(payload, deadline.timeout(LM_STUDIO_SETTINGS["timeout"]), "generation")
+        content = data['choices'][0]['message']['content']
         
-        import re
-        content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL)
+        content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL).strip()
         
         log_decision("ENGINE", "GENERATION", "ANSWER_QUERY", "Success")
-        return content.strip()
+        if question_vector and content:
+            answer_cache.store(user_question, question_vector, chunk_ids, content, profile, history_ids)
+        return content
         
+    except requests.Timeout:
+        log_decision("ENGINE", "DEADLINE", "DEGRADE", "Answer generation timed out")
+        return _quick_answer(results)
     except Exception as e:
         log_error("ENGINE", f"Answer Generation Error: {e}")
         return "I'm having trouble thinking of an answer right now."
+
+def _quick_answer(results):
+    """Degraded RAG answer: quote the best matching note instead of generating."""
+    if results:
+        return f"From my notes: {results[0]}"
+    return "I couldn't finish looking that up in time."
@@ -1,26 +1,51 @@
 """
 The Hippocampus: Handles Nightly Reflection and Profile Updates.
 Reads interaction logs and updates the user profile with new insights.
+
+The model returns a patch (added / changed / removed keys) rather than the whole
+profile; patches are validated before they are applied, and profile writes are
+atomic with a short version history in data/profile_history/.
+
+Reflection is incremental: a checkpoint records how far into the interaction log
+the last successful update got, so only new conversations are analyzed. Large
+backlogs are summarized chunk by chunk (map) before one profile update (reduce).
 """
+import gzip
 import json
 import os
+import re
+import shutil
+import socket
 import sys
+import threading
+import time
+
 import requests
+import urllib3
 
 # Ensure we can import config.py from parent directory
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import LOG_DIR, LM_STUDIO_URL, LM_STUDIO_SETTINGS
-from core.logger import log_decision, log_error
+from config import (LM_STUDIO_SETTINGS, LOG_BACKUP_COUNT, REFLECTION_CHUNK_CHARS, REFLECTION_TIMEOUT_SECONDS,
+                    PROFILE_HISTORY_SIZE, MAX_PROFILE_PATCH_OPS)
+from core.logger import log_decision, log_error, format_interaction, INTERACTION_LOG
 
 PROFILE_PATH = "data/profile.json"
-INTERACTION_LOG = os.path.join(LOG_DIR, "interaction.log")
+PROFILE_HISTORY_DIR = "data/profile_history"
+CHECKPOINT_PATH = "data/reflection_checkpoint.json"
+
+# Top-level sections a patch may edit inside but never remove
+REQUIRED_PROFILE_KEYS = ("user_name", "communication_style", "active_projects", "learned_preferences")
 
 REFLECTION_PROMPT = """
 Analyze the following interaction log.
-Identify any NEW user preferences or facts.
-Output a JSON object with the updated profile.
-If no updates, return the current profile JSON.
+Identify any NEW user preferences or facts, and any that changed or no longer hold.
+Output a JSON patch for the profile with exactly these keys:
+- "added": {{"path": value}} for new facts
+- "changed": {{"path": value}} for facts whose value changed
+- "removed": ["path"] for facts that no longer hold
+Paths use dots for nested keys, e.g. "learned_preferences.time_format".
+If nothing changed, output {{"added": {{}}, "changed": {{}}, "removed": []}}.
 Input Profile:
 {current_profile}
 
@@ -30,6 +55,18 @@ Log:
 Output JSON ONLY. No thinking. No markdown.
 """
 
+# Map step for large backlogs: shrink each chunk to the facts worth keeping
+CHUNK_NOTES_PROMPT = """
+Read this part of a conversation log between a user and the assistant Athena.
+List any user preferences or personal facts it reveals, one short bullet per fact.
+If there are none, answer "- none".
+
+Log:
+{log_content}
+
+Bullets ONLY. No thinking.
+"""
+
 def load_profile():
     if os.path.exists(PROFILE_PATH):
         with open(PROFILE_PATH, "r") as f:
@@ -37,33 +74,237 @@ def load_profile():
     return {}
 
 def save_profile(profile_data):
-    with open(PROFILE_PATH, "w") as f:
+    """
+    Atomically replaces the profile (temp file + rename). The previous version is
+    kept in PROFILE_HISTORY_DIR; only the newest PROFILE_HISTORY_SIZE are retained.
+    """
+    if os.path.exists(PROFILE_PATH) and PROFILE_HISTORY_SIZE > 0:
+        os.makedirs(PROFILE_HISTORY_DIR, exist_ok=True)
+        backup = os.path.join(PROFILE_HISTORY_DIR, f"profile.{time.time_ns()}.json") # Sorts by age
+        shutil.copy2(PROFILE_PATH, backup)
+        versions = sorted(os.listdir(PROFILE_HISTORY_DIR))
+        for old in versions[:-PROFILE_HISTORY_SIZE]:
+            os.remove(os.path.join(PROFILE_HISTORY_DIR, old))
+
+    tmp_path = PROFILE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(profile_data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, PROFILE_PATH)
+
+# --- Profile patches ---
 
-def reflect():
+def _split_path(path):
+    if not isinstance(path, str) or not path or any(not part for part in path.split(".")):
+        raise ValueError(f"Invalid path: {path!r}")
+    return path.split(".")
+
+def _lookup(profile, parts):
+    """(parent dict, leaf key) for a path, or (None, None) if an intermediate key is missing."""
+    node = profile
+    for part in parts[:-1]:
+        node = node.get(part) if isinstance(node, dict) else None
+        if node is None:
+            return None, None
+    return (node, parts[-1]) if isinstance(node, dict) else (None, None)
+
+def validate_patch(patch, profile):
     """
-    Reads the full interaction log and attempts to update the profile.
+    Checks a reflection patch against the current profile. Returns a list of
+    (op, path parts, value) operations, or raises ValueError.
+    - shape: {"added": {path: value}, "changed": {path: value}, "removed": [path]}
+    - "added" of an existing key is applied as a change (and vice versa)
+    - required top-level sections cannot be removed or replaced by a non-container
+    - removing a missing key is ignored
     """
-    log_decision("LEARNER", "SLEEP_CYCLE", "START", "Beginning reflection")
-    
-    if not os.path.exists(INTERACTION_LOG):
-        log_decision("LEARNER", "SLEEP_CYCLE", "SKIP", "No logs found")
-        return "No interaction log found."
+    if not isinstance(patch, dict) or set(patch) - {"added", "changed", "removed"}:
+        raise ValueError("Patch must be an object with only added / changed / removed")
+    added, changed, removed = patch.get("added") or {}, patch.get("changed") or {}, patch.get("removed") or []
+    if not isinstance(added, dict) or not isinstance(changed, dict) or not isinstance(removed, list):
+        raise ValueError("added/changed must be objects and removed a list")
+    if len(added) + len(changed) + len(removed) > MAX_PROFILE_PATCH_OPS:
+        raise ValueError(f"Patch too large ({len(added) + len(changed) + len(removed)} operations)")
+
+    operations = []
+    for path, value in list(added.items()) + list(changed.items()):
+        parts = _split_path(path)
+        if len(parts) == 1 and parts[0] in REQUIRED_PROFILE_KEYS:
+            current = profile.get(parts[0])
+            if isinstance(current, (dict, list)) and not isinstance(value, type(current)):
+                raise ValueError(f"Cannot replace section '{path}' with a {type(value).__name__}")
+        node = profile
+        for part in parts[:-1]:
+            node = node.get(part) if isinstance(node, dict) else None
+            if node is not None and not isinstance(node, dict):
+                raise ValueError(f"Cannot set '{path}': '{part}' is not an object")
+        operations.append(("set", parts, value))
+    for path in removed:
+        parts = _split_path(path)
+        if len(parts) == 1 and parts[0] in REQUIRED_PROFILE_KEYS:
+            raise ValueError(f"Cannot remove required section '{path}'")
+        parent, key = _lookup(profile, parts)
+        if parent is not None and key in parent:
+            operations.append(("remove", parts, None))
+    return operations
+
+def apply_patch(profile, patch):
+    """Returns (new_profile, changed_paths); `profile` itself is not modified."""
+    operations = validate_patch(patch, profile)
+    result = json.loads(json.dumps(profile)) # Deep copy
+    changed = []
+    for op, parts, value in operations:
+        if op == "remove":
+            parent, key = _lookup(result, parts)
+            del parent[key]
+        else:
+            node = result
+            for part in parts[:-1]:
+                if not isinstance(node.get(part), dict):
+                    node[part] = {}
+                node = node[part]
+            if node.get(parts[-1]) == value:
+                continue
+            node[parts[-1]] = value
+        changed.append(".".join(parts))
+    return result, changed
+
+# --- Checkpoint ---
+# {"head": first line of the log segment we stopped in, "offset": bytes consumed in it,
+#  "timestamp": timestamp of the last record consumed}.
+# The head identifies the segment even after rotation renames it to .1.gz, .2.gz, ...
+# If that segment is gone, the timestamp tells which of the remaining records are new.
+
+def load_checkpoint():
+    try:
+        with open(CHECKPOINT_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"head": None, "offset": 0}
+
+def save_checkpoint(checkpoint):
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
+def _log_segments(log_path):
+    """Existing segments oldest first: name.N.gz ... name.1.gz, name."""
+    segments = [f"{log_path}.{i}.gz" for i in range(LOG_BACKUP_COUNT, 0, -1)]
+    segments.append(log_path)
+    return [path for path in segments if os.path.exists(path)]
+
+def _open_segment(path):
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+def _segment_head(path):
+    """First complete line of a segment (None if it has none yet)."""
+    with _open_segment(path) as f:
+        line = f.readline()
+    return line.rstrip(b"\n").decode("utf-8", "replace") if line.endswith(b"\n") else None
+
+def _head_timestamp(head):
+    try:
+        return json.loads(head).get("timestamp")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+def read_new_interactions(checkpoint, log_path=INTERACTION_LOG):
+    """
+    Returns (records, next_checkpoint): interaction records logged after `checkpoint`.
+    Only complete lines are consumed, so a line being written right now is picked up next time.
+    """
+    segments = _log_segments(log_path)
+    heads = [_segment_head(path) for path in segments]
+
+    # Resume inside the segment we stopped in. If it is gone, skip the segments (and
+    # records) not newer than the checkpoint; on the first run, read everything.
+    start, offset, after = 0, 0, None
+    if checkpoint.get("head") is not None and checkpoint["head"] in heads:
+        start = heads.index(checkpoint["head"])
+        offset = checkpoint.get("offset", 0)
+    elif checkpoint.get("timestamp"):
+        after = checkpoint["timestamp"]
+        # A segment is entirely old if the one after it started no later than the checkpoint
+        while start + 1 < len(segments) and (_head_timestamp(heads[start + 1]) or "") <= after:
+            start += 1
+
+    records = []
+    next_checkpoint = dict(checkpoint)
+    for i in range(start, len(segments)):
+        with _open_segment(segments[i]) as f:
+            data = f.read()
+        begin = offset if i == start else 0
+        end = data.rfind(b"\n") + 1 # Complete lines only
+        for line in data[begin:end].splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if after is not None and record.get("timestamp", "") <= after:
+                continue
+            records.append(record)
+            next_checkpoint["timestamp"] = record.get("timestamp", next_checkpoint.get("timestamp"))
+        if heads[i] is not None:
+            next_checkpoint.update(head=heads[i], offset=max(end, begin))
+    return records, next_checkpoint
 
-    with open(INTERACTION_LOG, "r") as f:
-        log_content = f.read()
+def chunk_lines(lines, max_chars=REFLECTION_CHUNK_CHARS):
+    """Groups transcript lines into chunks of at most max_chars (a longer single line is its own chunk)."""
+    chunks, current, size = [], [], 0
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
 
-    if not log_content.strip():
-        return "Log is empty."
+# --- LLM calls ---
 
-    current_profile = load_profile()
-    
-    # Construct Prompt
-    prompt = REFLECTION_PROMPT.format(
-        current_profile=json.dumps(current_profile, indent=2),
-        log_content=log_content
-    )
+class AbortableSession(requests.Session):
+    """
+    requests session whose in-flight calls can be aborted from another thread:
+    abort() shuts its sockets down, so a blocked call fails at once (and the server
+    sees the client go away) instead of running until its timeout.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.aborted = False
+        self._sockets = set()
+        self._sockets_lock = threading.Lock()
+        session = self
+
+        class Connection(urllib3.connection.HTTPConnection):
+            def connect(self):
+                if session.aborted:
+                    raise ConnectionAbortedError("Session aborted")
+                super().connect()
+                with session._sockets_lock:
+                    session._sockets.add(self.sock)
+
+        class Pool(urllib3.HTTPConnectionPool):
+            ConnectionCls = Connection
 
+        # LM Studio is served over plain HTTP; HTTPS calls are not tracked
+        self.get_adapter("http://").poolmanager.pool_classes_by_scheme = {
+            **urllib3.poolmanager.pool_classes_by_scheme, "http": Pool,
+        }
+
+    def abort(self):
+        self.aborted = True
+        with self._sockets_lock:
+            sockets, self._sockets = self._sockets, set()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass # Already closed
+
+def _chat(prompt, temperature=0.1, session=None):
     from core import engine
 
     payload = {
@@ -75,54 +316,158 @@ def reflect():
         **LM_STUDIO_SETTINGS
     }
     # Force lower temp for reflection
-    payload["temperature"] = 0.1
+    payload["temperature"] = temperature
+    data = engine._post_chat(payload, REFLECTION_TIMEOUT_SECONDS, "reflection", session=session)
+    return data['choices'][0]['message']['content']
+
+def _strip_thinking(content):
+    # Handle unclosed blocks (truncated output) by matching end-of-string '$'
+    content = re.sub(r'<think>.*?(?:</think>|$)', '', content, flags=re.DOTALL | re.IGNORECASE)
+    return re.sub(r'\[THINK\].*?(?:\[/THINK\]|$)', '', content, flags=re.DOTALL | re.IGNORECASE)
+
+def _extract_json(content):
+    """Robust JSON extraction from a model reply. Returns the JSON string or None."""
+    # 1. Try to find markdown JSON block (Best Case) - Check this FIRST
+    # Handles ```json and generic ``` blocks
+    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, flags=re.DOTALL | re.IGNORECASE)
+    if json_match:
+        return json_match.group(1)
+
+    # 2. If no markdown, strip thought blocks to clean up garbage
+    content = _strip_thinking(content)
+
+    # 3. Fallback: Find first '{' and last '}'
+    start = content.find('{')
+    end = content.rfind('}')
+    if start != -1 and end != -1:
+        return content[start : end + 1]
+    return None
+
+def summarize_chunk(log_content, session=None):
+    """Map step: the facts worth keeping from one chunk of the log, as bullets."""
+    notes = _strip_thinking(_chat(CHUNK_NOTES_PROMPT.format(log_content=log_content), session=session)).strip()
+    return "\n".join(line for line in notes.splitlines() if line.strip() and line.strip().lower() != "- none")
+
+class ReflectionCancelled(Exception):
+    pass
+
+def reflect(cancel_event=None, progress=None, session=None):
+    """
+    Analyzes interactions logged since the last checkpoint and updates the profile.
+    The checkpoint only advances after the profile was saved, or past records whose
+    patch was rejected (retrying them would produce the same patch).
+    `cancel_event` (threading.Event) stops the run between LLM calls; LLM calls go
+    through `session` if given (an AbortableSession lets a cancel interrupt them);
+    `progress(done, total, stage)` is called after each step.
+    """
+    def step(done, total, stage):
+        if progress:
+            progress(done, total, stage)
+        if cancel_event is not None and cancel_event.is_set():
+            raise ReflectionCancelled(stage)
+
+    log_decision("LEARNER", "SLEEP_CYCLE", "START", "Beginning reflection")
+
+    checkpoint = load_checkpoint()
+    records, next_checkpoint = read_new_interactions(checkpoint, INTERACTION_LOG)
+    if not records:
+        log_decision("LEARNER", "SLEEP_CYCLE", "SKIP", "No new interactions")
+        return "No new interactions."
+
+    chunks = chunk_lines([format_interaction(record) for record in records], REFLECTION_CHUNK_CHARS)
+    # One LLM call per chunk (map, only if there are several) plus the profile update
+    total = (len(chunks) if len(chunks) > 1 else 0) + 1
 
     try:
-        response = requests.post(f"{LM_STUDIO_URL}/chat/completions", json=payload, timeout=300)
-        response.raise_for_status()
-        content = response.json()['choices'][0]['message']['content']
-        
-        # Robust JSON extraction
-        import re
-        
-        # 1. Try to find markdown JSON block (Best Case) - Check this FIRST
-        # Handles ```json and generic ``` blocks
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', content, flags=re.DOTALL | re.IGNORECASE)
-        
-        if json_match:
-            json_str = json_match.group(1)
+        step(0, total, "start")
+        if len(chunks) == 1:
+            log_content = chunks[0]
         else:
-            # 2. If no markdown, strip thought blocks to clean up garbage
-            # Handle unclosed blocks (truncated output) by matching end-of-string '$'
-            content = re.sub(r'<think>.*?(?:</think>|$)', '', content, flags=re.DOTALL | re.IGNORECASE)
-            content = re.sub(r'\[THINK\].*?(?:\[/THINK\]|$)', '', content, flags=re.DOTALL | re.IGNORECASE)
-            
-            # 3. Fallback: Find first '{' and last '}'
-            start = content.find('{')
-            end = content.rfind('}')
-            if start != -1 and end != -1:
-                json_str = content[start : end + 1]
-            else:
-                log_error("LEARNER", "No JSON found in reflection response")
-                return "Reflection failed (No JSON)."
+            # Map: condense each chunk, then reduce the notes into one profile update
+            notes = []
+            for i, chunk in enumerate(chunks, 1):
+                notes.append(summarize_chunk(chunk, session=session))
+                log_decision("LEARNER", "SLEEP_CYCLE", "MAP", f"Chunk {i}/{len(chunks)} summarized")
+                step(i, total, "map")
+            log_content = "Facts extracted from the conversations:\n" + "\n".join(n for n in notes if n)
 
-        try:
-            new_profile = json.loads(json_str)
-            save_profile(new_profile)
-            log_decision("LEARNER", "SLEEP_CYCLE", "UPDATE", "Profile updated")
-            return "Reflection complete."
-        except json.JSONDecodeError as e:
-            log_error("LEARNER", f"JSON Decode Error in Reflection: {e}")
-            log_error("LEARNER", f"Failed JSON Content: {json_str[:100]}...") 
-            return "Failed to parse reflection JSON."
+        current_profile = load_profile()
 
+        # Construct Prompt
+        prompt = REFLECTION_PROMPT.format(
+            current_profile=json.dumps(current_profile, indent=2),
+            log_content=log_content
+        )
+        content = _chat(prompt, session=session)
+        step(total, total, "update")
+    except ReflectionCancelled as e:
+        log_decision("LEARNER", "SLEEP_CYCLE", "CANCELLED", f"Stopped after {e}; checkpoint unchanged")
+        return "Reflection cancelled."
     except Exception as e:
+        if cancel_event is not None and cancel_event.is_set():
+            # The call was aborted by the cancel
+            log_decision("LEARNER", "SLEEP_CYCLE", "CANCELLED", "Aborted an LLM call; checkpoint unchanged")
+            return "Reflection cancelled."
         log_error("LEARNER", f"Reflection Error: {e}")
         return f"Error during reflection: {e}"
 
-    except Exception as e:
-        log_error("LEARNER", f"Reflection Error: {e}")
-        return f"Error during reflection: {e}"
+    json_str = _extract_json(content)
+    if json_str is None:
+        log_error("LEARNER", "No JSON found in reflection response")
+        return "Reflection failed (No JSON)."
+
+    try:
+        new_profile, changed = apply_patch(current_profile, json.loads(json_str))
+    except json.JSONDecodeError as e:
+        log_error("LEARNER", f"JSON Decode Error in Reflection: {e}")
+        log_error("LEARNER", f"Failed JSON Content: {json_str[:100]}...")
+        return "Failed to parse reflection JSON."
+    except ValueError as e:
+        # The same records would produce the same invalid patch again: move past them
+        log_error("LEARNER", f"Rejected profile patch: {e}")
+        save_checkpoint(next_checkpoint)
+        log_decision("LEARNER", "SLEEP_CYCLE", "SKIP", f"{len(records)} records skipped after a rejected patch")
+        return "Reflection patch rejected."
+
+    if changed:
+        save_profile(new_profile)
+    save_checkpoint(next_checkpoint)
+    log_decision("LEARNER", "SLEEP_CYCLE", "UPDATE",
+                 f"{len(changed)} profile change(s) {changed} from {len(records)} new records in {len(chunks)} chunk(s)")
+    return "Reflection complete."
+
+class ReflectionJob(threading.Thread):
+    """
+    Runs reflect() in the background. cancel() stops it at the next step boundary
+    and aborts an LLM call that is in flight.
+    """
+
+    def __init__(self):
+        super().__init__(name="athena-reflection", daemon=True)
+        self.cancel_event = threading.Event()
+        self.session = AbortableSession()
+        self.progress = 0.0
+        self.stage = "queued"
+        self.result = None
+
+    def run(self):
+        try:
+            self.result = reflect(cancel_event=self.cancel_event, progress=self._on_progress, session=self.session)
+        except Exception as e:
+            log_error("LEARNER", f"Background Reflection Error: {e}")
+            self.result = f"Error during reflection: {e}"
+        finally:
+            self.session.close()
+        self.stage = "done"
+
+    def _on_progress(self, done, total, stage):
+        self.progress = done / total
+        self.stage = stage
+        log_decision("LEARNER", "SLEEP_CYCLE", "PROGRESS", f"{stage} {done}/{total}")
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.session.abort()
 
 if __name__ == "__main__":
     print(reflect())
@@ -1,35 +1,188 @@
 """
 Structured Logger: Provides a rigid format for observability.
 Format: [COMPONENT] STATE -> ACTION: RESULT
+
+Callers only put records on a queue; a background QueueListener does all file and
+console I/O, so logging never adds latency to a turn. Files are JSON lines
+(decision_trace.jsonl, interaction.jsonl), rotated by size and age, with old
+segments gzip-compressed.
 """
+import atexit
+import contextvars
+import gzip
+import json
 import logging
 import os
-from config import LOG_DIR
+import queue
+import shutil
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config import LOG_DIR, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL_SECONDS, LOG_BACKUP_COUNT
+
+DECISION_LOG = os.path.join(LOG_DIR, "decision_trace.jsonl")
+INTERACTION_LOG = os.path.join(LOG_DIR, "interaction.jsonl")
 
 # Ensure log directory exists
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 
-# Configure Main Logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, "decision_trace.log")),
-        logging.StreamHandler()
-    ]
-)
+# Set by main for the duration of a turn; records from other threads carry None
+_turn_id = contextvars.ContextVar("athena_turn_id", default=None)
+
+# Structured fields copied from the record into each JSON line (when present)
+FIELDS = ("component", "state", "action", "result", "role", "text")
+
+
+def set_turn_id(turn_id):
+    """Tags every record logged from this thread/context with `turn_id`."""
+    _turn_id.set(turn_id)
+
+def get_turn_id():
+    return _turn_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, turn id, structured fields, message."""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "turn_id": getattr(record, "turn_id", None),
+        }
+        for field in FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if "text" not in entry:
+            entry["message"] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _gzip_rotator(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class RollingFileHandler(RotatingFileHandler):
+    """
+    Rotates when the file would exceed `max_bytes` or when a new `interval` period
+    (e.g. day) starts. Rotated segments are gzip-compressed: name.1.gz, name.2.gz, ...
+    """
+
+    def __init__(self, filename, max_bytes=LOG_MAX_BYTES, interval=LOG_ROTATE_INTERVAL_SECONDS,
+                 backup_count=LOG_BACKUP_COUNT):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotator
+        mtime = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self._period = self._period_of(mtime)
+
+    def _period_of(self, timestamp):
+        return int(timestamp // self.interval) if self.interval else 0
+
+    def shouldRollover(self, record):
+        if self.interval and self._period_of(record.created) != self._period:
+            self._period = self._period_of(record.created)
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+        return super().shouldRollover(record)
+
+
+class _TurnIdFilter(logging.Filter):
+    """Runs on the calling thread (before enqueueing), so it sees that thread's turn id."""
+
+    def filter(self, record):
+        record.turn_id = _turn_id.get()
+        return True
+
+
+def _is_conversation(record):
+    return record.name == "athena_conversation"
+
+def _is_decision(record):
+    return record.name != "athena_conversation"
+
+
+# Configure Main Logger: everything goes through one unbounded queue
+_log_queue = queue.Queue(-1)
+_queue_handler = QueueHandler(_log_queue)
+_queue_handler.addFilter(_TurnIdFilter())
+
+def _file_handlers():
+    decision = RollingFileHandler(DECISION_LOG)
+    decision.setFormatter(JsonFormatter())
+    decision.addFilter(_is_decision)
+
+    # Configure Conversation Logger
+    # This logger captures the raw dialogue for the Learner ("Hippocampus") to analyze.
+    conversation = RollingFileHandler(INTERACTION_LOG)
+    conversation.setFormatter(JsonFormatter())
+    conversation.addFilter(_is_conversation)
+    return decision, conversation
+
+decision_handler, conv_handler = _file_handlers()
+
+console_handler = logging.StreamHandler()
+console_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+console_handler.addFilter(_is_decision)
+
+_root = logging.getLogger()
+_root.setLevel(logging.INFO)
+_root.addHandler(_queue_handler)
+
+_listener = QueueListener(_log_queue, decision_handler, console_handler, conv_handler)
+_listener.start()
 
 logger = logging.getLogger("athena")
+conversation_logger = logging.getLogger("athena_conversation")
+conversation_logger.setLevel(logging.INFO)
+
+
+def flush_logs():
+    """Blocks until every queued record has been written."""
+    _log_queue.join()
+
+def shutdown_logging():
+    """Drains the queue and stops the listener (also runs at interpreter exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in (decision_handler, console_handler, conv_handler):
+            handler.close()
+
+atexit.register(shutdown_logging)
+
+def configure_log_dir(log_dir):
+    """
+    Moves the JSONL log files to `log_dir` (tests point this at a temporary directory).
+    Queued records are written to the old files first; the listener is restarted on the new ones.
+    """
+    global DECISION_LOG, INTERACTION_LOG, decision_handler, conv_handler, _listener
+    os.makedirs(log_dir, exist_ok=True)
+    if _listener is not None:
+        _listener.stop()
+    decision_handler.close()
+    conv_handler.close()
+    DECISION_LOG = os.path.join(log_dir, "decision_trace.jsonl")
+    INTERACTION_LOG = os.path.join(log_dir, "interaction.jsonl")
+    decision_handler, conv_handler = _file_handlers()
+    _listener = QueueListener(_log_queue, decision_handler, console_handler, conv_handler)
+    _listener.start()
+
 
 def log_decision(component, state, action, result):
     """
     Logs a structured decision trace.
     Example: log_decision("MONITOR", "IDLE", "CHECK_SCHEDULE", "0 Tasks Found")
     """
-    message = f"[{component.upper()}] {state} -> {action}: {result}"
-    logger.info(message)
+    component = component.upper()
+    message = f"[{component}] {state} -> {action}: {result}"
+    logger.info(message, extra={"component": component, "state": state, "action": action, "result": str(result)})
 
 def safe_log(message):
     """
@@ -47,27 +200,35 @@ def safe_log(message):
 
 def log_error(component, error_msg):
     """Logs an error with the component context."""
+    component = component.upper()
     # Use safe logging for errors too, as they might contain weird characters
     try:
-        logger.error(f"[{component.upper()}] ERROR: {error_msg}")
+        logger.error(f"[{component}] ERROR: {error_msg}",
+                     extra={"component": component, "state": "ERROR", "result": str(error_msg)})
     except:
-         logger.error(f"[{component.upper()}] ERROR: {error_msg}".encode('ascii', 'replace').decode('ascii'))
-
-# Configure Conversation Logger
-# This logger captures the raw dialogue for the Learner ("Hippocampus") to analyze.
-conversation_logger = logging.getLogger("athena_conversation")
-conversation_logger.setLevel(logging.INFO)
-conv_handler = logging.FileHandler(os.path.join(LOG_DIR, "interaction.log"), encoding='utf-8')
-conv_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
-conversation_logger.addHandler(conv_handler)
+         logger.error(f"[{component}] ERROR: {error_msg}".encode('ascii', 'replace').decode('ascii'))
 
 def log_interaction(user_text, athena_text):
     """
-    Logs the user input and Athena's response.
-    Format:
-    User: [text]
-    Athena: [text]
+    Logs the user input and Athena's response as two JSON lines:
+    {"role": "user", "text": ...} and {"role": "athena", "text": ...}
     """
-    # Write to file (utf-8 safe)
-    conversation_logger.info(f"User: {user_text}")
-    conversation_logger.info(f"Athena: {athena_text}")
+    conversation_logger.info(f"User: {user_text}", extra={"role": "user", "text": user_text})
+    conversation_logger.info(f"Athena: {athena_text}", extra={"role": "athena", "text": athena_text})
+
+def read_interactions(path=None):
+    """Yields interaction records (dicts) from a JSONL log, skipping malformed lines."""
+    path = path or INTERACTION_LOG
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def format_interaction(record):
+    """'2024-05-01T10:00:00.000 - User: text' (the transcript format the learner prompt expects)."""
+    speaker = "User" if record.get("role") == "user" else "Athena"
+    return f"{record.get('timestamp', '')} - {speaker}: {record.get('text', '')}"
@@ -1,12 +1,19 @@
 """
-Monitor Module ("The Heart"): Background event loop for checking schedules.
+Monitor Module ("The Heart"): Background event loop for firing scheduled reminders.
+Keeps a min-heap of upcoming tasks and sleeps exactly until the next one is due.
+Also starts background reflection when the user has been idle for a while.
 """
+import datetime
+import heapq
 import time
 import threading
 import logging
-from modules import scheduler, actions, voice
-from config import POLL_INTERVAL_SECONDS
+from modules import scheduler, database
+from config import (RECONCILE_INTERVAL_SECONDS, DIGEST_WINDOW_SECONDS, DIGEST_MAX_ITEMS, REFLECTION_IDLE_SECONDS,
+                    MONITOR_MAX_SLEEP_SECONDS, DELIVERY_RETRY_SECONDS)
+from core import learner
 from core.logger import log_decision, log_error
+from core.delivery import DeliveryWorkers, Channel
 
 # logger = logging.getLogger("athena") # Removed in favor of structured logger
 
@@ -18,64 +25,281 @@ class State:
 
 CURRENT_STATE = State.IDLE
 
+# Wall-clock drift over one sleep (beyond the monotonic time slept) treated as suspend/clock change
+CLOCK_JUMP_SECONDS = 5
+
+# Callbacks fired on state changes: callback(old_state, new_state)
+_state_listeners = []
+
+def add_state_listener(callback):
+    if callback not in _state_listeners:
+        _state_listeners.append(callback)
+
+def remove_state_listener(callback):
+    if callback in _state_listeners:
+        _state_listeners.remove(callback)
+
 def set_state(new_state):
     global CURRENT_STATE
     if new_state in [State.IDLE, State.DEEP_WORK, State.DO_NOT_DISTURB]:
         old_state = CURRENT_STATE
         CURRENT_STATE = new_state
         log_decision("MONITOR", "STATE_CHANGE", "UPDATE", f"{old_state} -> {CURRENT_STATE}")
+        for callback in list(_state_listeners):
+            try:
+                callback(old_state, new_state)
+            except Exception as e:
+                log_error("MONITOR", f"State Listener Error: {e}")
         return True
     return False
 
+def build_digest(task_names, max_items=DIGEST_MAX_ITEMS):
+    """
+    Coalesces several reminders into (notification_text, spoken_text).
+    At most `max_items` names are listed, followed by a "+N more" tail.
+    """
+    shown = task_names[:max_items]
+    extra = len(task_names) - len(shown)
+    notification = "\n".join(f"- {name}" for name in shown)
+    spoken = ", ".join(shown)
+    if extra:
+        notification += f"\n+{extra} more"
+        spoken += f", and {extra} more"
+    return notification, f"You have {len(task_names)} reminders: {spoken}."
+
 class Monitor(threading.Thread):
     def __init__(self):
         super().__init__()
         self.daemon = True # Daemon thread dies when main program exits
         self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self._lock = threading.Lock()
+        self._heap = [] # (due_epoch, task_id, task_name)
+        self._queued_ids = set()
+        self._horizon = 0.0 # Tasks due after this epoch are left in SQLite until the next reconcile
+        self._next_reconcile = 0.0
+        self._held = [] # Tasks due during Do Not Disturb, kept pending until the DND digest
+        self.delivery = DeliveryWorkers()
+        self._last_activity = time.time()
+        self._reflected_since_activity = False
+        self.reflection = None # learner.ReflectionJob while one is (or was last) running
+
+    def start(self):
+        self.delivery.start()
+        super().start()
 
     def run(self):
         log_decision("MONITOR", "STARTUP", "INIT", "Heartbeat started")
-        while not self.stop_event.is_set():
-            try:
-                self.check_schedule()
-            except Exception as e:
-                log_error("MONITOR", f"Loop Error: {e}")
-            
-            # Wait for interval or until stopped
-            self.stop_event.wait(POLL_INTERVAL_SECONDS)
+        scheduler.add_task_listener(self.notify_task_added)
+        add_state_listener(self._on_state_change)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    if time.time() >= self._next_reconcile:
+                        self.reconcile()
+                    self.check_schedule()
+                    self.maybe_reflect()
+                except Exception as e:
+                    log_error("MONITOR", f"Loop Error: {e}")
+
+                # Sleep until the next task is due, the next reconcile, or a wake-up
+                self._sleep(min(self._seconds_until_next_event(), MONITOR_MAX_SLEEP_SECONDS))
+        finally:
+            scheduler.remove_task_listener(self.notify_task_added)
+            remove_state_listener(self._on_state_change)
+            self.cancel_reflection("shutdown")
+            self.delivery.stop()
+            database.close_connection()
+
+    def _sleep(self, timeout):
+        """
+        Waits up to `timeout` seconds (or until woken). If the wall clock moved further
+        than the monotonic one (suspend/resume, clock change), re-syncs with SQLite at once.
+        """
+        wall, mono = time.time(), time.monotonic()
+        self.wake_event.wait(timeout)
+        self.wake_event.clear()
+        jump = (time.time() - wall) - (time.monotonic() - mono)
+        if abs(jump) >= CLOCK_JUMP_SECONDS:
+            log_decision("MONITOR", CURRENT_STATE, "CLOCK_JUMP", f"Wall clock moved {jump:+.0f}s, reconciling")
+            self._next_reconcile = 0.0
+
+    def _seconds_until_next_event(self):
+        now = time.time()
+        target = self._next_reconcile
+        with self._lock:
+            if self._heap:
+                target = min(target, self._heap[0][0])
+        if self._waiting_to_reflect():
+            target = min(target, self._last_activity + REFLECTION_IDLE_SECONDS)
+        return max(0.0, target - now)
+
+    def _waiting_to_reflect(self):
+        """
+        True while the idle deadline should wake the loop: IDLE, not yet reflected this
+        idle period and no job still running. Otherwise a passed deadline would busy-spin
+        (e.g. hours of DEEP_WORK); leaving DEEP_WORK / DND re-arms it.
+        """
+        return (not self._reflected_since_activity and CURRENT_STATE == State.IDLE
+                and not (self.reflection is not None and self.reflection.is_alive()))
+
+    def note_user_activity(self):
+        """Called at every user turn: resets the idle timer and cancels a running reflection."""
+        self._last_activity = time.time()
+        self._reflected_since_activity = False
+        self.cancel_reflection("user activity")
+        self.wake_event.set() # Re-arm the idle deadline
+
+    def maybe_reflect(self, now=None):
+        """Starts background reflection once per idle period (state IDLE, quiet for REFLECTION_IDLE_SECONDS)."""
+        now = time.time() if now is None else now
+        if (self._reflected_since_activity or CURRENT_STATE != State.IDLE
+                or now - self._last_activity < REFLECTION_IDLE_SECONDS):
+            return False
+        if self.reflection is not None and self.reflection.is_alive():
+            return False
+        self._reflected_since_activity = True
+        self.reflection = learner.ReflectionJob()
+        self.reflection.start()
+        log_decision("MONITOR", CURRENT_STATE, "REFLECTION_START", f"Idle for {now - self._last_activity:.0f}s")
+        return True
+
+    def cancel_reflection(self, reason):
+        job = self.reflection
+        if job is not None and job.is_alive():
+            job.cancel()
+            log_decision("MONITOR", CURRENT_STATE, "REFLECTION_CANCEL", f"{reason} (at {job.stage}, {job.progress:.0%})")
+
+    def reconcile(self):
+        """Rebuilds the in-memory queue from SQLite (pending tasks due within the horizon)."""
+        now = time.time()
+        horizon = now + 2 * RECONCILE_INTERVAL_SECONDS
+        held_ids = {task['id'] for task in self._held}
+        tasks = [
+            task for task in scheduler.get_pending_tasks(until=datetime.datetime.fromtimestamp(horizon))
+            if task['id'] not in held_ids
+        ]
+
+        with self._lock:
+            self._heap = [(task['time'].timestamp(), task['id'], task['task']) for task in tasks]
+            heapq.heapify(self._heap)
+            self._queued_ids = {task['id'] for task in tasks}
+            self._horizon = horizon
+        self._next_reconcile = now + RECONCILE_INTERVAL_SECONDS
+        log_decision("MONITOR", CURRENT_STATE, "RECONCILE", f"{len(tasks)} Tasks Queued")
+
+    def notify_task_added(self, task_id, task_name, execution_time):
+        """
+        Scheduler callback. Queues the task if it falls inside the horizon and
+        wakes the loop if it is now the earliest one.
+        """
+        due = execution_time.timestamp()
+        with self._lock:
+            if due > self._horizon or task_id in self._queued_ids:
+                return
+            is_earliest = not self._heap or due < self._heap[0][0]
+            heapq.heappush(self._heap, (due, task_id, task_name))
+            self._queued_ids.add(task_id)
+        if is_earliest:
+            self.wake_event.set()
+
+    def _on_state_change(self, old_state, new_state):
+        # Leaving DND releases the held reminders as a digest right away;
+        # back to IDLE re-arms the idle (reflection) deadline
+        if (old_state == State.DO_NOT_DISTURB and self._held) or new_state == State.IDLE:
+            self.wake_event.set()
+
+    def pop_due_tasks(self, now=None):
+        """
+        Removes and returns queued tasks whose time has come.
+        Once one task is due, tasks due within DIGEST_WINDOW_SECONDS are taken
+        along so they can share a digest.
+        """
+        now = time.time() if now is None else now
+        due_tasks = []
+        with self._lock:
+            if not self._heap or self._heap[0][0] > now:
+                return due_tasks
+            while self._heap and self._heap[0][0] <= now + DIGEST_WINDOW_SECONDS:
+                due, task_id, task_name = heapq.heappop(self._heap)
+                self._queued_ids.discard(task_id)
+                due_tasks.append({'id': task_id, 'task': task_name, 'due': due})
+        return due_tasks
 
     def check_schedule(self):
-        """Checks for tasks due now."""
-        # Query tasks
-        due_tasks = scheduler.get_due_tasks()
+        """
+        Fires the queued tasks that are due now.
+        Detection only: deliveries go to the worker queues, and all dispatched
+        tasks are marked complete in one batch. Several tasks due together
+        (e.g. after sleep or when DND ends) are coalesced into one digest.
+        """
+        due_tasks = self.pop_due_tasks()
         
         for task in due_tasks:
-            task_name = task['task']
-            task_id = task['id']
-            
-            log_decision("MONITOR", CURRENT_STATE, "TRIGGER_ATTEMPT", f"Task Due: {task_name}")
-            
-            # State-based logic
-            if CURRENT_STATE == State.DO_NOT_DISTURB:
-                log_decision("MONITOR", CURRENT_STATE, "ACTION_SUPPRESSED", "DND matches, silencing all")
-                # We still mark as complete so it doesn't loop forever? 
-                # Or maybe we shouldn't mark complete? 
-                # For simplicity in this version, we suppress notification but mark complete to avoid pile-up.
-                # Ideally, we should "snooze" it.
-                pass 
-                
-            elif CURRENT_STATE == State.DEEP_WORK:
-                # Soft notify (Log only, maybe visual if we had a GUI)
-                log_decision("MONITOR", CURRENT_STATE, "AUDIO_SUPPRESSED", "Deep Work active")
-                actions.send_notification("Athena (Silent)", f"Missed: {task_name}")
-                
-            else:
-                # IDLE / Normal
-                actions.send_notification("Athena Reminder", task_name)
-                voice.speak(f"Reminder: {task_name}")
-            
-            # Mark complete
-            scheduler.mark_task_complete(task_id)
+            log_decision("MONITOR", CURRENT_STATE, "TRIGGER_ATTEMPT", f"Task Due: {task['task']}")
+        
+        # State-based logic
+        if CURRENT_STATE == State.DO_NOT_DISTURB:
+            if due_tasks:
+                # Hold (still pending in SQLite) until DND ends, then deliver as a digest
+                log_decision("MONITOR", CURRENT_STATE, "ACTION_SUPPRESSED", f"DND active, holding {len(due_tasks)} for digest")
+                self._held.extend(due_tasks)
+            return
+        
+        batch = self._held + due_tasks
+        self._held = []
+        if not batch:
+            return
+        
+        if len(batch) == 1:
+            accepted = self._deliver_single(batch[0])
+        else:
+            accepted = self._deliver_digest(batch)
+        
+        # Mark complete (one transaction for the whole batch)
+        if accepted:
+            scheduler.mark_tasks_complete([task['id'] for task in batch])
+        else:
+            # Queue full: leave them pending and retry shortly
+            self._retry_later(batch)
+            log_decision("MONITOR", CURRENT_STATE, "DELIVERY_DEFERRED", f"{len(batch)} Tasks, retry in {DELIVERY_RETRY_SECONDS}s")
+
+    def _retry_later(self, tasks):
+        retry_at = time.time() + DELIVERY_RETRY_SECONDS
+        with self._lock:
+            for task in tasks:
+                if task['id'] not in self._queued_ids:
+                    heapq.heappush(self._heap, (retry_at, task['id'], task['task']))
+                    self._queued_ids.add(task['id'])
+
+    def _deliver_single(self, task):
+        task_name = task['task']
+        if CURRENT_STATE == State.DEEP_WORK:
+            # Soft notify (Log only, maybe visual if we had a GUI)
+            log_decision("MONITOR", CURRENT_STATE, "AUDIO_SUPPRESSED", "Deep Work active")
+            return self.delivery.submit(Channel.NOTIFICATION, f"Missed: {task_name}", title="Athena (Silent)", due=task['due'])
+        
+        # IDLE / Normal
+        accepted = self.delivery.submit(Channel.NOTIFICATION, task_name, title="Athena Reminder", due=task['due'])
+        if accepted: # Otherwise it is spoken when the retry goes through
+            # Only a recurring reminder will be said again, so only that one is worth caching
+            self.delivery.submit(Channel.SPEECH, f"Reminder: {task_name}", due=task['due'],
+                                 cache=scheduler.is_recurring(task['id']))
+        return accepted
+
+    def _deliver_digest(self, tasks):
+        due = min(task['due'] for task in tasks)
+        notification, spoken = build_digest([task['task'] for task in tasks])
+        log_decision("MONITOR", CURRENT_STATE, "DIGEST", f"{len(tasks)} Tasks coalesced")
+        if CURRENT_STATE == State.DEEP_WORK:
+            log_decision("MONITOR", CURRENT_STATE, "AUDIO_SUPPRESSED", "Deep Work active")
+            return self.delivery.submit(Channel.NOTIFICATION, notification, title=f"Athena (Silent): {len(tasks)} missed", due=due)
+        
+        accepted = self.delivery.submit(Channel.NOTIFICATION, notification, title=f"Athena: {len(tasks)} reminders", due=due)
+        if accepted:
+            self.delivery.submit(Channel.SPEECH, spoken, due=due)
+        return accepted
 
     def stop(self):
         self.stop_event.set()
+        self.wake_event.set()
@@ -0,0 +1,154 @@
+"""
+Profiler: Per-turn CPU, allocation and wall-clock capture for `python main.py --profile`.
+Each profiled turn writes two artifacts to PROFILES_DIR:
+    <turn_id>.pstats  cProfile stats (load with pstats / snakeviz)
+    <turn_id>.json    wall-clock span breakdown and top allocation sites (tracemalloc)
+`python main.py --profile-summary` ranks the hottest functions across all saved turns.
+"""
+import cProfile
+import glob
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from config import BASE_DIR, PROFILES_DIR
+from core import tracing
+from core.logger import log_decision
+
+TOP_ALLOCATIONS = 15
+# Frames kept per allocation (more = slower tracing)
+TRACEMALLOC_FRAMES = 5
+
+
+class TurnProfile:
+    def __init__(self, turn_id):
+        self.turn_id = turn_id
+        self.wall_seconds = None
+        self.stats_path = None
+        self.report_path = None
+
+
+def _safe_name(turn_id):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(turn_id))
+
+
+def _allocation_report(before, after):
+    rows = []
+    for stat in after.compare_to(before, "lineno")[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        rows.append({
+            "location": f"{_short_path(frame.filename)}:{frame.lineno}",
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff,
+        })
+    return rows
+
+
+@contextmanager
+def profile_turn(turn_id, directory=None):
+    """
+    Profiles the enclosed turn. Yields a TurnProfile whose paths are filled in on exit.
+    The wall-clock breakdown comes from the turn's tracing spans (tracing.last_trace()).
+    """
+    directory = directory or PROFILES_DIR
+    os.makedirs(directory, exist_ok=True)
+    result = TurnProfile(turn_id)
+
+    # Only traced while the turn runs: tracemalloc slows every allocation down
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        result.wall_seconds = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+
+        name = _safe_name(turn_id)
+        result.stats_path = os.path.join(directory, f"{name}.pstats")
+        result.report_path = os.path.join(directory, f"{name}.json")
+        profiler.dump_stats(result.stats_path)
+
+        trace = tracing.last_trace()
+        spans = []
+        if trace is not None and trace.turn_id == turn_id:
+            spans = [
+                {"name": span_name, "start_ms": round(offset * 1000, 3), "duration_ms": round(duration * 1000, 3), "depth": depth}
+                for span_name, offset, duration, depth in sorted(trace.spans, key=lambda s: s[1])
+            ]
+        report = {
+            "turn_id": turn_id,
+            "wall_ms": round(result.wall_seconds * 1000, 3),
+            "spans": spans,
+            "memory": {
+                "peak_bytes": peak,
+                "current_bytes": current,
+                "top_allocations": _allocation_report(before, after),
+            },
+        }
+        with open(result.report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        log_decision("PROFILER", turn_id, "SAVED", f"{result.wall_seconds * 1000:.0f} ms -> {result.stats_path}")
+
+
+def _short_path(filename):
+    if filename.startswith(BASE_DIR):
+        return os.path.relpath(filename, BASE_DIR)
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return "/".join(parts[parts.index("site-packages") + 1:])
+    return filename
+
+
+def hottest_functions(directory=None, top=20, sort="tottime", project_only=False):
+    """
+    Aggregates every saved turn in `directory` and returns the top functions as
+    (location, function, calls, tottime, cumtime). `project_only` keeps Athena's own code.
+    """
+    directory = directory or PROFILES_DIR
+    paths = sorted(glob.glob(os.path.join(directory, "*.pstats")))
+    if not paths:
+        return 0, []
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+
+    column = 3 if sort == "tottime" else 4
+    rows = []
+    for (filename, lineno, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if project_only and not filename.startswith(BASE_DIR):
+            continue
+        rows.append((f"{_short_path(filename)}:{lineno}", function, calls, tottime, cumtime))
+    rows.sort(key=lambda row: row[column], reverse=True)
+    return len(paths), rows[:top]
+
+
+def format_summary(directory=None, top=20):
+    """Session summary: hottest functions overall (self time) and in Athena's code (cumulative)."""
+    lines = []
+    for title, sort, project_only in (
+        ("Hottest functions (self time)", "tottime", False),
+        ("Athena code (cumulative time)", "cumtime", True),
+    ):
+        turns, rows = hottest_functions(directory, top, sort, project_only)
+        if not turns:
+            return "No profiles found. Run `python main.py --profile` first."
+        lines.append(f"{title} across {turns} turn(s):")
+        lines.append(f"{'self s':>9}{'cum s':>9}{'calls':>9}  function")
+        for location, function, calls, tottime, cumtime in rows:
+            lines.append(f"{tottime:>9.3f}{cumtime:>9.3f}{calls:>9}  {function} ({location})")
+        lines.append("")
+    return "\n".join(lines).rstrip()
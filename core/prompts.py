@@ -12,6 +12,9 @@ Fields:
 - relative_time: The time expression found in the input. If not applicable, set to null.
 - new_state: For "state_change" intent. Values: "IDLE", "DEEP_WORK", "DO_NOT_DISTURB".
 - preference_data: For "preference_update", the specific preference detail (e.g., "12-hour format").
+- recurrence: For repeating "schedule_add" tasks only: "hourly", "daily", "weekdays", "weekly", "monthly", "every <weekday>", or an RRULE (e.g. "FREQ=WEEKLY;BYDAY=MO,WE"). Otherwise omit it.
+If the input contains SEVERAL commands, output { "intents": [ ... ] } with one object per command, in the order given,
+each with the fields above plus "text": the part of the input it came from.
 
 
 Example 1: "Remind me to call John in 20 minutes"
@@ -31,6 +34,16 @@ Output 5: { "intent": "query_schedule", "task_name": null, "relative_time": null
 
 Example 6: "Always use 12 hour format"
 Output 6: { "intent": "preference_update", "preference_data": "Always use 12 hour format" }
+
+Example 7: "Remind me about stand-up every weekday at 9am"
+Output 7: { "intent": "schedule_add", "task_name": "Stand-up", "relative_time": "9am", "recurrence": "weekdays" }
+
+Example 8: "Remind me to call John at 3pm, email Sara at 4pm and turn on deep work"
+Output 8: { "intents": [
+  { "intent": "schedule_add", "task_name": "Call John", "relative_time": "3pm", "text": "Remind me to call John at 3pm" },
+  { "intent": "schedule_add", "task_name": "Email Sara", "relative_time": "4pm", "text": "email Sara at 4pm" },
+  { "intent": "state_change", "new_state": "DEEP_WORK", "text": "turn on deep work" }
+] }
 """
 
 SUMMARY_TRANSLATOR_PROMPT = """
@@ -2,45 +2,133 @@
 Router Module: Dispatches intents to specific modules.
 """
 import logging
-from modules import scheduler, sanitizer
-from core import monitor
+from modules import scheduler, sanitizer, recurrence as recurrence_rules
+from core import monitor, schedule_answers
+from core.logger import log_decision
 
 logger = logging.getLogger("athena")
 
-def route_intent(data):
+PREFERENCE_ACK = "Got it. I've made a note of your preference."
+
+# Replies that never change; main pre-renders them into the voice cache at startup
+FIXED_RESPONSES = [
+    PREFERENCE_ACK,
+    "Missing task details.",
+    "No state specified.",
+    "You have no upcoming tasks.",
+] + [f"State changed to {state}." for state in (monitor.State.IDLE, monitor.State.DEEP_WORK, monitor.State.DO_NOT_DISTURB)]
+
+def _prepare_schedule(data):
+    """
+    Validates a schedule_add intent and resolves its time.
+    Returns ((task_name, execution_time, recurrence), None) or (None, error reply).
+    """
+    task_name = data.get("task_name")
+    relative_time = data.get("relative_time")
+    
+    # Relaxed Validation: If task_name is missing but we have time, assume "Reminder"
+    if not task_name and relative_time:
+        task_name = "Reminder"
+    
+    if not task_name or not relative_time:
+        return None, "Missing task details."
+        
+    # Sanitize time
+    execution_time = sanitizer.parse_relative_time(relative_time)
+    
+    if not execution_time:
+        return None, f"Could not understand the time: {relative_time}"
+
+    recurrence = data.get("recurrence")
+    if recurrence:
+        try:
+            rule = recurrence_rules.normalize_rule(recurrence)
+        except ValueError:
+            return None, f"Could not understand how often to repeat '{task_name}': {recurrence}"
+        if recurrence_rules.first_occurrence(rule, execution_time) is None:
+            return None, f"'{task_name}' would never repeat: {recurrence} has no future occurrences."
+    return (task_name, execution_time, recurrence), None
+
+def _schedule_phrase(task_name, execution_time, recurrence):
+    """"'Call John' at 15:00" (or "... every weekday at 09:00") for the confirmation reply."""
+    if recurrence:
+        rule = recurrence_rules.normalize_rule(recurrence)
+        return f"'{task_name}' {recurrence_rules.describe(rule)} at {execution_time.strftime('%H:%M')}"
+    return f"'{task_name}' at {execution_time.strftime('%H:%M')}"
+
+def _join(phrases):
+    return phrases[0] if len(phrases) == 1 else f"{', '.join(phrases[:-1])} and {phrases[-1]}"
+
+def route_batch(commands, deadline=None):
+    """
+    Executes several intents from one utterance and returns one combined reply.
+    All schedule inserts happen first, in a single transaction, so later commands
+    in the batch (e.g. "... and what's on today?") already see them.
+    """
+    replies = [None] * len(commands)
+    pending = [] # (index, task)
+    for i, data in enumerate(commands):
+        if data.get("intent") != "schedule_add":
+            continue
+        task, error = _prepare_schedule(data)
+        if error:
+            replies[i] = error
+        else:
+            pending.append((i, task))
+
+    if pending:
+        results = scheduler.add_tasks([task for _, task in pending])
+        saved = [(i, task) for (i, task), ok in zip(pending, results) if ok]
+        for (i, task), ok in zip(pending, results):
+            if not ok:
+                replies[i] = f"Failed to save '{task[0]}' to database."
+        if saved:
+            # One confirmation for every saved reminder, where the first one was asked for
+            replies[saved[0][0]] = f"Saved. I will remind you to {_join([_schedule_phrase(*task) for _, task in saved])}."
+            for i, _ in saved[1:]:
+                replies[i] = ""
+        log_decision("ROUTER", "BATCH", "SCHEDULE_ADD", f"{len(saved)}/{len(pending)} saved in one transaction")
+
+    for i, data in enumerate(commands):
+        if replies[i] is None:
+            replies[i] = route_intent(data, deadline=deadline)
+    return " ".join(reply for reply in replies if reply)
+
+def route_intent(data, deadline=None):
     """
     Routes the NLU output to the correct action.
+    `deadline` is the turn's remaining budget, passed on to any LLM stage.
     """
     intent = data.get("intent")
     
-    if intent == "schedule_add":
-        task_name = data.get("task_name")
-        relative_time = data.get("relative_time")
-        
-        # Relaxed Validation: If task_name is missing but we have time, assume "Reminder"
-        if not task_name and relative_time:
-            task_name = "Reminder"
-        
-        if not task_name or not relative_time:
-            return "Missing task details."
-            
-        # Sanitize time
-        execution_time = sanitizer.parse_relative_time(relative_time)
-        
-        if not execution_time:
-            return f"Could not understand the time: {relative_time}"
+    if intent == "batch":
+        return route_batch(data.get("intents", []), deadline=deadline)
+
+    elif intent == "schedule_add":
+        task, error = _prepare_schedule(data)
+        if error:
+            return error
             
         # Persist
-        success = scheduler.add_task(task_name, execution_time)
+        success = scheduler.add_task(*task)
         
         if success:
-            return f"Saved. I will remind you to '{task_name}' at {execution_time.strftime('%H:%M')}."
+            return f"Saved. I will remind you to {_schedule_phrase(*task)}."
         else:
             return "Failed to save the task to database."
             
     elif intent == "query_schedule":
-        # Pass 1: Fetch rigid data
-        raw_data = scheduler.get_today_summary()
+        user_input = data.get("original_input", "")
+        
+        # Common questions (next, count, today, upcoming...) are answered from a template
+        templated = schedule_answers.answer(user_input)
+        if templated is not None:
+            log_decision("ROUTER", "QUERY_SCHEDULE", "TEMPLATE", "Answered without LLM")
+            return templated
+        
+        # Pass 1: Fetch rigid data (bounded window, paginated)
+        start, end, _ = schedule_answers.resolve_window("context")
+        raw_data = scheduler.get_schedule_summary(start, end)
         
         # Pass 2: Translate via LLM (Reuse engine logic or direct request? 
         # Engine is currently setup for classification. We might need a helper or just call requests here.)
@@ -63,8 +151,7 @@ def route_intent(data):
         # If router imports engine, and engine doesn't import router (it doesn't), we are fine.
         
         # We need a new function in engine for generation, not classification.
-        user_input = data.get("original_input", "")
-        response = engine.generate_summary(raw_data, user_query=user_input)
+        response = engine.generate_summary(raw_data, user_query=user_input, deadline=deadline)
         return response
     
     elif intent == "state_change":
@@ -93,11 +180,11 @@ def route_intent(data):
         
         # Assuming we will fix engine.py, let's write the router logic assuming data['original_input'] exists.
         user_input = data.get("original_input", "")
-        return engine.generate_answer_from_notes(user_input)
+        return engine.generate_answer_from_notes(user_input, deadline=deadline)
 
     elif intent == "preference_update":
         # Just acknowledge it. The learner will pick it up from logs.
-        return "Got it. I've made a note of your preference."
+        return PREFERENCE_ACK
         
     else:
         return f"Unknown intent: {intent}"
\ No newline at end of file
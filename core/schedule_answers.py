@@ -0,0 +1,145 @@
+"""
+Schedule Answers: Deterministic replies to common schedule questions.
+Covers "what's next", "how many", "today", "tomorrow", "this week", "anything
+coming up" and their past-tense forms ("what were my tasks yesterday", "what did I
+have last week") straight from the database, so the LLM summary pass is only needed
+for open-ended phrasing.
+"""
+import re
+from datetime import datetime, timedelta
+
+from modules import scheduler
+from config import SCHEDULE_LOOKAHEAD_DAYS
+
+# Names listed in a spoken answer before "and N more"
+MAX_LISTED = 5
+# Windows that look back: answered in the past tense, completed tasks included
+PAST_WINDOWS = ("yesterday", "past_week")
+
+_NEXT = re.compile(r"\b(what'?s next|what is next|next (task|reminder|meeting|appointment|event|thing|one)|when is my next)\b")
+_COUNT = re.compile(r"\bhow many\b")
+_TOMORROW = re.compile(r"\btomorrow\b")
+_WEEK = re.compile(r"\b(this week|the week|next (few|7|seven) days)\b")
+_TODAY = re.compile(r"\b(today|tonight|this (morning|afternoon|evening))\b")
+_YESTERDAY = re.compile(r"\b(yesterday|last night)\b")
+_PAST_WEEK = re.compile(r"\b(last week|past (week|few days|7 days|seven days))\b")
+_PAST_TENSE = re.compile(r"\b(was|were|did|had|missed)\b")
+_UPCOMING = re.compile(r"\b(upcoming|coming up|any (tasks|reminders|meetings|appointments|events|plans)|anything (on|planned|scheduled)|my (tasks|reminders|schedule|agenda))\b")
+
+
+def classify_question(text):
+    """
+    Returns (kind, window) for a templatable question, or (None, None) if it is open-ended.
+    kind: "next" | "count" | "list";
+    window: "today" | "tomorrow" | "week" | "upcoming" | "yesterday" | "past_week".
+    """
+    lower = (text or "").lower()
+
+    if _YESTERDAY.search(lower):
+        window = "yesterday"
+    elif _PAST_WEEK.search(lower):
+        window = "past_week"
+    elif _TOMORROW.search(lower):
+        window = "tomorrow"
+    elif _WEEK.search(lower):
+        window = "week"
+    elif _TODAY.search(lower):
+        window = "today"
+    elif _UPCOMING.search(lower) or _NEXT.search(lower) or _COUNT.search(lower):
+        window = "upcoming"
+    else:
+        return None, None
+
+    # "What were my tasks?", "What did I have this week?": look back, not ahead
+    if window in ("week", "upcoming") and _PAST_TENSE.search(lower):
+        window = "past_week"
+
+    if _NEXT.search(lower) and window not in PAST_WINDOWS:
+        return "next", "upcoming"
+    if _COUNT.search(lower):
+        return "count", window
+    return "list", window
+
+
+def resolve_window(window, now=None):
+    """(start, end, pending_only) for a named window."""
+    now = now or datetime.now()
+    start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "today":
+        return start_of_day, start_of_day + timedelta(days=1, seconds=-1), False
+    if window == "tomorrow":
+        start = start_of_day + timedelta(days=1)
+        return start, start + timedelta(days=1, seconds=-1), False
+    if window == "week":
+        return now, start_of_day + timedelta(days=SCHEDULE_LOOKAHEAD_DAYS, seconds=-1), True
+    if window == "yesterday":
+        start = start_of_day - timedelta(days=1)
+        return start, start_of_day - timedelta(seconds=1), False
+    if window == "past_week":
+        return now - timedelta(days=7), now, False
+    if window == "context":
+        # Open-ended questions (LLM pass): today so far plus the lookahead, any status
+        return start_of_day, now + timedelta(days=SCHEDULE_LOOKAHEAD_DAYS), False
+    return now, now + timedelta(days=SCHEDULE_LOOKAHEAD_DAYS), True
+
+
+def format_when(when, now=None):
+    now = now or datetime.now()
+    if when.date() == now.date():
+        return f"at {when.strftime('%H:%M')}"
+    if when.date() == (now + timedelta(days=1)).date():
+        return f"tomorrow at {when.strftime('%H:%M')}"
+    if when.date() == (now - timedelta(days=1)).date():
+        return f"yesterday at {when.strftime('%H:%M')}"
+    return f"on {when.strftime('%A %d %b')} at {when.strftime('%H:%M')}"
+
+
+_WINDOW_PHRASES = {
+    "today": "today",
+    "tomorrow": "tomorrow",
+    "week": "this week",
+    "upcoming": "coming up",
+    "yesterday": "yesterday",
+    "past_week": "in the past week",
+}
+
+
+def answer(text, now=None):
+    """
+    Deterministic answer for common schedule questions. Returns None if the
+    question needs the LLM.
+    """
+    kind, window = classify_question(text)
+    if kind is None:
+        return None
+
+    now = now or datetime.now()
+    phrase = _WINDOW_PHRASES[window]
+
+    if kind == "next":
+        # However far ahead it is
+        task = scheduler.get_next_task(now)
+        if task is None:
+            return "You have no upcoming tasks."
+        return f"Your next task is {task['task']} {format_when(task['time'], now)}."
+
+    start, end, pending_only = resolve_window(window, now)
+    tasks, total = scheduler.get_schedule_window(start, end, limit=MAX_LISTED, pending_only=pending_only)
+    verb = "had" if window in PAST_WINDOWS else "have"
+
+    if kind == "count":
+        return f"You {verb} {total} task{'s' if total != 1 else ''} {phrase}."
+
+    if not tasks:
+        return "No, you have no upcoming tasks." if window == "upcoming" else f"You {verb} nothing scheduled {phrase}."
+
+    items = []
+    for task in tasks:
+        item = f"{task['task']} {format_when(task['time'], now)}"
+        if task['status'] != 'pending':
+            item += " (done)"
+        items.append(item)
+    listed = ", ".join(items)
+    if total > len(tasks):
+        listed += f", and {total - len(tasks)} more"
+    return f"You {verb} {total} task{'s' if total != 1 else ''} {phrase}: {listed}."
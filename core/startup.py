@@ -0,0 +1,71 @@
+"""
+Startup Profiler: Per-module import cost and time-to-prompt.
+Used by `python main.py --profile-startup` and the startup budget test.
+"""
+import subprocess
+import sys
+from collections import defaultdict
+
+from config import BASE_DIR, STARTUP_IMPORT_BUDGET_SECONDS
+
+# Must not be imported before the first prompt (loaded on first use instead)
+DEFERRED_MODULES = ["faiss", "numpy", "openai", "pyttsx3", "plyer", "dateparser", "dateutil.rrule"]
+
+
+def profile_imports(entry="main"):
+    """
+    Imports `entry` in a fresh interpreter under `-X importtime`.
+    Returns (rows, loaded) where rows are (module, self_us, cumulative_us, depth)
+    and loaded is the subset of DEFERRED_MODULES that got imported anyway.
+    """
+    probe = (
+        f"import sys; import {entry}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = head.split(":", 1)[1]
+        name = name.rstrip()
+        # importtime indents one space, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    stdout = result.stdout.strip().splitlines()
+    loaded = [m for m in stdout[-1].split(",") if m] if stdout else []
+    return rows, loaded
+
+
+def entry_import_seconds(rows, entry="main"):
+    """Cumulative import time of the entry module itself (excludes interpreter startup)."""
+    for name, _, cumulative_us, depth in rows:
+        if name == entry and depth == 0:
+            return cumulative_us / 1e6
+    return None
+
+
+def format_import_report(rows, loaded, entry="main", top=15):
+    """Per-package self time (top N), the entry's cumulative time and the budget verdict."""
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    lines = [f"{'package':<28}{'self ms':>10}"]
+    for package, self_us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"{package:<28}{self_us / 1000:>10.1f}")
+
+    seconds = entry_import_seconds(rows, entry)
+    lines.append("")
+    if seconds is None:
+        lines.append(f"Could not import '{entry}'.")
+    else:
+        verdict = "OK" if seconds <= STARTUP_IMPORT_BUDGET_SECONDS else "OVER BUDGET"
+        lines.append(f"import {entry}: {seconds * 1000:.0f} ms (budget {STARTUP_IMPORT_BUDGET_SECONDS * 1000:.0f} ms) {verdict}")
+    if loaded:
+        lines.append(f"Loaded eagerly (should be deferred): {', '.join(loaded)}")
+    return "\n".join(lines)
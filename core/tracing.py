@@ -0,0 +1,168 @@
+"""
+Tracing: Lightweight timing spans and metrics.
+Every span feeds a per-stage latency summary (p50/p95/p99). Spans opened during a
+turn (between start_trace and end_trace on the same thread) are also collected into
+that turn's trace, which is written to the decision log. Metrics are exported in
+Prometheus text format to METRICS_PATH (e.g. for node_exporter's textfile collector).
+
+Usage:
+    with tracing.span("nlu"):
+        ...
+
+    @tracing.traced("db.add_task")
+    def add_task(...): ...
+"""
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import METRICS_PATH, TRACE_SAMPLES
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_trace = contextvars.ContextVar("athena_trace", default=None)
+_depth = contextvars.ContextVar("athena_span_depth", default=0)
+_last_trace = contextvars.ContextVar("athena_last_trace", default=None)
+
+_lock = threading.Lock()
+_stages = {}  # stage -> {"samples": deque, "count": int, "sum": float}
+_tokens = {}  # (model, kind) -> int
+
+
+class Trace:
+    """Spans of one turn: (name, start offset, duration, depth) in seconds, in completion order."""
+
+    def __init__(self, turn_id):
+        self.turn_id = turn_id
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def format(self):
+        parts = [f"total={self.total() * 1000:.1f}ms"]
+        for name, _, duration, depth in sorted(self.spans, key=lambda span: span[1]):
+            parts.append(f"{'>' * depth}{name}={duration * 1000:.1f}ms")
+        return " ".join(parts)
+
+
+def _observe(stage, seconds):
+    with _lock:
+        stats = _stages.get(stage)
+        if stats is None:
+            stats = _stages[stage] = {"samples": deque(maxlen=TRACE_SAMPLES), "count": 0, "sum": 0.0}
+        stats["samples"].append(seconds)
+        stats["count"] += 1
+        stats["sum"] += seconds
+
+
+@contextmanager
+def span(name):
+    """Times the enclosed block as stage `name`."""
+    trace = _trace.get()
+    depth = _depth.get()
+    token = _depth.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        _depth.reset(token)
+        _observe(name, duration)
+        if trace is not None:
+            trace.spans.append((name, start - trace.started, duration, depth))
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_tokens(model, usage):
+    """Adds an OpenAI-style `usage` dict (prompt_tokens, completion_tokens) to the per-model counters."""
+    if not usage:
+        return
+    model = model or "unknown"
+    with _lock:
+        for kind in ("prompt", "completion"):
+            count = usage.get(f"{kind}_tokens") or 0
+            _tokens[(model, kind)] = _tokens.get((model, kind), 0) + count
+
+
+def start_trace(turn_id):
+    """Starts collecting spans for this turn (current thread/context)."""
+    trace = Trace(turn_id)
+    _trace.set(trace)
+    return trace
+
+def end_trace():
+    """Stops collecting and returns the turn's Trace (None if none was started)."""
+    trace = _trace.get()
+    _trace.set(None)
+    _last_trace.set(trace)
+    return trace
+
+def last_trace():
+    """The most recently ended Trace in this thread/context (e.g. for the profiler)."""
+    return _last_trace.get()
+
+
+def _percentile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * q))]
+
+def snapshot():
+    """{stage: {count, sum, p50, p95, p99}} and {(model, kind): tokens}."""
+    with _lock:
+        stages = {}
+        for stage, stats in _stages.items():
+            samples = sorted(stats["samples"])
+            stages[stage] = {"count": stats["count"], "sum": stats["sum"]}
+            for q in QUANTILES:
+                stages[stage][f"p{int(q * 100)}"] = _percentile(samples, q)
+        return stages, dict(_tokens)
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _tokens.clear()
+
+
+def format_prometheus():
+    stages, tokens = snapshot()
+    lines = [
+        "# HELP athena_stage_seconds Latency of traced stages.",
+        "# TYPE athena_stage_seconds summary",
+    ]
+    for stage, stats in sorted(stages.items()):
+        for q in QUANTILES:
+            lines.append(f'athena_stage_seconds{{stage="{stage}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'athena_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+        lines.append(f'athena_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines += [
+        "# HELP athena_llm_tokens_total Tokens processed by the LLM, per model.",
+        "# TYPE athena_llm_tokens_total counter",
+    ]
+    for (model, kind), count in sorted(tokens.items()):
+        model = model.replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'athena_llm_tokens_total{{model="{model}",kind="{kind}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+def export_prometheus(path=None):
+    """Writes the metrics file atomically (scrapers never see a partial file)."""
+    path = path or METRICS_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(format_prometheus())
+    os.replace(tmp_path, path)
@@ -1,6 +1,10 @@
 """
 Project Athena: Main Entry Point
 """
+import time
+_PROCESS_START = time.perf_counter() # Time-to-prompt is measured from here
+
+import argparse
 import logging
 import sys
 import os
@@ -8,13 +12,16 @@ import os
 # Ensure we can import core/modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from config import LOG_DIR
-from core import engine, router, monitor, learner
-from modules import scheduler, voice
-from core.logger import log_decision, log_interaction
+from config import LOG_DIR, TURN_BUDGET_SECONDS, BATCH_CONCURRENCY
+from core import engine, router, monitor, tracing
+from core.deadline import Deadline
+from modules import scheduler, voice, memory
+from core.logger import log_decision, log_interaction, set_turn_id
 
 # Logging is setup in core.logger
 
+# How long shutdown waits for the Monitor thread before exiting anyway (it is a daemon)
+MONITOR_JOIN_TIMEOUT_SECONDS = 5
 
 
 def ensure_profile_exists():
@@ -33,7 +40,113 @@ def ensure_profile_exists():
         with open(profile_path, "w") as f:
             json.dump(default_profile, f, indent=2)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Project Athena")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report per-module import cost and time-to-prompt budget, then exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="Save a CPU profile, allocation snapshot and wall-clock breakdown for every turn")
+    parser.add_argument("--profile-summary", action="store_true",
+                        help="Rank the hottest functions across saved turn profiles, then exit")
+    parser.add_argument("--top", type=int, default=20, help="Rows in --profile-summary")
+    parser.add_argument("--import", dest="import_path", metavar="FILE",
+                        help="Bulk-import a calendar (.ics or .csv) into the schedule, then exit")
+    parser.add_argument("--export", dest="export_path", metavar="FILE",
+                        help="Export the schedule to .ics or .csv, then exit")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Run utterances from FILE ('-' for stdin) without speech, write JSONL results, then exit")
+    parser.add_argument("--batch-out", metavar="FILE", default="-",
+                        help="JSONL results for --batch (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="Worker threads for --batch")
+    parser.add_argument("--batch-live-db", action="store_true",
+                        help="Let --batch write to the live database (default: a scratch copy, discarded after the run)")
+    return parser.parse_args(argv)
+
+def profile_startup():
+    from core import startup
+    rows, loaded = startup.profile_imports("main")
+    print(startup.format_import_report(rows, loaded))
+
+def handle_turn(user_input, turn_id):
+    """
+    One user turn: NLU, then routing, under a single turn budget.
+    Returns (response, understood); understood is False if NLU failed.
+    The turn's spans are written to the decision log as one TRACE record.
+    """
+    set_turn_id(turn_id)
+    tracing.start_trace(turn_id)
+    try:
+        # Phase 1: Ingestion & Intent
+        # One budget for the whole turn; every stage uses only what is left.
+        deadline = Deadline(TURN_BUDGET_SECONDS)
+        with tracing.span("nlu"):
+            nlu_data = engine.process_input(user_input, deadline=deadline)
+
+        if "error" in nlu_data:
+            return f"Error - {nlu_data['error']}", False
+
+        log_decision("MAIN", "INPUT_LOOP", "INTENT_DETECTED", str(nlu_data))
+
+        # Phase 2 & 3: Sanitization & Persistence
+        with tracing.span("route"):
+            response = router.route_intent(nlu_data, deadline=deadline)
+        return response, True
+    finally:
+        trace = tracing.end_trace()
+        log_decision("TRACE", turn_id, "SPANS", trace.format())
+
+def run_batch_mode(args):
+    """
+    --batch: every utterance goes through handle_turn; results as JSONL, summary on stderr.
+    Runs on a scratch copy of the database unless --batch-live-db is given.
+    """
+    import contextlib
+    from core import batch
+    ensure_profile_exists()
+    is_valid, model_id, _ = engine.validate_model_connection()
+    if not is_valid:
+        print("ERROR: Could not connect to LM Studio or no models loaded.", file=sys.stderr)
+        sys.exit(1)
+    store = "live database" if args.batch_live_db else "scratch copy of the database"
+    print(f"Batch run on {model_id} with {args.concurrency} worker(s), {store}...", file=sys.stderr)
+
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    out = sys.stdout if args.batch_out == "-" else open(args.batch_out, "w", encoding="utf-8")
+    try:
+        with contextlib.nullcontext() if args.batch_live_db else batch.scratch_database():
+            scheduler.init_db()
+            summary = batch.run_batch(batch.iter_utterances(source), out, handle_turn, concurrency=args.concurrency)
+    finally:
+        for stream in (source, out):
+            if stream not in (sys.stdin, sys.stdout):
+                stream.close()
+        tracing.export_prometheus()
+    print(batch.format_summary(summary), file=sys.stderr)
+
 def main():
+    args = parse_args()
+    if args.profile_startup:
+        profile_startup()
+        return
+    if args.profile_summary:
+        from core import profiler
+        print(profiler.format_summary(top=args.top))
+        return
+    if args.batch:
+        run_batch_mode(args)
+        return
+    if args.import_path or args.export_path:
+        from modules import calendar_io
+        scheduler.init_db()
+        if args.import_path:
+            start = time.perf_counter()
+            imported, skipped = calendar_io.import_file(args.import_path)
+            print(f"Imported {imported} tasks ({skipped} skipped) in {time.perf_counter() - start:.1f}s.")
+        if args.export_path:
+            print(f"Exported {calendar_io.export_file(args.export_path)} tasks to {args.export_path}.")
+        return
+
     print("Initializing Athena...")
     ensure_profile_exists()
     
@@ -42,6 +155,7 @@ def main():
 
     # Validate Brain
     print("Checking connection to Brain...")
+    local_startup = time.perf_counter() - _PROCESS_START
     is_valid, model_id, is_fallback = engine.validate_model_connection()
     
     if not is_valid:
@@ -55,9 +169,16 @@ def main():
     heart = monitor.Monitor()
     heart.start()
     
+    log_decision("MAIN", "STARTUP", "TIME_TO_PROMPT",
+                 f"{time.perf_counter() - _PROCESS_START:.2f}s total, {local_startup:.2f}s before LM Studio check")
+
+    # Warm the speech cache in the background (fixed replies + recurring reminders)
+    voice.prerender(router.FIXED_RESPONSES + [f"Reminder: {t['task']}" for t in scheduler.get_recurring_tasks()])
+
     print("Athena is online. Type 'exit' to quit.")
     print("Try: 'Remind me to call John in 20 minutes'")
     
+    turn_number = 0
     try:
         while True:
             user_input = input("You: ").strip()
@@ -67,35 +188,41 @@ def main():
                 
             if not user_input:
                 continue
-                
-            # Phase 1: Ingestion & Intent
+
+            # One id per turn: tags its log records and its trace
+            turn_number += 1
             print("Thinking...")
-            nlu_data = engine.process_input(user_input)
-            
-            if "error" in nlu_data:
-                print(f"Athena: Error - {nlu_data['error']}")
+            heart.note_user_activity()
+            turn_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{turn_number}"
+            if args.profile:
+                from core import profiler
+                with profiler.profile_turn(turn_id):
+                    response, understood = handle_turn(user_input, turn_id)
+            else:
+                response, understood = handle_turn(user_input, turn_id)
+            print(f"Athena: {response}")
+            if not understood:
                 continue
-                
-            log_decision("MAIN", "INPUT_LOOP", "INTENT_DETECTED", str(nlu_data))
-            
-            # Phase 2 & 3: Sanitization & Persistence
-            response = router.route_intent(nlu_data)
             
-            # Output: Console + Voice (Clean)
-            print(f"Athena: {response}")
+            # Output: Voice (Clean)
             voice.speak(response)
             
             # Log interaction (includes timestamp in file, but not spoken)
             log_interaction(user_input, response)
+            memory.remember(user_input, response, turn_id=turn_id)
+            tracing.export_prometheus()
             
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
-        print("Reflecting on today's interactions...")
-        learner.reflect()
-        
+        # Reflection runs in the background while idle; its checkpoint is saved after
+        # every successful update, so shutdown just cancels an unfinished run.
         heart.stop()
-        heart.join()
+        heart.join(MONITOR_JOIN_TIMEOUT_SECONDS)
+        if heart.is_alive():
+            log_decision("MAIN", "SHUTDOWN", "MONITOR_JOIN", f"Monitor still busy after {MONITOR_JOIN_TIMEOUT_SECONDS}s, not waiting")
+        voice.shutdown()
+        tracing.export_prometheus()
         print("Athena Offline.")
 
 if __name__ == "__main__":
@@ -1,7 +1,6 @@
 """
 Actions Module: Executes OS-level actions like notifications.
 """
-from plyer import notification
 import logging
 
 logger = logging.getLogger("athena")
@@ -9,6 +8,7 @@ logger = logging.getLogger("athena")
 def send_notification(title, message):
     """Sends a desktop notification."""
     try:
+        from plyer import notification # Imported on first use to keep startup fast
         notification.notify(
             title=title,
             message=message,
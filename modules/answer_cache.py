@@ -0,0 +1,158 @@
+"""
+Answer Cache Module: Semantic cache for knowledge answers.
+Each entry keeps the question embedding, the ids of the knowledge chunks the answer
+was generated from, the ids of the past exchanges recalled into its prompt, and the
+answer. A new question reuses an answer when it is similar enough
+(ANSWER_CACHE_SIMILARITY) AND retrieval returned the same chunks and the same past
+exchanges under the same profile, so a changed note, preference or relevant
+conversation never serves a stale answer. Past exchanges that merely repeat a cached
+answer are not part of the key (see history_key_ids).
+Entries are dropped when one of their chunks' sources is re-ingested with changes,
+or when a chunk row is edited or deleted (database triggers).
+"""
+import hashlib
+import re
+import sqlite3
+import time
+import logging
+from modules import database
+from config import ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger("athena")
+
+# Answers to these depend on the clock, not the notes: never cached
+UNCACHEABLE = re.compile(
+    r"\b(time|date|today|tonight|tomorrow|yesterday|now|current(?:ly)?|clock|o'clock|"
+    r"day|week|month|year|hour|minute|weekend|morning|afternoon|evening|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?\b",
+    re.IGNORECASE,
+)
+
+
+def is_cacheable(question):
+    return ANSWER_CACHE_MAX_ENTRIES > 0 and not UNCACHEABLE.search(question or "")
+
+
+def _chunk_key(chunk_ids, history_ids=()):
+    """'3,5,9' for the chunks, plus '|m12,m14' for recalled conversation exchanges."""
+    key = ",".join(str(chunk_id) for chunk_id in sorted(set(chunk_ids)))
+    if history_ids:
+        key += "|" + ",".join(f"m{exchange_id}" for exchange_id in sorted(set(history_ids)))
+    return key
+
+
+def history_key_ids(exchanges):
+    """
+    Ids of the recalled exchanges that belong in the cache key. Exchanges whose reply is
+    itself a cached answer (the turns that asked this question before) add nothing the
+    cached answer does not already hold, so they are left out; otherwise remembering
+    each answered turn would change the key of the very next similar question.
+    """
+    if not exchanges:
+        return []
+    try:
+        conn = database.get_connection()
+        replies = {exchange["athena_text"] for exchange in exchanges}
+        placeholders = ",".join("?" * len(replies))
+        cached = {row[0] for row in conn.execute(
+            f"SELECT answer FROM answer_cache WHERE answer IN ({placeholders})", tuple(replies))}
+    except sqlite3.Error as e:
+        logger.error(f"Answer Cache History Error: {e}")
+        cached = set()
+    return [exchange["id"] for exchange in exchanges if exchange["athena_text"] not in cached]
+
+
+def _profile_hash(profile):
+    return hashlib.sha1((profile or "").encode("utf-8")).hexdigest()
+
+
+def _unit(vector):
+    import numpy as np
+    vector = np.asarray(vector, dtype="float32")
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+def lookup(question_vector, chunk_ids, profile="", history_ids=()):
+    """
+    Returns the cached answer for a question similar to `question_vector` that was
+    answered from exactly `chunk_ids` and recalled exchanges `history_ids` with the
+    same `profile`, or None.
+    """
+    if not question_vector or not chunk_ids:
+        return None
+    import numpy as np
+    query = _unit(question_vector)
+    try:
+        conn = database.get_connection()
+        rows = conn.execute(
+            "SELECT id, embedding, answer FROM answer_cache WHERE chunk_key = ? AND profile_hash = ?",
+            (_chunk_key(chunk_ids, history_ids), _profile_hash(profile)),
+        ).fetchall()
+        best, best_score = None, ANSWER_CACHE_SIMILARITY
+        for row in rows:
+            cached = np.frombuffer(row["embedding"], dtype="float32")
+            if cached.shape != query.shape:
+                continue
+            score = float(cached @ query)
+            if score >= best_score:
+                best, best_score = row, score
+        if best is None:
+            return None
+        with conn:
+            conn.execute("UPDATE answer_cache SET hits = hits + 1, last_used = ? WHERE id = ?", (int(time.time()), best["id"]))
+        return best["answer"]
+    except sqlite3.Error as e:
+        logger.error(f"Answer Cache Lookup Error: {e}")
+        return None
+
+
+def store(question, question_vector, chunk_ids, answer, profile="", history_ids=()):
+    """Caches `answer`, evicting the least recently used entries beyond ANSWER_CACHE_MAX_ENTRIES."""
+    if not question_vector or not chunk_ids or not is_cacheable(question):
+        return
+    now = int(time.time())
+    try:
+        conn = database.get_connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO answer_cache (question, embedding, chunk_key, profile_hash, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (question, _unit(question_vector).tobytes(), _chunk_key(chunk_ids, history_ids), _profile_hash(profile), answer, now, now),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO answer_cache_chunks (answer_id, chunk_id) VALUES (?, ?)",
+                [(cursor.lastrowid, chunk_id) for chunk_id in set(chunk_ids)],
+            )
+            conn.execute(
+                "DELETE FROM answer_cache WHERE id NOT IN (SELECT id FROM answer_cache ORDER BY last_used DESC, id DESC LIMIT ?)",
+                (ANSWER_CACHE_MAX_ENTRIES,),
+            )
+    except sqlite3.Error as e:
+        logger.error(f"Answer Cache Store Error: {e}")
+
+
+def invalidate_source(source):
+    """Drops every answer generated from a chunk of `source` (called when it is re-ingested with changes)."""
+    try:
+        conn = database.get_connection()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM answer_cache WHERE id IN ("
+                " SELECT answer_id FROM answer_cache_chunks WHERE chunk_id IN (SELECT id FROM knowledge WHERE source = ?))",
+                (source,),
+            )
+        if cursor.rowcount:
+            logger.info(f"Answer cache: {cursor.rowcount} entries invalidated by re-ingesting {source}")
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Answer Cache Invalidation Error: {e}")
+        return 0
+
+
+def clear():
+    try:
+        conn = database.get_connection()
+        with conn:
+            conn.execute("DELETE FROM answer_cache")
+    except sqlite3.Error as e:
+        logger.error(f"Answer Cache Clear Error: {e}")
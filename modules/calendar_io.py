@@ -0,0 +1,210 @@
+"""
+Calendar I/O Module: Bulk schedule import and export (ICS and CSV).
+Files are parsed and written one event at a time, so memory use does not grow
+with the calendar; inserts go through scheduler.import_tasks (executemany in
+large transactions) and exports stream scheduler.iter_tasks.
+
+CSV columns: task, time, status, recurrence (status and recurrence optional).
+`time` is ISO 8601 ("2024-05-01 09:30", offsets allowed) or epoch seconds.
+"""
+import csv
+import os
+import re
+import logging
+from datetime import datetime, timezone
+from modules import scheduler
+
+logger = logging.getLogger("athena")
+
+CSV_FIELDS = ["task", "time", "status", "recurrence"]
+STATUSES = {"pending", "completed"}
+
+# DTSTART value: date, or date-time (UTC when suffixed with Z)
+_ICS_DATETIME = re.compile(r"^(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})(\d{2})(Z)?)?$")
+_ICS_UNESCAPE = re.compile(r"\\([\\;,nN])")
+_zones = {}
+
+
+def _format(path, fmt):
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in ("ics", "csv"):
+        raise ValueError(f"Unsupported calendar format: {fmt or path} (use .ics or .csv)")
+    return fmt
+
+
+# ICS
+
+def _unfold(lines):
+    """RFC 5545 line unfolding: a line starting with a space or tab continues the previous one."""
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _zone(tzid):
+    # zoneinfo needs the system tz database (or tzdata on Windows); unknown zones fall back to local time
+    if tzid not in _zones:
+        try:
+            from zoneinfo import ZoneInfo
+            _zones[tzid] = ZoneInfo(tzid)
+        except Exception:
+            logger.warning(f"Unknown TZID '{tzid}', importing as local time")
+            _zones[tzid] = None
+    return _zones[tzid]
+
+
+def _parse_ics_datetime(value, params):
+    """DTSTART value -> naive local datetime, or None if malformed."""
+    match = _ICS_DATETIME.match(value.strip())
+    if not match:
+        return None
+    year, month, day, hour, minute, second, utc = match.groups()
+    when = datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    if utc:
+        return when.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    tzid = params.get("TZID")
+    zone = _zone(tzid.strip('"')) if tzid else None
+    if zone is not None:
+        return when.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+    return when # Floating time or all-day date: local
+
+
+def _params(head):
+    """'DTSTART;TZID=Europe/Berlin' -> {'TZID': 'Europe/Berlin'}."""
+    return dict(param.partition("=")[::2] for param in head.split(";")[1:])
+
+
+def iter_ics(path):
+    """Streams (task_name, start, recurrence, None) for every VEVENT (start None if missing or malformed)."""
+    with open(path, encoding="utf-8-sig", errors="replace", newline="") as f:
+        event = None
+        nested = 0 # Depth of sub-components (VALARM) inside the event
+        for line in _unfold(f):
+            head, _, value = line.partition(":")
+            name = head.partition(";")[0].upper()
+            if name == "BEGIN":
+                if value.upper() == "VEVENT":
+                    event, nested = {}, 0
+                elif event is not None:
+                    nested += 1
+            elif name == "END":
+                if value.upper() == "VEVENT" and event is not None:
+                    yield event.get("SUMMARY"), event.get("DTSTART"), event.get("RRULE"), None
+                    event = None
+                elif event is not None:
+                    nested -= 1
+            elif event is None or nested:
+                continue
+            elif name == "SUMMARY":
+                event["SUMMARY"] = _ICS_UNESCAPE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+            elif name == "DTSTART":
+                event["DTSTART"] = _parse_ics_datetime(value, _params(head))
+            elif name == "RRULE":
+                event["RRULE"] = value
+
+
+def _ics_escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line):
+    """Splits a content line into 75-octet pieces (continuations start with a space)."""
+    pieces, current, size = [], "", 0
+    for char in line:
+        width = len(char.encode("utf-8"))
+        if size + width > 75:
+            pieces.append(current)
+            current, size = " ", 1
+        current += char
+        size += width
+    pieces.append(current)
+    return "\r\n".join(pieces)
+
+
+def write_ics(tasks, f):
+    """Writes tasks (dicts from scheduler.iter_tasks) as VEVENTs in floating local time."""
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    count = 0
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Project Athena//Schedule Export//EN\r\n")
+    for task in tasks:
+        f.write("BEGIN:VEVENT\r\n")
+        f.write(f"UID:athena-{task['id']}@athena\r\nDTSTAMP:{stamp}\r\n")
+        f.write(f"DTSTART:{task['time'].strftime('%Y%m%dT%H%M%S')}\r\n")
+        f.write(_fold(f"SUMMARY:{_ics_escape(task['task'])}") + "\r\n")
+        if task.get("recurrence"):
+            f.write(f"RRULE:{task['recurrence']}\r\n")
+        f.write("END:VEVENT\r\n")
+        count += 1
+    f.write("END:VCALENDAR\r\n")
+    return count
+
+
+# CSV
+
+def _parse_csv_time(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return scheduler.from_epoch(int(value))
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when
+
+
+def iter_csv(path):
+    """Streams (task_name, time, recurrence, status) rows (time None if missing or invalid)."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            status = (row.get("status") or "").strip().lower()
+            yield (
+                (row.get("task") or "").strip(),
+                _parse_csv_time(row.get("time")),
+                (row.get("recurrence") or "").strip() or None,
+                status if status in STATUSES else None,
+            )
+
+
+def write_csv(tasks, f):
+    writer = csv.writer(f)
+    writer.writerow(CSV_FIELDS)
+    count = 0
+    for task in tasks:
+        writer.writerow([task["task"], task["time"].strftime("%Y-%m-%d %H:%M:%S"), task["status"], task.get("recurrence") or ""])
+        count += 1
+    return count
+
+
+# Public API
+
+def import_file(path, fmt=None, batch_size=None):
+    """
+    Imports an .ics or .csv calendar into the schedule. Returns (imported, skipped).
+    Past one-off events are stored as completed; recurring ones resume at their next occurrence.
+    """
+    fmt = _format(path, fmt)
+    rows = iter_ics(path) if fmt == "ics" else iter_csv(path)
+    return scheduler.import_tasks(rows, batch_size=batch_size)
+
+
+def export_file(path, fmt=None, pending_only=False):
+    """Streams the schedule to an .ics or .csv file. Returns the number of tasks written."""
+    fmt = _format(path, fmt)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        tasks = scheduler.iter_tasks(pending_only=pending_only)
+        count = write_ics(tasks, f) if fmt == "ics" else write_csv(tasks, f)
+    os.replace(tmp_path, path)
+    return count
@@ -0,0 +1,227 @@
+"""
+Database Module: Shared SQLite access for the Scheduler and Librarian.
+Each thread keeps one persistent connection (WAL journaling, tuned pragmas),
+and the schema is created once per process instead of on every call.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from config import DB_PATH, SQLITE_PRAGMAS, EMBEDDING_MODEL_ID
+
+logger = logging.getLogger("athena")
+
+# Bump when adding a migration below. Stored in PRAGMA user_version.
+SCHEMA_VERSION = 2
+
+SCHEMA = [
+    # schedule.time is local time as integer epoch seconds.
+    # Recurring tasks keep one row: `recurrence` holds the RRULE, `time` the next occurrence.
+    '''
+    CREATE TABLE IF NOT EXISTS schedule (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL,
+        time INTEGER NOT NULL,
+        status TEXT DEFAULT 'pending',
+        recurrence TEXT
+    )
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS knowledge (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT,
+        content TEXT,
+        embedding_model TEXT DEFAULT '{EMBEDDING_MODEL_ID}',
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # Conversation memory (modules/memory.py): one row per exchange, epoch timestamps.
+    # `embedding` is a float32 blob, only filled when MEMORY_EMBEDDINGS is on.
+    '''
+    CREATE TABLE IF NOT EXISTS conversation (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        turn_id TEXT,
+        timestamp INTEGER NOT NULL,
+        user_text TEXT NOT NULL,
+        athena_text TEXT NOT NULL,
+        embedding BLOB,
+        embedding_model TEXT
+    )
+    ''',
+    # Full-text index over the conversation table (external content, kept in sync by triggers)
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversation_fts USING fts5(
+        user_text, athena_text, content='conversation', content_rowid='id'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS conversation_ai AFTER INSERT ON conversation BEGIN
+        INSERT INTO conversation_fts(rowid, user_text, athena_text) VALUES (new.id, new.user_text, new.athena_text);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS conversation_ad AFTER DELETE ON conversation BEGIN
+        INSERT INTO conversation_fts(conversation_fts, rowid, user_text, athena_text) VALUES ('delete', old.id, old.user_text, old.athena_text);
+    END
+    ''',
+    # Semantic answer cache (modules/answer_cache.py). `chunk_key` is the sorted, comma-joined
+    # ids of the knowledge chunks the answer was generated from; answer_cache_chunks links them
+    # so entries can be dropped when a chunk changes.
+    '''
+    CREATE TABLE IF NOT EXISTS answer_cache (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        chunk_key TEXT NOT NULL,
+        profile_hash TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        created INTEGER NOT NULL,
+        last_used INTEGER NOT NULL,
+        hits INTEGER DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS answer_cache_chunks (
+        answer_id INTEGER NOT NULL,
+        chunk_id INTEGER NOT NULL,
+        PRIMARY KEY (chunk_id, answer_id)
+    ) WITHOUT ROWID
+    ''',
+    # Knowledge rows are append-only today; should one ever be edited or removed, its answers go too
+    '''
+    CREATE TRIGGER IF NOT EXISTS knowledge_au AFTER UPDATE ON knowledge BEGIN
+        DELETE FROM answer_cache WHERE id IN (SELECT answer_id FROM answer_cache_chunks WHERE chunk_id = old.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS knowledge_ad AFTER DELETE ON knowledge BEGIN
+        DELETE FROM answer_cache WHERE id IN (SELECT answer_id FROM answer_cache_chunks WHERE chunk_id = old.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS answer_cache_ad AFTER DELETE ON answer_cache BEGIN
+        DELETE FROM answer_cache_chunks WHERE answer_id = old.id;
+    END
+    ''',
+]
+
+# Created after migrations, so they always apply to the current table shape
+INDEXES = [
+    # Due-task checks only ever look at pending rows
+    "CREATE INDEX IF NOT EXISTS idx_schedule_pending_time ON schedule(time) WHERE status = 'pending'",
+    # Date-window queries (today's summary) over all statuses
+    "CREATE INDEX IF NOT EXISTS idx_schedule_time ON schedule(time)",
+    # Recall filters and vector scans walk recent exchanges first
+    "CREATE INDEX IF NOT EXISTS idx_conversation_timestamp ON conversation(timestamp)",
+    # Re-ingestion compares a file's paragraphs with what is already stored for it
+    "CREATE INDEX IF NOT EXISTS idx_knowledge_source ON knowledge(source)",
+    # Cache lookups only compare questions answered from the same chunks
+    "CREATE INDEX IF NOT EXISTS idx_answer_cache_key ON answer_cache(chunk_key, profile_hash)",
+]
+
+def _migrate_schedule_epoch(conn):
+    """v1: schedule.time from adapted datetime strings ('YYYY-MM-DD HH:MM:SS[.ffffff]') to epoch seconds."""
+    conn.execute("ALTER TABLE schedule RENAME TO schedule_legacy")
+    conn.execute('''
+        CREATE TABLE schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            time INTEGER NOT NULL,
+            status TEXT DEFAULT 'pending'
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO schedule (id, task, time, status)
+        SELECT id, task,
+               CASE WHEN typeof(time) = 'text' THEN CAST(strftime('%s', time, 'utc') AS INTEGER) ELSE time END,
+               status
+        FROM schedule_legacy
+    ''')
+    conn.execute("DROP TABLE schedule_legacy")
+
+def _migrate_schedule_recurrence(conn):
+    """v2: recurrence rule column for repeating tasks."""
+    conn.execute("ALTER TABLE schedule ADD COLUMN recurrence TEXT")
+
+# (target version, migration). Applied in order to databases older than the target.
+MIGRATIONS = [
+    (1, _migrate_schedule_epoch),
+    (2, _migrate_schedule_recurrence),
+]
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_initialized_paths = set()
+
+def _resolve(db_path):
+    # Read the module attribute at call time so tests can point DB_PATH elsewhere
+    return db_path or DB_PATH
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=SQLITE_PRAGMAS["busy_timeout_ms"] / 1000)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={SQLITE_PRAGMAS['synchronous']}")
+    conn.execute(f"PRAGMA cache_size={SQLITE_PRAGMAS['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_PRAGMAS['mmap_size']}")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_PRAGMAS['busy_timeout_ms']}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+def get_connection(db_path=None):
+    """
+    Returns this thread's persistent connection to the database.
+    Use `with conn:` for a transaction (commits on success, rolls back on error).
+    """
+    path = _resolve(db_path)
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = _connect(path)
+    return conn
+
+def init_schema(db_path=None):
+    """
+    Creates all tables and migrates older databases to SCHEMA_VERSION.
+    Runs only once per database per process.
+    """
+    path = _resolve(db_path)
+    if path in _initialized_paths:
+        return
+    with _schema_lock:
+        if path in _initialized_paths:
+            return
+        conn = get_connection(path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        has_tables = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schedule'").fetchone()
+        if version == 0 and not has_tables:
+            version = SCHEMA_VERSION # Fresh database: create the current shape directly
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for ddl in SCHEMA:
+                conn.execute(ddl)
+            for target, migrate in MIGRATIONS:
+                if version < target:
+                    logger.info(f"Migrating database to schema v{target}")
+                    migrate(conn)
+            for ddl in INDEXES:
+                conn.execute(ddl)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        _initialized_paths.add(path)
+
+def close_connection(db_path=None):
+    """Closes the calling thread's connection(s). Call when a worker thread exits."""
+    connections = getattr(_local, "connections", {})
+    paths = [_resolve(db_path)] if db_path else list(connections)
+    for path in paths:
+        conn = connections.pop(path, None)
+        if conn is not None:
+            conn.close()
@@ -4,76 +4,105 @@ Optimized for local speed and efficiency using Nomic embeddings via LM Studio.
 """
 import os
 import sys
+import threading
+from collections import OrderedDict
 
 # Add root directory to sys.path to allow importing config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import sqlite3
-import numpy as np
-import faiss
-from openai import OpenAI
-from config import LM_STUDIO_URL, DB_PATH, EMBEDDING_MODEL_ID
+# numpy, faiss and openai are imported on first use: most sessions never ask a
+# knowledge question, and together they dominate Athena's import time.
+from config import (
+    LM_STUDIO_URL, EMBEDDING_MODEL_ID, KNOWLEDGE_CANDIDATES, KNOWLEDGE_DUPLICATE_SIMILARITY,
+    KNOWLEDGE_MMR_LAMBDA, KNOWLEDGE_CONTEXT_TOKENS, CHARS_PER_TOKEN,
+)
+from modules import database
+from core import tracing
 
 # Configuration
 VECTOR_DIMENSION = 768  # Nomic Embed Text v1.5
 INDEX_FILE = "data/vector_store/vectors.index"
 MAPPING_FILE = "data/vector_store/mapping.npy" # Maps FAISS ID -> SQLite ID (if needed, or 1:1)
 
-# Ensure directories
-os.makedirs("data/vector_store", exist_ok=True)
+# Recent embeddings by text: a question is embedded once even when several
+# stores (notes, conversation memory) are searched with it.
+EMBEDDING_CACHE_SIZE = 256
+_embedding_cache = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+# One ingestion at a time: the FAISS index file is read, extended and rewritten as a whole
+_ingest_lock = threading.Lock()
 
-# Initialize OpenAI Client (for Embeddings)
-# Pointing to LM Studio Local Server
-client = OpenAI(base_url=LM_STUDIO_URL, api_key="lm-studio")
+# OpenAI Client (for Embeddings), pointing to LM Studio Local Server.
+# Created by get_client() on first use.
+client = None
+
+def get_client():
+    global client
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI(base_url=LM_STUDIO_URL, api_key="lm-studio")
+    return client
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Shared per-thread connection (WAL, tuned pragmas). Do not close it.
+    return database.get_connection()
 
 def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute(f'''
-        CREATE TABLE IF NOT EXISTS knowledge (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            source TEXT,
-            content TEXT,
-            embedding_model TEXT DEFAULT '{EMBEDDING_MODEL_ID}',
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    # Schema is created once per process by the shared database layer
+    database.init_schema()
 
-def get_embedding(text):
+@tracing.traced("embedding")
+def get_embedding(text, timeout=None):
     """
     Fetches embedding from LM Studio (Nomic model).
+    `timeout` (seconds) bounds the request, e.g. to the remaining turn budget.
     """
     text = text.replace("\n", " ")
+    with _embedding_cache_lock:
+        if text in _embedding_cache:
+            _embedding_cache.move_to_end(text)
+            return _embedding_cache[text]
+
+    request_options = {"timeout": timeout} if timeout is not None else {}
     try:
-        response = client.embeddings.create(
+        response = get_client().embeddings.create(
             input=[text],
-            model=EMBEDDING_MODEL_ID # User specified model
+            model=EMBEDDING_MODEL_ID, # User specified model
+            **request_options
         )
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        with _embedding_cache_lock:
+            _embedding_cache[text] = embedding
+            if len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+                _embedding_cache.popitem(last=False)
+        return embedding
     except Exception as e:
         print(f"Embedding Error: {e}")
         return None
 
 def load_faiss_index():
+    import faiss
     if os.path.exists(INDEX_FILE):
         return faiss.read_index(INDEX_FILE)
     else:
         return faiss.IndexFlatL2(VECTOR_DIMENSION)
 
 def save_faiss_index(index):
-    faiss.write_index(index, INDEX_FILE)
+    import faiss
+    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+    # Write then rename, so a concurrent query never loads a half-written index
+    faiss.write_index(index, INDEX_FILE + ".tmp")
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
 
 def ingest_file(file_path):
     """
     Ingests a text file into SQLite and FAISS.
+    Safe to call from several threads (batch mode); ingestions run one at a time.
     """
+    with _ingest_lock:
+        return _ingest_file(file_path)
+
+def _ingest_file(file_path):
     if not os.path.exists(file_path):
         return False, "File not found."
     
@@ -91,11 +120,19 @@ def ingest_file(file_path):
     
     conn = get_db_connection()
     c = conn.cursor()
+
+    # Re-ingestion only embeds paragraphs not stored for this file yet
+    known = {row['content'] for row in conn.execute("SELECT content FROM knowledge WHERE source = ?", (filename,))}
+    paragraphs = [p for p in dict.fromkeys(paragraphs) if p not in known]
+    if not paragraphs:
+        return True, f"{filename} is up to date."
     index = load_faiss_index()
     
     new_vectors = []
     
     try:
+        import numpy as np
+
         for p in paragraphs:
             # 1. Get Embedding
             vec = get_embedding(p)
@@ -122,6 +159,9 @@ def ingest_file(file_path):
             index.add(vectors_np)
             save_faiss_index(index)
             conn.commit()
+            # The file changed: answers built from its older chunks may be stale
+            from modules import answer_cache
+            answer_cache.invalidate_source(filename)
             return True, f"Ingested {len(new_vectors)} chunks from {filename}."
         else:
             return False, "No valid embeddings generated."
@@ -129,85 +169,120 @@ def ingest_file(file_path):
     except Exception as e:
         conn.rollback()
         return False, f"Ingestion Error: {e}"
-    finally:
-        conn.close()
 
-def query_knowledge(query_text, n_results=3):
+def _fetch_chunks(offsets):
     """
-    Semantic search using FAISS and SQLite.
+    FAISS offset -> (knowledge id, content) for the given offsets, in one query.
+    FAISS ID N is the Nth knowledge row by id (append-only store, no IndexIDMap).
     """
+    if not offsets:
+        return {}
+    placeholders = ",".join("?" * len(offsets))
+    rows = get_db_connection().execute(
+        f"""
+        SELECT pos, id, content FROM (
+            SELECT id, content, ROW_NUMBER() OVER (ORDER BY id) - 1 AS pos FROM knowledge
+        ) WHERE pos IN ({placeholders})
+        """,
+        [int(offset) for offset in offsets],
+    ).fetchall()
+    return {row['pos']: (row['id'], row['content']) for row in rows}
+
+def _mmr(query, vectors, k, mmr_lambda):
+    """
+    Maximal marginal relevance over unit vectors: repeatedly picks the candidate
+    maximizing lambda * sim(query) - (1 - lambda) * max sim(already picked).
+    Returns candidate positions in pick order.
+    """
+    import numpy as np
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    picked, remaining = [], list(range(len(vectors)))
+    while remaining and len(picked) < k:
+        if picked:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        picked.append(remaining.pop(int(np.argmax(scores))))
+    return picked
+
+def search_knowledge(query_text, timeout=None, token_budget=None, max_results=None):
+    """
+    Retrieves note chunks for a question as dicts (id, content, score), best first.
+    FAISS is over-fetched (KNOWLEDGE_CANDIDATES), near-duplicates are dropped using the
+    stored vectors, the rest is re-ranked by maximal marginal relevance, and chunks are
+    added until `token_budget` (default KNOWLEDGE_CONTEXT_TOKENS) is spent.
+    The first chunk is always returned, cut to the budget if it is larger.
+    """
+    token_budget = token_budget or KNOWLEDGE_CONTEXT_TOKENS
     index = load_faiss_index()
     if index.ntotal == 0:
         return []
     
     # 1. Embed Query
-    query_vec = get_embedding(query_text)
+    query_vec = get_embedding(query_text, timeout=timeout)
     if not query_vec:
         return []
     
+    import numpy as np
     query_np = np.array([query_vec]).astype('float32')
     
-    # 2. Search FAISS
-    # Returns distances and indices (IDs)
-    D, I = index.search(query_np, n_results)
-    
-    # 3. Fetch from SQLite
-    # I[0] contains the indices of the neighbors
-    found_indices = I[0]
-    
-    results = []
-    
-    conn = get_db_connection()
-    c = conn.cursor()
-    
-    # NOTE: With IndexFlatL2, the ID is just the sequential index.
-    # This implies SQLite IDs must match 1-based (rowid) to FAISS 0-based + 1?
-    # Or we rely on the fact that we insert sequentially?
-    # IMPORTANT: SQLite IDs might have gaps if we delete. FAISS IDs shift if we remove?
-    # Refined approach: We need to store an external mapping if we want robust editing.
-    # For now, "Append Only" implies:
-    # FAISS ID 0 -> The first item added. 
-    # SQLite: We can select using LIMIT/OFFSET? No, that's slow.
-    # The robust way: Use faiss.IndexIDMap and pass the SQLite ID.
-    
-    # Let's verify if we should switch to IndexIDMap.
-    # Proceeding with IndexIDMap for robustness.
-    pass # Implementation detail, handled below in a robust re-write if needed.
-    
-    # Simplified Retrieval relying on simple mapping assumption for this iteration
-    # Iterate indices and fetch. 
-    # Since we didn't use IndexIDMap in ingest, we assume sequential consistency.
-    # LIMITATION: If we delete from SQLite, this breaks. But we don't implement delete yet.
-    
-    # To fix this properly, let's fix `ingest_file` to use `IndexIDMap`? 
-    # Actually, `IndexFlatL2` is simple. Let's start with simple.
-    # We will assume SQLite ID = FAISS ID + 1? No, SQLite starts at 1.
-    
-    # Strategy:
-    # We fetch all content from DB? No.
-    # We rely on an "offset" mapping? 
-    # Given the constraint to be "Simple and Efficient", let's use the mapping file approach or just SQLite offsets.
-    
-    # Let's blindly trust that FAISS ID N corresponds to the Nth row in SQLite ordered by ID.
-    # SELECT content FROM knowledge ORDER BY id LIMIT 1 OFFSET N
-    
-    for idx in found_indices:
-        if idx != -1:
-            # Fetch by offset
-             c.execute("SELECT content FROM knowledge LIMIT 1 OFFSET ?", (int(idx),))
-             row = c.fetchone()
-             if row:
-                 results.append(row['content'])
-    
-    conn.close()
+    # 2. Over-fetch candidates from FAISS, with their stored vectors
+    with tracing.span("faiss_search"):
+        _, I = index.search(query_np, min(KNOWLEDGE_CANDIDATES, index.ntotal))
+    offsets = [int(idx) for idx in I[0] if idx != -1]
+    chunks = _fetch_chunks(offsets)
+    offsets = [offset for offset in offsets if offset in chunks]
+    if not offsets:
+        return []
+
+    with tracing.span("rerank"):
+        vectors = np.array([index.reconstruct(offset) for offset in offsets], dtype='float32')
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        query = query_np[0] / max(float(np.linalg.norm(query_np[0])), 1e-12)
+
+        # 3. Drop near-duplicates (repeated ingestion, overlapping notes); the closer match wins
+        kept, seen_texts = [], set()
+        for i, offset in enumerate(offsets): # FAISS order: best match first
+            text = " ".join(chunks[offset][1].split()).lower()
+            if text in seen_texts:
+                continue
+            if kept and float((vectors[kept] @ vectors[i]).max()) >= KNOWLEDGE_DUPLICATE_SIMILARITY:
+                continue
+            seen_texts.add(text)
+            kept.append(i)
+
+        # 4. Diversify, then fill the token budget
+        order = _mmr(query, vectors[kept], max_results or len(kept), KNOWLEDGE_MMR_LAMBDA)
+        results, budget_chars = [], token_budget * CHARS_PER_TOKEN
+        for position in order:
+            i = kept[position]
+            chunk_id, content = chunks[offsets[i]]
+            if len(content) > budget_chars:
+                if results:
+                    continue
+                content = content[:budget_chars]
+            results.append({"id": chunk_id, "content": content, "score": round(float(vectors[i] @ query), 4)})
+            budget_chars -= len(content)
+            if budget_chars <= 0:
+                break
     return results
 
+def query_knowledge(query_text, n_results=None, timeout=None, token_budget=None):
+    """
+    Semantic search using FAISS and SQLite: the retrieved chunk texts, best first
+    (see search_knowledge). `n_results` optionally caps the count as well as the token budget.
+    """
+    return [chunk["content"] for chunk in search_knowledge(query_text, timeout=timeout, token_budget=token_budget, max_results=n_results)]
+
 # Robustness Fix: Use IndexIDMap in next iteration if user requests deletes.
 # For now, Offset strategy works for Append-Only.
 
 if __name__ == "__main__":
     # Test
     print("Initializing FAISS Librarian...")
+    import faiss
     if os.path.exists(INDEX_FILE):
          index = faiss.read_index(INDEX_FILE)
          print(f"Index size: {index.ntotal}")
@@ -0,0 +1,169 @@
+"""
+Memory Module: Conversation history as an indexed SQLite store.
+Every understood exchange is written to the `conversation` table, which has a
+full-text index (FTS5) and, with MEMORY_EMBEDDINGS on, a stored embedding.
+recall() returns only the few past exchanges relevant to a question, so the
+engine can add bounded context instead of rereading the interaction log.
+"""
+import re
+import sqlite3
+import time
+import logging
+from datetime import datetime
+from modules import database
+from config import (
+    EMBEDDING_MODEL_ID, MEMORY_RECALL_LIMIT, MEMORY_CONTEXT_CHARS,
+    MEMORY_EMBEDDINGS, MEMORY_VECTOR_SCAN,
+)
+from core import tracing
+
+logger = logging.getLogger("athena")
+
+# Words that would match most exchanges and only add noise to the FTS query
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "at", "be", "did", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "tell", "that", "the",
+    "this", "to", "was", "what", "when", "where", "which", "who", "why", "you", "your",
+}
+_WORD = re.compile(r"\w+")
+
+# Reciprocal rank fusion constant: damps the weight of the top few ranks
+RRF_K = 60
+
+
+def _pack(vector):
+    import numpy as np
+    return np.asarray(vector, dtype="float32").tobytes()
+
+
+def _fts_query(text):
+    """Free text -> FTS5 expression: quoted terms OR'ed together (quoting keeps user text from parsing as syntax)."""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if len(word) > 1 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def remember(user_text, athena_text, turn_id=None, timestamp=None, embed=None):
+    """
+    Stores one exchange. With embeddings enabled (`embed`, default MEMORY_EMBEDDINGS)
+    the exchange is embedded first; a failed embedding still stores the text.
+    Returns the row id, or None on error.
+    """
+    embed = MEMORY_EMBEDDINGS if embed is None else embed
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    blob = model = None
+    if embed:
+        from modules import librarian
+        vector = librarian.get_embedding(f"{user_text}\n{athena_text}")
+        if vector:
+            blob, model = _pack(vector), EMBEDDING_MODEL_ID
+    try:
+        database.init_schema()
+        conn = database.get_connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO conversation (turn_id, timestamp, user_text, athena_text, embedding, embedding_model) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (turn_id, timestamp, user_text, athena_text, blob, model),
+            )
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        logger.error(f"Memory Store Error: {e}")
+        return None
+
+
+def _keyword_search(conn, query, limit, since):
+    expression = _fts_query(query)
+    if not expression:
+        return []
+    sql = (
+        "SELECT c.id FROM conversation_fts JOIN conversation c ON c.id = conversation_fts.rowid "
+        "WHERE conversation_fts MATCH ?"
+    )
+    params = [expression]
+    if since is not None:
+        sql += " AND c.timestamp >= ?"
+        params.append(since)
+    sql += " ORDER BY bm25(conversation_fts) LIMIT ?"
+    params.append(limit)
+    return [row["id"] for row in conn.execute(sql, params)]
+
+
+def _vector_search(conn, query_vector, limit, since):
+    """Cosine similarity over the newest MEMORY_VECTOR_SCAN embedded exchanges."""
+    import numpy as np
+    sql = "SELECT id, embedding FROM conversation WHERE embedding IS NOT NULL AND embedding_model = ?"
+    params = [EMBEDDING_MODEL_ID]
+    if since is not None:
+        sql += " AND timestamp >= ?"
+        params.append(since)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(MEMORY_VECTOR_SCAN)
+    rows = conn.execute(sql, params).fetchall()
+    query = np.asarray(query_vector, dtype="float32")
+    rows = [row for row in rows if len(row["embedding"]) == query.nbytes]
+    if not rows:
+        return []
+    matrix = np.frombuffer(b"".join(row["embedding"] for row in rows), dtype="float32").reshape(len(rows), -1)
+    norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+    scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+    best = np.argsort(-scores)[:limit]
+    return [rows[i]["id"] for i in best]
+
+
+@tracing.traced("memory_recall")
+def recall(query, limit=None, since=None, query_vector=None, timeout=None):
+    """
+    Returns up to `limit` past exchanges relevant to `query`, best first, as dicts
+    (id, turn_id, timestamp, user_text, athena_text). `since` (epoch seconds) drops older ones.
+    Keyword (FTS5 bm25) and, when available, embedding matches are merged by
+    reciprocal rank fusion. `query_vector` reuses an embedding the caller already has.
+    """
+    limit = limit or MEMORY_RECALL_LIMIT
+    try:
+        database.init_schema()
+        conn = database.get_connection()
+        rankings = [_keyword_search(conn, query, limit * 2, since)]
+        if query_vector is None and MEMORY_EMBEDDINGS:
+            from modules import librarian
+            query_vector = librarian.get_embedding(query, timeout=timeout)
+        if query_vector:
+            rankings.append(_vector_search(conn, query_vector, limit * 2, since))
+    except sqlite3.Error as e:
+        logger.error(f"Memory Recall Error: {e}")
+        return []
+
+    scores = {}
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking):
+            scores[row_id] = scores.get(row_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+    ids = sorted(scores, key=lambda row_id: (-scores[row_id], -row_id))[:limit]
+    if not ids:
+        return []
+
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT id, turn_id, timestamp, user_text, athena_text FROM conversation WHERE id IN ({placeholders})",
+        ids,
+    ).fetchall()
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[row_id] for row_id in ids if row_id in by_id]
+
+
+def format_exchanges(exchanges, max_chars=None):
+    """
+    Renders recalled exchanges for a prompt, oldest first, stopping before
+    `max_chars` (default MEMORY_CONTEXT_CHARS). Relevance decides what is kept.
+    """
+    max_chars = max_chars or MEMORY_CONTEXT_CHARS
+    kept, used = [], 0
+    for exchange in exchanges:
+        when = datetime.fromtimestamp(exchange["timestamp"]).strftime("%Y-%m-%d %H:%M")
+        entry = f"[{when}] User: {exchange['user_text']}\nAthena: {exchange['athena_text']}"
+        if used + len(entry) > max_chars:
+            break
+        kept.append((exchange["timestamp"], entry))
+        used += len(entry) + 2
+    return "\n\n".join(entry for _, entry in sorted(kept, key=lambda item: item[0]))
@@ -0,0 +1,112 @@
+"""
+Recurrence Module: Recurrence rules for repeating tasks.
+A recurring task is stored once; only its next occurrence lives in schedule.time,
+and further occurrences are computed on demand (RFC 5545 RRULE via dateutil).
+"""
+# Friendly names the NLU may emit -> RRULE
+ALIASES = {
+    "hourly": "FREQ=HOURLY",
+    "daily": "FREQ=DAILY",
+    "every day": "FREQ=DAILY",
+    "weekdays": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "every weekday": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "weekends": "FREQ=WEEKLY;BYDAY=SA,SU",
+    "weekly": "FREQ=WEEKLY",
+    "every week": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "every month": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+}
+
+WEEKDAYS = {
+    "monday": "MO", "tuesday": "TU", "wednesday": "WE", "thursday": "TH",
+    "friday": "FR", "saturday": "SA", "sunday": "SU",
+}
+
+# Safety cap for window expansion (e.g. an hourly rule over a year)
+MAX_EXPANSION = 1000
+
+def normalize_rule(rule):
+    """
+    Returns the canonical RRULE string for `rule`, or raises ValueError.
+    Accepts aliases ("daily", "weekdays"), "every <weekday>", or an RRULE
+    ("FREQ=WEEKLY;BYDAY=MO", optionally prefixed with "RRULE:").
+    COUNT is rejected because the rule is re-anchored at each occurrence.
+    """
+    text = (rule or "").strip()
+    lower = text.lower()
+    if lower in ALIASES:
+        return ALIASES[lower]
+    if lower.startswith("every ") and lower[6:].rstrip("s") in WEEKDAYS:
+        return f"FREQ=WEEKLY;BYDAY={WEEKDAYS[lower[6:].rstrip('s')]}"
+
+    if lower.startswith("rrule:"):
+        text = text[6:]
+    text = text.upper()
+    if "FREQ=" not in text:
+        raise ValueError(f"Unsupported recurrence: {rule}")
+    if "COUNT=" in text:
+        raise ValueError("Recurrence COUNT is not supported; use UNTIL")
+    try:
+        _rrulestr()(text, dtstart=None)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid recurrence '{rule}': {e}")
+    return text
+
+def count_to_until(rule, dtstart):
+    """
+    Rewrites a COUNT-limited rule ("FREQ=DAILY;COUNT=3") as the equivalent UNTIL rule,
+    anchored at `dtstart` (its last occurrence becomes UNTIL). Other rules are returned
+    unchanged. Raises ValueError if the rule cannot be parsed.
+    Imports need this: exported calendars use COUNT a lot, but a stored rule is
+    re-anchored at each occurrence, where a count would restart.
+    """
+    text = (rule or "").strip()
+    if text.lower().startswith("rrule:"):
+        text = text[6:]
+    parts = [part for part in text.upper().split(";") if part]
+    count = [part for part in parts if part.startswith("COUNT=")]
+    if not count:
+        return rule
+    if any(part.startswith("UNTIL=") for part in parts):
+        raise ValueError(f"Invalid recurrence '{rule}': COUNT and UNTIL are mutually exclusive")
+    try:
+        occurrences = list(_rrulestr()(";".join(parts), dtstart=dtstart.replace(microsecond=0)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid recurrence '{rule}': {e}")
+    if not occurrences:
+        raise ValueError(f"Recurrence '{rule}' has no occurrences")
+    until = occurrences[-1].strftime("%Y%m%dT%H%M%S")
+    return ";".join([part for part in parts if part not in count] + [f"UNTIL={until}"])
+
+def _rrulestr():
+    # dateutil is only needed once a recurring task exists; keep it off the startup path
+    from dateutil.rrule import rrulestr
+    return rrulestr
+
+def _build(rule, anchor):
+    return _rrulestr()(rule, dtstart=anchor.replace(microsecond=0))
+
+def first_occurrence(rule, anchor):
+    """First occurrence at or after `anchor` (the anchor itself only if it matches the rule)."""
+    return _build(rule, anchor).after(anchor.replace(microsecond=0), inc=True)
+
+def next_occurrence(rule, anchor, after):
+    """First occurrence strictly after `after`, for a rule anchored at `anchor`. None if the rule has ended."""
+    return _build(rule, anchor).after(after, inc=False)
+
+def occurrences_between(rule, anchor, start, end, limit=MAX_EXPANSION):
+    """Occurrences in [start, end] (inclusive), lazily generated and capped at `limit`."""
+    result = []
+    for occurrence in _build(rule, anchor).xafter(start, inc=True):
+        if occurrence > end or len(result) >= limit:
+            break
+        result.append(occurrence)
+    return result
+
+def describe(rule):
+    """Short human phrase for confirmations ("daily", "every weekday", ...)."""
+    for alias, rrule in ALIASES.items():
+        if rrule == rule:
+            return alias
+    return f"on schedule {rule}"
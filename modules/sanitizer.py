@@ -1,18 +1,124 @@
 """
 Sanitizer Module: Parses relative time expressions into absolute datetime objects.
+The common forms the NLU emits ("20 minutes", "at 5 PM", "tomorrow 9am", "friday at 3pm")
+go through a compiled fast path; anything else falls back to dateparser, which is
+imported lazily because loading its language data is slow.
 """
-import dateparser
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 
-def parse_relative_time(time_str):
+from core import tracing
+
+_UNIT_SECONDS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "day": 86400, "days": 86400,
+    "week": 604800, "weeks": 604800,
+}
+_UNITS = "|".join(sorted(_UNIT_SECONDS, key=len, reverse=True))
+_AMOUNT = r"\d+|an?|one"
+_DURATION_PART = re.compile(rf"({_AMOUNT})\s*({_UNITS})\b")
+_DURATION = re.compile(rf"(?:in\s+)?(?:(?:{_AMOUNT})\s*(?:{_UNITS})\b(?:\s*,?\s*(?:and\s+)?)?)+")
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_DAY = re.compile(r"\b(?:next\s+)?(today|tomorrow|" + "|".join(_WEEKDAYS) + r")\b")
+_CLOCK = re.compile(r"(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?\s*m\.?|(?P<hour24>\d{1,2}):(?P<minute24>\d{2})|(?P<word>noon|midnight))")
+
+# Base settings for the dateparser fallback (RELATIVE_BASE is added per call)
+_DATEPARSER_SETTINGS = {'PREFER_DATES_FROM': 'future'}
+_dateparser = None
+
+def _parse_clock(text):
+    """'5 pm' / '17:30' / 'noon' -> (hour, minute), or None."""
+    match = _CLOCK.fullmatch(text)
+    if not match:
+        return None
+    if match.group("word"):
+        return (12, 0) if match.group("word") == "noon" else (0, 0)
+    if match.group("hour24"):
+        hour, minute = int(match.group("hour24")), int(match.group("minute24"))
+        return (hour, minute) if hour < 24 and minute < 60 else None
+
+    hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+    if not 1 <= hour <= 12 or minute >= 60:
+        return None
+    if match.group("ampm") == "a":
+        hour = 0 if hour == 12 else hour
+    else:
+        hour = 12 if hour == 12 else hour + 12
+    return hour, minute
+
+def parse_fast(time_str, now):
+    """
+    Compiled parser for the common NLU forms. Returns a datetime, or None if the
+    expression is not one it recognizes (the caller then falls back to dateparser).
+    Mirrors dateparser's PREFER_DATES_FROM='future' behaviour.
+    """
+    text = " ".join(time_str.lower().split())
+
+    # "20 minutes", "in 1 hour and 30 minutes", "an hour"
+    if _DURATION.fullmatch(text):
+        seconds = sum(
+            (1 if amount in ("a", "an", "one") else int(amount)) * _UNIT_SECONDS[unit]
+            for amount, unit in _DURATION_PART.findall(text)
+        )
+        return now + timedelta(seconds=seconds)
+
+    day = None
+    match = _DAY.search(text)
+    if match:
+        day = match.group(1)
+        text = text[:match.start()] + " " + text[match.end():]
+    text = re.sub(r"\b(at|on)\b", " ", text).strip()
+
+    clock = None
+    if text:
+        clock = _parse_clock(text)
+        if clock is None:
+            return None
+
+    if day is None:
+        if clock is None:
+            return None
+        # Bare clock time: today if still ahead, otherwise tomorrow
+        result = now.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+        return result if result > now else result + timedelta(days=1)
+
+    if day == "today":
+        if clock is None:
+            return None
+        return now.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+
+    if day == "tomorrow":
+        result = now + timedelta(days=1)
+        if clock is None:
+            return result
+        return result.replace(hour=clock[0], minute=clock[1], second=0, microsecond=0)
+
+    # Weekday: always the next one strictly after today, midnight unless a time is given
+    days_ahead = (_WEEKDAYS.index(day) - now.weekday()) % 7 or 7
+    hour, minute = clock or (0, 0)
+    return (now + timedelta(days=days_ahead)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+def _parse_with_dateparser(time_str, now):
+    global _dateparser
+    if _dateparser is None:
+        import dateparser
+        _dateparser = dateparser
+    return _dateparser.parse(time_str, settings={**_DATEPARSER_SETTINGS, 'RELATIVE_BASE': now})
+
+@tracing.traced("time_parse")
+def parse_relative_time(time_str, now=None):
     """
     Converts a relative time string (e.g., "in 20 minutes") to a datetime object.
     Returns None if parsing fails.
     """
-    settings = {
-        'PREFER_DATES_FROM': 'future',
-        'RELATIVE_BASE': datetime.now() # Explicitly set base to now
-    }
-    
-    dt = dateparser.parse(time_str, settings=settings)
+    if not time_str:
+        return None
+    now = now or datetime.now() # Explicitly set base to now
+
+    dt = parse_fast(time_str, now)
+    if dt is None:
+        dt = _parse_with_dateparser(time_str, now)
     return dt
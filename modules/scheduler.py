@@ -1,134 +1,420 @@
 """
 Scheduler Module: Manages SQLite database operations for tasks.
+Connections come from the shared database layer (modules.database).
 """
+import math
 import sqlite3
 import logging
-from config import DB_PATH
-from datetime import datetime
+from itertools import islice
+from modules import database, recurrence as recurrence_rules
+from config import SCHEDULE_PAGE_SIZE, IMPORT_BATCH_SIZE, RECONCILE_INTERVAL_SECONDS
+from core import tracing
+from datetime import datetime, timedelta
 
 logger = logging.getLogger("athena")
 
+# Callbacks fired after a task is inserted: callback(task_id, task_name, execution_time)
+# The Monitor subscribes so it can wake up immediately for tasks due sooner than its next timer.
+_task_listeners = []
+
+def add_task_listener(callback):
+    """Registers a callback for newly added tasks."""
+    if callback not in _task_listeners:
+        _task_listeners.append(callback)
+
+def remove_task_listener(callback):
+    if callback in _task_listeners:
+        _task_listeners.remove(callback)
+
+def _notify_task_added(task_id, task_name, execution_time):
+    for callback in list(_task_listeners):
+        try:
+            callback(task_id, task_name, execution_time)
+        except Exception as e:
+            logger.error(f"Task Listener Error: {e}")
+
+def to_epoch(dt):
+    """Local datetime -> integer epoch seconds (as stored in schedule.time). Rounds up so tasks never fire early."""
+    return math.ceil(dt.timestamp())
+
+def from_epoch(epoch):
+    return datetime.fromtimestamp(epoch)
+
+def _row_to_task(row):
+    task = dict(row)
+    if 'time' in task:
+        task['time'] = from_epoch(task['time'])
+    return task
+
 def init_db():
     """Initializes the database schema."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                task TEXT NOT NULL,
-                time TIMESTAMP NOT NULL,
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        conn.commit()
+        database.init_schema()
     except sqlite3.Error as e:
         logger.error(f"Database Initialization Error: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-def add_task(task_name, execution_time):
-    """Adds a new task to the schedule."""
+def _resolve_recurrence(execution_time, recurrence):
+    """Returns (rule, first execution time); (None, None) if the rule is invalid or never fires."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO schedule (task, time, status) VALUES (?, ?, ?)",
-            (task_name, execution_time, 'pending')
-        )
-        conn.commit()
+        rule = recurrence_rules.normalize_rule(recurrence)
+    except ValueError as e:
+        logger.error(f"Add Task Error: {e}")
+        return None, None
+    execution_time = recurrence_rules.first_occurrence(rule, execution_time)
+    if execution_time is None:
+        logger.error(f"Add Task Error: recurrence {rule} has no future occurrences")
+        return None, None
+    return rule, execution_time
+
+@tracing.traced("db.add_task")
+def add_task(task_name, execution_time, recurrence=None):
+    """
+    Adds a new task to the schedule.
+    With `recurrence` (e.g. "daily", "weekdays" or an RRULE), one row is stored and
+    `execution_time` anchors the rule; only the next occurrence is ever materialized.
+    """
+    rule = None
+    if recurrence:
+        rule, execution_time = _resolve_recurrence(execution_time, recurrence)
+        if rule is None:
+            return False
+
+    try:
+        conn = database.get_connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO schedule (task, time, status, recurrence) VALUES (?, ?, ?, ?)",
+                (task_name, to_epoch(execution_time), 'pending', rule)
+            )
+        task_id = cursor.lastrowid
         logger.info(f"Task added: {task_name} at {execution_time}")
+        _notify_task_added(task_id, task_name, execution_time)
         return True
     except sqlite3.Error as e:
         logger.error(f"Add Task Error: {e}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
+@tracing.traced("db.add_tasks")
+def add_tasks(tasks):
+    """
+    Adds several (task_name, execution_time, recurrence) tasks in one transaction.
+    Returns one bool per task: tasks with an invalid rule are skipped, and a database
+    error saves none of them. Listeners are notified only after the commit.
+    """
+    results = [False] * len(tasks)
+    rows = []
+    for i, (task_name, execution_time, recurrence) in enumerate(tasks):
+        rule = None
+        if recurrence:
+            rule, execution_time = _resolve_recurrence(execution_time, recurrence)
+            if rule is None:
+                continue
+        rows.append((i, task_name, execution_time, rule))
+
+    added = []
+    try:
+        conn = database.get_connection()
+        with conn:
+            for i, task_name, execution_time, rule in rows:
+                cursor = conn.execute(
+                    "INSERT INTO schedule (task, time, status, recurrence) VALUES (?, ?, ?, ?)",
+                    (task_name, to_epoch(execution_time), 'pending', rule)
+                )
+                added.append((i, cursor.lastrowid, task_name, execution_time))
+    except sqlite3.Error as e:
+        logger.error(f"Add Tasks Error: {e}")
+        return [False] * len(tasks)
+
+    logger.info(f"Tasks added: {len(added)} in one transaction")
+    for i, task_id, task_name, execution_time in added:
+        results[i] = True
+        _notify_task_added(task_id, task_name, execution_time)
+    return results
+
+def _import_row(task_name, execution_time, recurrence, status, now):
+    """Bulk-import row (task, time, status, recurrence), or None if the event cannot be scheduled."""
+    if not task_name or execution_time is None:
+        logger.warning(f"Import skipped '{task_name}': missing task name or start time")
+        return None
+    rule = None
+    if recurrence:
+        try:
+            # Exported calendars often bound a series with COUNT: store it as UNTIL
+            rule = recurrence_rules.normalize_rule(recurrence_rules.count_to_until(recurrence, execution_time))
+        except ValueError as e:
+            logger.warning(f"Import skipped '{task_name}': {e}")
+            return None
+        # A recurring event starting in the past resumes at its next occurrence
+        if execution_time < now:
+            next_time = recurrence_rules.next_occurrence(rule, execution_time, now)
+            if next_time is None:
+                status = status or 'completed'
+            else:
+                execution_time = next_time
+    if status is None:
+        # Past one-off events are history, not reminders to fire all at once
+        status = 'completed' if execution_time < now else 'pending'
+    return (task_name, to_epoch(execution_time), status, rule)
+
+@tracing.traced("db.import_tasks")
+def import_tasks(tasks, batch_size=None):
+    """
+    Bulk insert for calendar imports. `tasks` is any iterable (typically a streaming
+    parser) of (task_name, execution_time, recurrence, status); status None means
+    'pending' for future events and 'completed' for past ones. Events without a name,
+    a start time or a valid rule are skipped.
+    Rows are inserted with executemany, `batch_size` (default IMPORT_BATCH_SIZE)
+    per transaction, so memory stays flat however large the file is.
+    Returns (imported, skipped).
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    now = datetime.now()
+    imported = skipped = 0
+    tasks = iter(tasks)
+    try:
+        conn = database.get_connection()
+        first_new_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM schedule").fetchone()[0]
+        while True:
+            batch = list(islice(tasks, batch_size))
+            if not batch:
+                break
+            rows = []
+            for task_name, execution_time, recurrence, status in batch:
+                row = _import_row(task_name, execution_time, recurrence, status, now)
+                if row is None:
+                    skipped += 1
+                else:
+                    rows.append(row)
+            with conn:
+                conn.executemany("INSERT INTO schedule (task, time, status, recurrence) VALUES (?, ?, ?, ?)", rows)
+            imported += len(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Import Tasks Error: {e}")
+        return imported, skipped
+
+    logger.info(f"Tasks imported: {imported} ({skipped} skipped)")
+    # Listeners only care about tasks due soon (the Monitor's horizon), not the whole calendar
+    if imported and _task_listeners:
+        horizon = to_epoch(now + timedelta(seconds=2 * RECONCILE_INTERVAL_SECONDS))
+        soon = conn.execute(
+            "SELECT id, task, time FROM schedule WHERE id >= ? AND status = 'pending' AND time <= ? ORDER BY time ASC",
+            (first_new_id, horizon)
+        ).fetchall()
+        for row in soon:
+            _notify_task_added(row['id'], row['task'], from_epoch(row['time']))
+    return imported, skipped
+
+def iter_tasks(pending_only=False, batch_size=None):
+    """
+    Streams every task ordered by time as dicts (id, task, time as datetime, status, recurrence),
+    fetching `batch_size` rows at a time. Used by exports.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    status_filter = " WHERE status = 'pending'" if pending_only else ""
+    try:
+        conn = database.get_connection()
+        cursor = conn.execute(f"SELECT id, task, time, status, recurrence FROM schedule{status_filter} ORDER BY time ASC, id ASC")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_task(row)
+    except sqlite3.Error as e:
+        logger.error(f"Export Tasks Error: {e}")
+
+@tracing.traced("db.get_due_tasks")
 def get_due_tasks(current_time=None):
-    """Retrieves pending tasks that are due."""
+    """Retrieves pending tasks that are due (time <= current_time), via the pending-time index."""
     if current_time is None:
         current_time = datetime.now()
-    
-    # Format for string comparison in SQLite usually works best with close matching 
-    # or by checking if time <= current_time for missed tasks
-    # But strictly following spec: "SELECT * FROM schedule WHERE time = '10:20'" implies exact match logic or minute-level precision.
-    # Let's use a range or minute truncation for robustness, but here I will implement "less than or equal to now" for robustness against slight delays.
-    
+
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Check for tasks that are pending and due (time <= current_time)
-        cursor.execute(
-            "SELECT * FROM schedule WHERE status = 'pending' AND time <= ?",
-            (current_time,)
+        conn = database.get_connection()
+        cursor = conn.execute(
+            "SELECT * FROM schedule WHERE status = 'pending' AND time <= ? ORDER BY time ASC",
+            (int(current_time.timestamp()),)
         )
-        tasks = [dict(row) for row in cursor.fetchall()]
-        return tasks
+        return [_row_to_task(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         logger.error(f"Get Tasks Error: {e}")
         return []
-    finally:
-        if conn:
-            conn.close()
+
+@tracing.traced("db.get_pending_tasks")
+def get_pending_tasks(until=None):
+    """
+    Retrieves pending tasks due at or before `until` (all pending if None), ordered by time.
+    Each task's 'time' is returned as a datetime.
+    """
+    try:
+        conn = database.get_connection()
+        if until is None:
+            cursor = conn.execute("SELECT id, task, time FROM schedule WHERE status = 'pending' ORDER BY time ASC")
+        else:
+            cursor = conn.execute(
+                "SELECT id, task, time FROM schedule WHERE status = 'pending' AND time <= ? ORDER BY time ASC",
+                (to_epoch(until),)
+            )
+        return [_row_to_task(row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Get Pending Tasks Error: {e}")
+        return []
+
+@tracing.traced("db.get_next_task")
+def get_next_task(after):
+    """
+    The first pending task due at or after `after`, however far ahead: a one-shot row
+    or the next occurrence of a recurring one. Returns a dict (task, time, status) or None.
+    """
+    try:
+        conn = database.get_connection()
+        row = conn.execute(
+            "SELECT task, time, status FROM schedule WHERE time >= ? AND status = 'pending' AND recurrence IS NULL "
+            "ORDER BY time ASC LIMIT 1",
+            (to_epoch(after),)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.error(f"Get Next Task Error: {e}")
+        return None
+
+    candidates = [_row_to_task(row)] if row else []
+    for task in get_recurring_tasks():
+        when = recurrence_rules.next_occurrence(task['recurrence'], task['time'], after - timedelta(seconds=1))
+        if when is not None:
+            candidates.append({'task': task['task'], 'time': when, 'status': 'pending'})
+    return min(candidates, key=lambda task: task['time']) if candidates else None
+
+@tracing.traced("db.get_schedule_window")
+def get_schedule_window(start, end, limit=None, offset=0, pending_only=False):
+    """
+    Tasks due in [start, end], one-shot rows plus recurring occurrences expanded
+    inside the window, ordered by time. Returns (page, total) where page is a list of
+    dicts (task, time as datetime, status) sliced by `offset`/`limit`.
+    """
+    status_filter = " AND status = 'pending'" if pending_only else ""
+    window = (to_epoch(start), int(end.timestamp()))
+    # A merged page never needs more than offset + limit rows from either source
+    needed = None if limit is None else offset + limit
+
+    try:
+        conn = database.get_connection()
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM schedule WHERE time BETWEEN ? AND ? AND recurrence IS NULL{status_filter}",
+            window
+        ).fetchone()[0]
+        query = f"SELECT task, time, status FROM schedule WHERE time BETWEEN ? AND ? AND recurrence IS NULL{status_filter} ORDER BY time ASC"
+        params = window
+        if needed is not None:
+            query += " LIMIT ?"
+            params = window + (needed,)
+        tasks = [_row_to_task(row) for row in conn.execute(query, params).fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Schedule Window Error: {e}")
+        return [], 0
+
+    # Recurring tasks: expand only the occurrences inside the window
+    for task in get_recurring_tasks():
+        occurrences = recurrence_rules.occurrences_between(task['recurrence'], task['time'], start, end)
+        total += len(occurrences)
+        tasks.extend({'task': task['task'], 'time': when, 'status': 'pending'} for when in occurrences)
+
+    tasks.sort(key=lambda task: task['time'])
+    page = tasks[offset:needed]
+    return page, total
+
+def get_schedule_summary(start, end, limit=SCHEDULE_PAGE_SIZE):
+    """
+    Returns a bounded text block of the tasks in [start, end] for the LLM to translate.
+    At most `limit` tasks are listed; the rest are summarized as a count.
+    """
+    tasks, total = get_schedule_window(start, end, limit=limit)
+
+    if not tasks:
+        return "No tasks scheduled for today." if start.date() == end.date() else "No tasks scheduled."
+
+    summary = "[DATA START]\n"
+    for task in tasks:
+        when = task['time']
+        time_str = when.strftime('%H:%M') if when.date() == start.date() == end.date() else when.strftime('%Y-%m-%d %H:%M')
+
+        summary += f"- {time_str}: {task['task']} (Status: {task['status']})\n"
+    if total > len(tasks):
+        summary += f"(+{total - len(tasks)} more tasks not listed)\n"
+    summary += "[DATA END]"
+
+    return summary
 
 def get_today_summary():
     """
     Returns a text block of today's tasks for the LLM to translate.
     """
+    start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_day = start_of_day + timedelta(days=1) - timedelta(seconds=1)
+    return get_schedule_summary(start_of_day, end_of_day)
+
+@tracing.traced("db.get_recurring_tasks")
+def get_recurring_tasks():
+    """Active recurring tasks: id, task, time (next occurrence, datetime) and recurrence rule."""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Select all tasks for today (simplification: all tasks in DB for now, or use date query)
-        # For a "true" daily summary, we should filter by date. 
-        # But given the inputs "in 20 minutes", they are today.
-        
-        start_of_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        cursor.execute(
-            "SELECT task, time, status FROM schedule WHERE time >= ? ORDER BY time ASC",
-            (start_of_day,)
+        conn = database.get_connection()
+        cursor = conn.execute(
+            "SELECT id, task, time, recurrence FROM schedule WHERE status = 'pending' AND recurrence IS NOT NULL"
         )
-        tasks = cursor.fetchall()
-        
-        if not tasks:
-            return "No tasks scheduled for today."
-            
-        summary = "[DATA START]\n"
-        for row in tasks:
-            time_str = datetime.strptime(row['time'], '%Y-%m-%d %H:%M:%S.%f').strftime('%H:%M') if '.' in row['time'] else row['time']
-            # formatting cleanup might be needed depending on how it was saved
-            
-            summary += f"- {time_str}: {row['task']} (Status: {row['status']})\n"
-        summary += "[DATA END]"
-        
-        return summary
-        
+        return [_row_to_task(row) for row in cursor.fetchall()]
     except sqlite3.Error as e:
-        logger.error(f"Summary Error: {e}")
-        return "Error retrieving schedule."
-    finally:
-        if conn:
-            conn.close()
+        logger.error(f"Get Recurring Tasks Error: {e}")
+        return []
+
+def is_recurring(task_id):
+    """True if the task repeats (its reminder text comes back every occurrence)."""
+    try:
+        conn = database.get_connection()
+        row = conn.execute("SELECT recurrence FROM schedule WHERE id = ?", (task_id,)).fetchone()
+        return row is not None and row['recurrence'] is not None
+    except sqlite3.Error as e:
+        logger.error(f"Is Recurring Error: {e}")
+        return False
 
 def mark_task_complete(task_id):
     """Marks a task as completed/notified."""
+    mark_tasks_complete([task_id])
+
+@tracing.traced("db.mark_tasks_complete")
+def mark_tasks_complete(task_ids):
+    """
+    Marks several tasks as completed/notified in a single transaction.
+    Recurring tasks instead advance to their next future occurrence (missed ones are skipped),
+    and are completed only once their rule has ended.
+    """
+    if not task_ids:
+        return
+    now = datetime.now()
+    advanced = []
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE schedule SET status = 'completed' WHERE id = ?",
-            (task_id,)
-        )
-        conn.commit()
+        conn = database.get_connection()
+        placeholders = ",".join("?" * len(task_ids))
+        recurring = conn.execute(
+            f"SELECT id, task, time, recurrence FROM schedule WHERE id IN ({placeholders}) AND recurrence IS NOT NULL",
+            list(task_ids)
+        ).fetchall()
+
+        done, updates = set(task_ids), []
+        for row in recurring:
+            next_time = recurrence_rules.next_occurrence(row['recurrence'], from_epoch(row['time']), now)
+            if next_time is not None:
+                done.discard(row['id'])
+                updates.append((to_epoch(next_time), row['id']))
+                advanced.append((row['id'], row['task'], next_time))
+
+        with conn:
+            conn.executemany(
+                "UPDATE schedule SET status = 'completed' WHERE id = ?",
+                [(task_id,) for task_id in done]
+            )
+            conn.executemany("UPDATE schedule SET time = ? WHERE id = ?", updates)
     except sqlite3.Error as e:
         logger.error(f"Update Task Error: {e}")
-    finally:
-        if conn:
-            conn.close()
+        return
+
+    for task_id, task_name, next_time in advanced:
+        _notify_task_added(task_id, task_name, next_time)
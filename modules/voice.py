@@ -1,46 +1,320 @@
 """
 Voice Module: Handles Text-to-Speech synthesis using pyttsx3 (Native OS TTS).
+
+pyttsx3 is not thread-safe and slow to initialize, so a single long-lived
+speech worker owns the engine. speak() only queues the utterance and returns.
+The queue is ordered by priority: long answers are split into sentences, so a
+reminder waits for at most the sentence currently being spoken.
+
+Sentences worth keeping (recurring reminders, fixed replies pre-rendered at startup
+with prerender(), and sentences that keep recurring) are rendered to an audio file
+once, keyed by text, voice, rate and volume, and played back from the on-disk cache
+afterwards. One-off sentences are spoken live by the engine.
 """
-import pyttsx3
+import hashlib
+import itertools
 import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
 import threading
+import time
+from collections import deque, OrderedDict
+
+from core import tracing
+from config import TTS_RATE, TTS_VOLUME, TTS_VOICE, TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_CACHE_MIN_REPEATS
 
 logger = logging.getLogger("athena")
 
-# Initialize engine globally? 
-# pyttsx3 can be finicky with threads. 
-# It's often safer to initialize it in the thread that uses it, or use a queue.
-# However, for a simple implementation, let's try a lock-protected shared function 
-# or just re-initialize for each speak (can be slow) or keep a global instance.
 
-# Best practice for pyttsx3 in a background thread:
-# runAndWait() blocks.
-# We will create a simple function that creates an engine, speaks, and closes.
-# Or better, we just use it directly since monitor is a single thread.
+class Priority:
+    """Lower value is spoken first."""
+    REMINDER = 0
+    CHAT = 10
+    PRERENDER = 20 # Background cache warm-up, never delays speech
+
+
+LATENCY_SAMPLES = 500 # For percentile stats
+SEEN_SENTENCES = 1000 # Sentences whose repeat count is remembered (LRU)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_STOP = float("-inf") # Shutdown sentinel priority (ahead of everything)
+
+_queue = queue.PriorityQueue()
+_sequence = itertools.count() # FIFO among equal priorities
+_worker = None
+_worker_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_counts = {"spoken": 0, "failed": 0, "dropped": 0, "cache_hits": 0, "cache_misses": 0}
+_wait_latencies = deque(maxlen=LATENCY_SAMPLES)   # speak() call -> first word
+_speech_durations = deque(maxlen=LATENCY_SAMPLES) # per utterance chunk
+
+
+class SpeechHandle:
+    """Returned by speak(). wait() blocks until the whole utterance was spoken (or dropped)."""
+
+    def __init__(self, text, priority, chunks, render_only=False, cache=False):
+        self.text = text
+        self.priority = priority
+        self.render_only = render_only
+        self.cache = cache
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.ok = True
+        self._remaining = chunks
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def _chunk_finished(self, ok):
+        self.ok = self.ok and ok
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self.finished_at = time.perf_counter()
+            self._done.set()
+
+
+def _init_engine():
+    # Imported on first use (slow to load, and never needed in text-only sessions)
+    import pyttsx3
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', TTS_RATE)
+    engine.setProperty('volume', TTS_VOLUME)
+    if TTS_VOICE:
+        engine.setProperty('voice', TTS_VOICE)
+    return engine
+
+
+def _say(engine, text):
+    engine.say(text)
+    engine.runAndWait() # Blocks the worker only
+
+
+# --- Audio cache ---
+
+_player = False # Not detected yet (None = no player available)
+
+def _find_player():
+    global _player
+    if _player is False:
+        if sys.platform == "win32":
+            _player = "winsound"
+        else:
+            _player = next((cmd for cmd in ("afplay", "paplay", "aplay") if shutil.which(cmd)), None)
+    return _player
+
+def _play_file(path):
+    player = _find_player()
+    if player == "winsound":
+        import winsound
+        winsound.PlaySound(path, winsound.SND_FILENAME)
+    else:
+        subprocess.run([player, path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _cache_enabled():
+    return TTS_CACHE_MAX_BYTES > 0 and _find_player() is not None
+
+_seen = OrderedDict() # Sentence -> times spoken (worker thread only)
+
+def _worth_caching(text, handle):
+    """Utterances flagged `cache` always; anything else once it has recurred."""
+    if handle.cache:
+        return True
+    count = _seen.pop(text, 0) + 1
+    _seen[text] = count
+    if len(_seen) > SEEN_SENTENCES:
+        _seen.popitem(last=False)
+    return count >= TTS_CACHE_MIN_REPEATS
 
-def speak(text):
+def cache_path(text):
+    """Cache file for `text` with the current voice settings."""
+    key = f"{text}\0{TTS_VOICE}\0{TTS_RATE}\0{TTS_VOLUME}".encode("utf-8")
+    return os.path.join(TTS_CACHE_DIR, hashlib.sha1(key).hexdigest() + ".wav")
+
+def _render(engine, text, path):
+    """Synthesizes text to `path`. Returns False if the driver produced nothing."""
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+    engine.save_to_file(text, tmp_path)
+    engine.runAndWait()
+    if not os.path.exists(tmp_path) or os.path.getsize(tmp_path) == 0:
+        return False
+    os.replace(tmp_path, path)
+    _evict_lru()
+    return True
+
+def _evict_lru():
+    """Deletes least recently played files until the cache fits TTS_CACHE_MAX_BYTES."""
+    entries = []
+    for entry in os.scandir(TTS_CACHE_DIR):
+        if entry.is_file() and entry.name.endswith(".wav"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+@tracing.traced("tts")
+def _speak_chunk(engine, text, render_only=False, cacheable=True):
+    """
+    Plays `text` from the cache. On a miss it is rendered first if `cacheable`,
+    otherwise (or if rendering fails) it is spoken live.
+    """
+    if not _cache_enabled():
+        if not render_only:
+            _say(engine, text)
+        return
+
+    path = cache_path(text)
+    if os.path.exists(path):
+        with _stats_lock:
+            _counts["cache_hits"] += 1
+        if render_only:
+            return
+        os.utime(path) # mtime doubles as the LRU timestamp
+        _play_file(path)
+        return
+
+    with _stats_lock:
+        _counts["cache_misses"] += 1
+    if not cacheable:
+        if not render_only:
+            _say(engine, text)
+        return
+    if not _render(engine, text, path):
+        if not render_only:
+            _say(engine, text)
+        return
+    if not render_only:
+        _play_file(path)
+
+
+def _run():
+    engine = None
+    while True:
+        priority, _, chunk, handle = _queue.get()
+        if priority == _STOP:
+            break
+
+        ok = False
+        try:
+            if engine is None:
+                engine = _init_engine()
+            started = time.perf_counter()
+            if handle.render_only:
+                _speak_chunk(engine, chunk, render_only=True)
+                ok = True
+                continue
+            if handle.started_at is None:
+                handle.started_at = started
+                with _stats_lock:
+                    _wait_latencies.append(started - handle.queued_at)
+            _speak_chunk(engine, chunk, cacheable=_worth_caching(chunk, handle))
+            ok = True
+            with _stats_lock:
+                _counts["spoken"] += 1
+                _speech_durations.append(time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"TTS Error: {e}")
+            engine = None # Re-initialize on the next utterance
+            with _stats_lock:
+                _counts["failed"] += 1
+        finally:
+            handle._chunk_finished(ok)
+        if ok and handle.done() and not handle.render_only:
+            logger.info(f"Spoken: {handle.text}")
+
+    # Release callers waiting on utterances that will never be spoken
+    while True:
+        try:
+            _, _, _, handle = _queue.get_nowait()
+        except queue.Empty:
+            break
+        if handle is not None:
+            with _stats_lock:
+                _counts["dropped"] += 1
+            handle._chunk_finished(False)
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="athena-voice", daemon=True)
+            _worker.start()
+
+
+def _enqueue(text, priority, render_only=False, cache=False):
+    chunks = _SENTENCE_END.split(text.strip()) if text and text.strip() else []
+    handle = SpeechHandle(text, priority, len(chunks), render_only=render_only, cache=cache)
+    if not chunks:
+        handle._done.set()
+        return handle
+
+    _ensure_worker()
+    for chunk in chunks:
+        _queue.put((priority, next(_sequence), chunk, handle))
+    return handle
+
+
+def speak(text, priority=Priority.CHAT, cache=False):
     """
-    Converts text to speech using native OS capabilities.
-    Blocking call.
+    Queues text for speech and returns a SpeechHandle immediately.
+    Reminders (Priority.REMINDER) are spoken before any queued chat answer.
+    cache=True renders the text to the audio cache on first use (e.g. a recurring
+    reminder); otherwise it is cached only once it has been spoken repeatedly.
     """
-    try:
-        # Initialize the engine
-        engine = pyttsx3.init()
-        
-        # Optional: Configure voice (Speed, Volume)
-        engine.setProperty('rate', 170)  # Speed percent (can go over 100)
-        engine.setProperty('volume', 1.0)  # Volume 0-1
-
-        # Queue the command
-        engine.say(text)
-        
-        # Block until finished
-        engine.runAndWait()
-        
-        # Stop the loop (important if we re-initialize)
-        engine.stop()
-        
-        logger.info(f"Spoken: {text}")
-        
-    except Exception as e:
-        logger.error(f"TTS Error: {e}")
+    return _enqueue(text, priority, cache=cache)
+
+
+def prerender(texts):
+    """
+    Renders texts into the audio cache in the background (lowest priority).
+    Returns the handles; no-op if no audio player is available.
+    """
+    if not _cache_enabled():
+        return []
+    return [_enqueue(text, Priority.PRERENDER, render_only=True) for text in texts]
+
+
+def stats():
+    """Queue depth, counts, cache hits and latency (seconds from speak() to first word, and per-chunk duration)."""
+    with _stats_lock:
+        waits = sorted(_wait_latencies)
+        durations = sorted(_speech_durations)
+        return {
+            **_counts,
+            "queued": _queue.qsize(),
+            "latency_p50": waits[len(waits) // 2] if waits else None,
+            "latency_p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+            "latency_max": waits[-1] if waits else None,
+            "duration_p50": durations[len(durations) // 2] if durations else None,
+        }
+
+
+def shutdown(timeout=2):
+    """Stops the worker; utterances still queued are dropped (their handles complete with ok=False)."""
+    global _worker
+    with _worker_lock:
+        worker, _worker = _worker, None
+    if worker is None:
+        return
+    _queue.put((_STOP, next(_sequence), None, None))
+    worker.join(timeout)
+    logger.info(f"Voice worker stopped: {stats()}")
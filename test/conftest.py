@@ -0,0 +1,43 @@
+"""
+Keeps test runs out of the user's data directory: logs and the database go to a
+temporary directory for the whole session (some legacy test modules do their work at
+import time), and every test gets a fresh one of its own.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import logger as athena_logger
+from modules import database
+from temp_data import use_data_dir
+
+_saved = (os.path.dirname(athena_logger.DECISION_LOG), database.DB_PATH)
+_session_dir = None
+
+
+def pytest_configure(config):
+    global _session_dir
+    _session_dir = tempfile.mkdtemp(prefix="athena_test_")
+    use_data_dir(_session_dir)
+
+
+def pytest_unconfigure(config):
+    athena_logger.configure_log_dir(_saved[0])
+    database.DB_PATH = _saved[1]
+    database.close_connection()
+    shutil.rmtree(_session_dir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path):
+    use_data_dir(str(tmp_path))
+    try:
+        yield tmp_path
+    finally:
+        database.close_connection()
+        use_data_dir(_session_dir)
@@ -0,0 +1,281 @@
+"""
+Fake LM Studio: a local OpenAI-compatible server for offline tests and benchmarks.
+
+Serves /v1/models, /v1/chat/completions and /v1/embeddings.
+Responses come from (in order):
+1. A recording (JSONL) captured from a real LM Studio, replayed with its original timing.
+2. A `responder` callable supplied by the test.
+3. A generic canned reply.
+
+Timing for non-replayed responses is synthetic: `latency` seconds to first token
+plus `completion_tokens / tokens_per_second`.
+
+Usage:
+    python test/fake_llm.py --port 1235                                       # Synthetic
+    python test/fake_llm.py --port 1235 --replay data/logs/llm_recording.jsonl
+    python test/fake_llm.py --port 1235 --record http://localhost:1234/v1 --out data/logs/llm_recording.jsonl
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+DEFAULT_EMBEDDING_DIM = 768
+DEFAULT_MODEL_ID = "fake/athena-bench"
+
+
+def request_key(endpoint, body):
+    """
+    Stable key for matching a request against a recording.
+    Only the parts that decide the answer are hashed (messages / embedding input).
+    """
+    if endpoint.endswith("/embeddings"):
+        material = {"input": body.get("input")}
+    else:
+        material = {"messages": body.get("messages")}
+    blob = json.dumps(material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text or "") // 4)
+
+
+def fake_embedding(text, dim=DEFAULT_EMBEDDING_DIM):
+    """Deterministic unit-length pseudo-embedding derived from the text hash."""
+    import numpy as np
+    seed = int(hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:8], 16)
+    vec = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    vec /= np.linalg.norm(vec)
+    return vec.tolist()
+
+
+def load_recording(path):
+    """Loads a JSONL recording into {key: entry}. Later entries win."""
+    entries = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    entries[entry["key"]] = entry
+    return entries
+
+
+class FakeLLMServer:
+    """
+    Runs the fake server on a background thread.
+
+    Args:
+        port: TCP port (0 picks a free one).
+        responder: Optional callable(endpoint, body) -> str | None returning chat content.
+        replay: Optional path to a JSONL recording.
+        replay_timing: If True, replayed responses sleep for their recorded duration.
+        latency: Seconds before the first token for synthetic responses.
+        tokens_per_second: Generation rate for synthetic responses (None = instant).
+        record_upstream: If set, proxy to this base URL and append to `record_path`.
+        record_path: Where recorded exchanges are written.
+        embedding_dim: Dimension of synthetic embeddings.
+    """
+
+    def __init__(self, port=0, responder=None, replay=None, replay_timing=True,
+                 latency=0.0, tokens_per_second=None, record_upstream=None,
+                 record_path=None, embedding_dim=DEFAULT_EMBEDDING_DIM,
+                 model_id=DEFAULT_MODEL_ID):
+        self.responder = responder
+        self.recording = load_recording(replay)
+        self.replay_timing = replay_timing
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.record_upstream = record_upstream.rstrip("/") if record_upstream else None
+        self.record_path = record_path
+        self.embedding_dim = embedding_dim
+        self.model_id = model_id
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send({"object": "list", "data": [{"id": server.model_id, "object": "model"}]})
+                else:
+                    self._send({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.rstrip("/")
+                try:
+                    payload = server.handle(path, body)
+                except Exception as e:
+                    self._send({"error": str(e)}, status=500)
+                    return
+                if payload is None:
+                    self._send({"error": "not found"}, status=404)
+                else:
+                    self._send(payload)
+
+            def _send(self, payload, status=200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}/v1"
+        self._thread = None
+
+    # Lifecycle
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Request handling
+    def handle(self, path, body):
+        with self._lock:
+            self.request_count += 1
+
+        if self.record_upstream:
+            return self._proxy_and_record(path, body)
+
+        entry = self.recording.get(request_key(path, body))
+        if entry is not None:
+            if self.replay_timing:
+                time.sleep(entry.get("elapsed", 0.0))
+            return entry["response"]
+
+        if path.endswith("/embeddings"):
+            return self._synthetic_embeddings(body)
+        if path.endswith("/chat/completions"):
+            return self._synthetic_chat(path, body)
+        return None
+
+    def _synthetic_chat(self, path, body):
+        content = None
+        if self.responder:
+            content = self.responder(path, body)
+        if content is None:
+            content = "OK."
+
+        completion_tokens = estimate_tokens(content)
+        prompt_tokens = sum(estimate_tokens(m.get("content")) for m in body.get("messages", []))
+        # Honour max_tokens like a real server would (probes send max_tokens=1)
+        max_tokens = body.get("max_tokens")
+        if max_tokens:
+            completion_tokens = min(completion_tokens, max_tokens)
+
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += completion_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+
+        return {
+            "id": f"chatcmpl-fake-{self.request_count}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or self.model_id,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _synthetic_embeddings(self, body):
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return {
+            "object": "list",
+            "model": body.get("model") or self.model_id,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text, self.embedding_dim)}
+                for i, text in enumerate(inputs or [])
+            ],
+            "usage": {"prompt_tokens": sum(estimate_tokens(t) for t in inputs or []), "total_tokens": 0},
+        }
+
+    def _proxy_and_record(self, path, body):
+        # Path arrives as /v1/...; upstream already ends in /v1
+        suffix = path.split("/v1", 1)[-1]
+        start = time.perf_counter()
+        response = requests.post(f"{self.record_upstream}{suffix}", json=body, timeout=300)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        payload = response.json()
+
+        entry = {"key": request_key(path, body), "endpoint": suffix, "elapsed": elapsed, "response": payload}
+        self.recording[entry["key"]] = entry
+        if self.record_path:
+            with self._lock, open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LM Studio server.")
+    parser.add_argument("--port", type=int, default=1235)
+    parser.add_argument("--replay", help="JSONL recording to replay")
+    parser.add_argument("--no-replay-timing", action="store_true", help="Replay instantly instead of with recorded timing")
+    parser.add_argument("--latency", type=float, default=0.0, help="Synthetic time-to-first-token (seconds)")
+    parser.add_argument("--tps", type=float, default=None, help="Synthetic tokens per second")
+    parser.add_argument("--record", metavar="UPSTREAM", help="Proxy to a real server (e.g. http://localhost:1234/v1) and record")
+    parser.add_argument("--out", default="llm_recording.jsonl", help="Recording output path (with --record)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        port=args.port,
+        replay=args.replay,
+        replay_timing=not args.no_replay_timing,
+        latency=args.latency,
+        tokens_per_second=args.tps,
+        record_upstream=args.record,
+        record_path=args.out if args.record else None,
+    )
+    print(f"Fake LM Studio listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
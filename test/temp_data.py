@@ -0,0 +1,40 @@
+"""
+Shared test isolation: logs and the database live in a temporary data directory.
+Under pytest the autouse fixture in conftest.py does this for every test; the
+`python test/test_*.py` runners use run_isolated() to get the same behaviour.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import logger as athena_logger
+from modules import database
+
+
+def use_data_dir(directory):
+    athena_logger.configure_log_dir(os.path.join(directory, "logs"))
+    database.DB_PATH = os.path.join(directory, "knowledge_db", "athena.db")
+
+
+@contextlib.contextmanager
+def temp_data_dir():
+    """Points logs and the database at a fresh temporary directory, then restores the previous ones."""
+    saved = (os.path.dirname(athena_logger.DECISION_LOG), database.DB_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        use_data_dir(tmp)
+        try:
+            yield tmp
+        finally:
+            database.close_connection()
+            athena_logger.configure_log_dir(saved[0])
+            database.DB_PATH = saved[1]
+
+
+def run_isolated(*tests):
+    """Script runner: calls each test in its own temporary data directory."""
+    for test in tests:
+        with temp_data_dir():
+            test()
@@ -0,0 +1,130 @@
+"""
+Semantic answer cache: a reworded knowledge question answered from the same chunks
+reuses the cached answer without generation; time/date questions are never cached,
+and re-ingesting changed notes invalidates the answers built from them.
+Runs against the fake LM Studio server with a bag-of-words embedding.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import engine
+from modules import answer_cache, database, librarian, memory
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace
+from test_retrieval import bow_embedding
+
+
+def test_similar_questions_hit_until_notes_change():
+    generations = []
+
+    def responder(path, body):
+        generations.append(body["messages"][-1]["content"])
+        return f"Answer {len(generations)}"
+
+    saved = (librarian.get_embedding, answer_cache.ANSWER_CACHE_SIMILARITY)
+    with FakeLLMServer(responder=responder) as server, athena_workspace(server.url) as workdir:
+        librarian.get_embedding = bow_embedding
+        answer_cache.ANSWER_CACHE_SIMILARITY = 0.8
+        try:
+            ask = engine.generate_answer_from_notes
+            assert ask("Where does the Librarian store vectors?") == "Answer 1"
+            assert ask("Where does the Librarian store its vectors?") == "Answer 1" # Cached
+            assert ask("What fires reminders in the background?") == "Answer 2" # Not similar
+            assert len(generations) == 2
+
+            # Time and date answers go stale: always generated
+            assert ask("What time is it now?") == "Answer 3"
+            assert ask("What time is it now?") == "Answer 4"
+
+            # Changed notes: re-ingestion invalidates answers built from the old chunks
+            conn = database.get_connection()
+            assert conn.execute("SELECT COUNT(*) FROM answer_cache").fetchone()[0] == 2
+            with open(os.path.join(workdir, "data", "notes", "athena.txt"), "a", encoding="utf-8") as f:
+                f.write("\n\nVectors are backed up to the NAS every night.")
+            assert ask("Where does the Librarian store its vectors?") == "Answer 5"
+            assert conn.execute("SELECT COUNT(*) FROM answer_cache_chunks WHERE answer_id NOT IN (SELECT id FROM answer_cache)").fetchone()[0] == 0
+            assert ask("Where does the Librarian store vectors?") == "Answer 5"
+        finally:
+            librarian.get_embedding, answer_cache.ANSWER_CACHE_SIMILARITY = saved
+
+
+def test_new_relevant_history_is_a_cache_miss():
+    generations = []
+
+    def responder(path, body):
+        generations.append(body["messages"][-1]["content"])
+        return f"Answer {len(generations)}"
+
+    saved = librarian.get_embedding
+    with FakeLLMServer(responder=responder) as server, athena_workspace(server.url):
+        librarian.get_embedding = bow_embedding
+        try:
+            ask = engine.generate_answer_from_notes
+            assert ask("Where does the Librarian store vectors?") == "Answer 1"
+            assert ask("Where does the Librarian store vectors?") == "Answer 1"
+
+            # A past exchange about the same subject now lands in the prompt: answer again
+            memory.remember("The Librarian vectors moved to the NAS", "Noted.")
+            assert ask("Where does the Librarian store vectors?") == "Answer 2"
+            assert "User: The Librarian vectors moved to the NAS" in generations[-1]
+            assert ask("Where does the Librarian store vectors?") == "Answer 2" # Same history: cached
+        finally:
+            librarian.get_embedding = saved
+
+
+def test_remembered_turns_do_not_defeat_the_cache():
+    # The interactive loop remembers every answered turn before the next question
+    generations = []
+
+    def responder(path, body):
+        generations.append(body["messages"][-1]["content"])
+        return f"Answer {len(generations)}"
+
+    saved = librarian.get_embedding
+    with FakeLLMServer(responder=responder) as server, athena_workspace(server.url):
+        librarian.get_embedding = bow_embedding
+        try:
+            for question in ["Where does the Librarian store vectors?", "Where does the Librarian store its vectors?"] * 3:
+                answer = engine.generate_answer_from_notes(question)
+                assert answer == "Answer 1"
+                memory.remember(question, answer)
+            assert len(generations) == 1
+            assert "User: Where does the Librarian store vectors?" not in generations[0]
+        finally:
+            librarian.get_embedding = saved
+
+
+def test_chunk_edits_and_capacity():
+    with FakeLLMServer() as server, athena_workspace(server.url):
+        database.init_schema()
+        conn = database.get_connection()
+        with conn:
+            ids = [conn.execute("INSERT INTO knowledge (source, content) VALUES ('a.txt', ?)", (text,)).lastrowid for text in ("x", "y")]
+        vector = bow_embedding("where is x")
+        answer_cache.store("where is x", vector, ids, "In x.")
+        assert answer_cache.lookup(vector, ids) == "In x."
+        assert answer_cache.lookup(vector, ids[:1]) is None # Different chunk set
+        assert answer_cache.lookup(vector, ids, profile='{"user_name": "Sam"}') is None
+
+        with conn:
+            conn.execute("UPDATE knowledge SET content = 'x2' WHERE id = ?", (ids[0],))
+        assert answer_cache.lookup(vector, ids) is None
+
+        saved = answer_cache.ANSWER_CACHE_MAX_ENTRIES
+        answer_cache.ANSWER_CACHE_MAX_ENTRIES = 3
+        try:
+            for i in range(5):
+                answer_cache.store(f"question {i}", bow_embedding(f"question {i}"), ids, f"answer {i}")
+        finally:
+            answer_cache.ANSWER_CACHE_MAX_ENTRIES = saved
+        assert [row[0] for row in conn.execute("SELECT answer FROM answer_cache ORDER BY id")] == ["answer 2", "answer 3", "answer 4"]
+
+
+if __name__ == "__main__":
+    test_similar_questions_hit_until_notes_change()
+    test_new_relevant_history_is_a_cache_miss()
+    test_remembered_turns_do_not_defeat_the_cache()
+    test_chunk_edits_and_capacity()
+    print("Answer cache OK")
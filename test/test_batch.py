@@ -0,0 +1,83 @@
+"""
+Batch mode: utterances from a file run through the normal turn on several workers,
+results come back as ordered JSONL with per-stage timings, plus a throughput summary.
+Runs against the fake LM Studio server.
+"""
+import io
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import batch, monitor
+from modules import database, scheduler
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import CORPUS, make_responder, athena_workspace
+
+
+def test_utterance_sources():
+    lines = [
+        "# regression set\n",
+        "Remind me to call John in 20 minutes\n",
+        "\n",
+        '{"role": "user", "text": "Do I have any tasks?"}\n',
+        '{"role": "athena", "text": "You have no upcoming tasks."}\n',
+        "{not json} still an utterance\n",
+    ]
+    assert list(batch.iter_utterances(lines)) == [
+        "Remind me to call John in 20 minutes", "Do I have any tasks?", "{not json} still an utterance",
+    ]
+
+
+def test_concurrent_batch_writes_ordered_results():
+    import main
+    utterances = [utterance for utterance, _ in CORPUS] * 3 + ["gibberish that the model cannot classify"]
+    out = io.StringIO()
+    try:
+        with FakeLLMServer(responder=make_responder(CORPUS), latency=0.05) as server, athena_workspace(server.url):
+            summary = batch.run_batch(iter(utterances), out, main.handle_turn, concurrency=4, run_id="t")
+    finally:
+        monitor.set_state(monitor.State.IDLE)
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [record["input"] for record in records] == utterances
+    assert [record["turn_id"] for record in records][:2] == ["t-0", "t-1"]
+    assert all(record["error"] is None for record in records)
+    assert records[0]["understood"] and records[0]["response"].startswith("Saved.")
+    assert records[0]["stages_ms"]["llm.nlu"] >= 50 and "db.add_task" in records[0]["stages_ms"]
+    assert "embedding" in records[7]["stages_ms"] # Knowledge question
+
+    assert summary["turns"] == len(utterances) and summary["errors"] == 0
+    assert summary["stages_ms"]["nlu"]["count"] == len(utterances)
+    # 31 turns of >= 50 ms LLM latency on 4 workers: well under the serial time
+    assert summary["seconds"] < len(utterances) * 0.05
+    report = batch.format_summary(summary)
+    assert "turns/s" in report and "llm.nlu" in report
+
+
+def test_batch_runs_on_a_scratch_copy_of_the_database():
+    import datetime
+    import main
+    with FakeLLMServer(responder=make_responder(CORPUS)) as server, athena_workspace(server.url):
+        live_path = database.DB_PATH
+        scheduler.add_task("Existing", datetime.datetime.now() + datetime.timedelta(hours=2))
+        try:
+            with batch.scratch_database() as scratch_path:
+                assert database.DB_PATH == scratch_path != live_path
+                assert [task["task"] for task in scheduler.get_pending_tasks()] == ["Existing"] # A copy
+                summary = batch.run_batch(iter(["Remind me to call John in 20 minutes"]), io.StringIO(), main.handle_turn)
+                assert summary["understood"] == 1
+                assert len(scheduler.get_pending_tasks()) == 2
+        finally:
+            monitor.set_state(monitor.State.IDLE)
+        assert database.DB_PATH == live_path
+        assert [task["task"] for task in scheduler.get_pending_tasks()] == ["Existing"]
+        assert not os.path.exists(scratch_path)
+
+
+if __name__ == "__main__":
+    test_utterance_sources()
+    test_concurrent_batch_writes_ordered_results()
+    test_batch_runs_on_a_scratch_copy_of_the_database()
+    print("Batch OK")
@@ -0,0 +1,133 @@
+"""
+Bulk calendar import/export: ICS and CSV files are streamed into the schedule with
+executemany in large transactions, and the schedule streams back out.
+Includes the 100k-event throughput check.
+
+Usage:
+    python test/test_calendar_io.py --events 100000
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules import calendar_io, database, scheduler
+from temp_data import temp_data_dir
+
+THROUGHPUT_EVENTS = 100_000
+# Events per second, end to end (parse + insert), on a modest laptop
+MIN_IMPORT_RATE = 20_000
+MIN_EXPORT_RATE = 50_000
+
+SAMPLE_ICS = (
+    "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+    "BEGIN:VEVENT\r\nUID:1\r\nDTSTART:{soon}\r\n"
+    "SUMMARY:Dentist\\, bring the X-rays and the insurance card and the signed form\r\n"
+    " s from last visit\r\n"
+    "BEGIN:VALARM\r\nTRIGGER:-PT15M\r\nDESCRIPTION:Alarm text\r\nEND:VALARM\r\n"
+    "END:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:2\r\nDTSTART;TZID=Europe/Berlin:20200106T090000\r\n"
+    "SUMMARY:Stand-up\r\nRRULE:FREQ=WEEKLY;BYDAY=MO\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:3\r\nDTSTART:20200101T120000Z\r\nSUMMARY:Old lunch\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:4\r\nDTSTART:not-a-date\r\nSUMMARY:Broken\r\nEND:VEVENT\r\n"
+    "BEGIN:VEVENT\r\nUID:5\r\nDTSTART:20300101\r\nSUMMARY:Counted\r\nRRULE:FREQ=DAILY;COUNT=3\r\nEND:VEVENT\r\n"
+    "END:VCALENDAR\r\n"
+)
+
+
+def write_events_ics(path, count, start):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Bench//EN\r\n")
+        for i in range(count):
+            when = (start + datetime.timedelta(minutes=30 * i)).strftime("%Y%m%dT%H%M%S")
+            f.write(f"BEGIN:VEVENT\r\nUID:bench-{i}@bench\r\nDTSTAMP:20240101T000000Z\r\nDTSTART:{when}\r\n"
+                    f"DTEND:{when}\r\nSUMMARY:Meeting {i}\r\nEND:VEVENT\r\n")
+        f.write("END:VCALENDAR\r\n")
+
+
+def run_throughput(events):
+    """Imports `events` ICS events, exports them to CSV and re-imports the CSV. Returns {step: (count, seconds)}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ics_path, csv_path = os.path.join(tmp, "bench.ics"), os.path.join(tmp, "bench.csv")
+        write_events_ics(ics_path, events, datetime.datetime(2020, 1, 1, 9, 0))
+
+        def timed(step, fn):
+            start = time.perf_counter()
+            count = fn()
+            results[step] = (count, time.perf_counter() - start)
+
+        scheduler.init_db()
+        timed("import_ics", lambda: calendar_io.import_file(ics_path)[0])
+        timed("export_csv", lambda: calendar_io.export_file(csv_path))
+        database.get_connection().execute("DELETE FROM schedule").connection.commit()
+        timed("import_csv", lambda: calendar_io.import_file(csv_path)[0])
+    return results
+
+
+def format_report(results):
+    lines = [f"{'step':<12}{'events':>10}{'seconds':>10}{'events/s':>12}"]
+    for step, (count, seconds) in results.items():
+        lines.append(f"{step:<12}{count:>10}{seconds:>10.2f}{count / seconds:>12.0f}")
+    return "\n".join(lines)
+
+
+def test_ics_import_semantics_and_roundtrip():
+    soon = (datetime.datetime.now() + datetime.timedelta(minutes=5)).replace(microsecond=0)
+    notified = []
+    listener = lambda task_id, name, when: notified.append(name)
+
+    scheduler.init_db()
+    scheduler.add_task_listener(listener)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cal.ics")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(SAMPLE_ICS.format(soon=soon.strftime("%Y%m%dT%H%M%S")))
+            assert calendar_io.import_file(path) == (4, 1) # Broken date skipped
+
+            tasks = {task["task"]: task for task in scheduler.iter_tasks()}
+            dentist = "Dentist, bring the X-rays and the insurance card and the signed forms from last visit"
+            assert tasks[dentist]["time"] == soon and tasks[dentist]["status"] == "pending"
+            assert tasks["Old lunch"]["status"] == "completed"
+            standup = tasks["Stand-up"]
+            assert standup["status"] == "pending" and standup["time"] > datetime.datetime.now()
+            assert standup["time"].weekday() == 0
+            # COUNT=3 is imported as the equivalent UNTIL (last of the three occurrences)
+            counted = tasks["Counted"]
+            assert counted["time"] == datetime.datetime(2030, 1, 1)
+            assert counted["recurrence"] == "FREQ=DAILY;UNTIL=20300103T000000"
+            assert notified == [dentist] # Only tasks due within the Monitor's horizon
+
+            out = os.path.join(tmp, "out.ics")
+            assert calendar_io.export_file(out) == 4
+            with open(out, encoding="utf-8", newline="") as f:
+                assert all(len(line.encode("utf-8")) <= 77 for line in f) # 75 octets + CRLF
+            database.get_connection().execute("DELETE FROM schedule").connection.commit()
+            assert calendar_io.import_file(out) == (4, 0)
+            assert {task["task"] for task in scheduler.iter_tasks(pending_only=True)} == {dentist, "Stand-up", "Counted"}
+    finally:
+        scheduler.remove_task_listener(listener)
+
+
+def test_100k_event_throughput():
+    results = run_throughput(THROUGHPUT_EVENTS)
+    print("\n" + format_report(results))
+    for step in ("import_ics", "export_csv", "import_csv"):
+        assert results[step][0] == THROUGHPUT_EVENTS, step
+    assert THROUGHPUT_EVENTS / results["import_ics"][1] > MIN_IMPORT_RATE
+    assert THROUGHPUT_EVENTS / results["import_csv"][1] > MIN_IMPORT_RATE
+    assert THROUGHPUT_EVENTS / results["export_csv"][1] > MIN_EXPORT_RATE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Athena calendar import/export throughput")
+    parser.add_argument("--events", type=int, default=THROUGHPUT_EVENTS)
+    args = parser.parse_args()
+    with temp_data_dir():
+        print(format_report(run_throughput(args.events)))
@@ -0,0 +1,113 @@
+"""
+SQLite contention benchmark: the Monitor thread and knowledge ingestion hitting
+athena.db at the same time as the main thread schedules tasks.
+
+Usage:
+    python test/test_db_contention.py --seconds 5
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules import database, scheduler
+from temp_data import temp_data_dir
+from test_e2e_benchmark import percentile
+
+# p99 of any single operation while all three threads are busy
+CONTENTION_P99_BUDGET_SECONDS = 0.25
+
+
+def run_contention(seconds=2.0, ingest_batch=50):
+    """Returns ({op: [durations]}, error_count)."""
+    timings = defaultdict(list)
+    errors = []
+    stop = threading.Event()
+    lock = threading.Lock()
+
+    def record(op, start):
+        with lock:
+            timings[op].append(time.perf_counter() - start)
+
+    def monitor_loop():
+        # Reconcile + complete due tasks, like the Monitor thread
+        try:
+            while not stop.is_set():
+                start = time.perf_counter()
+                tasks = scheduler.get_pending_tasks(until=datetime.datetime.now())
+                record("monitor_read", start)
+                for task in tasks:
+                    start = time.perf_counter()
+                    scheduler.mark_task_complete(task['id'])
+                    record("monitor_complete", start)
+        finally:
+            database.close_connection()
+
+    def ingest_loop():
+        try:
+            conn = database.get_connection()
+            n = 0
+            while not stop.is_set():
+                rows = [("bench.txt", f"Paragraph {n + i} " + "lorem ipsum " * 20) for i in range(ingest_batch)]
+                n += ingest_batch
+                start = time.perf_counter()
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO knowledge (source, content) VALUES (?, ?)", rows)
+                except sqlite3.Error as e:
+                    errors.append(e)
+                record("ingest_batch", start)
+        finally:
+            database.close_connection()
+
+    scheduler.init_db()
+    threads = [threading.Thread(target=monitor_loop), threading.Thread(target=ingest_loop)]
+    for t in threads:
+        t.start()
+
+    end = time.time() + seconds
+    while time.time() < end:
+        start = time.perf_counter()
+        if not scheduler.add_task("Bench task", datetime.datetime.now()):
+            errors.append("add_task failed")
+        record("add_task", start)
+
+    stop.set()
+    for t in threads:
+        t.join()
+    return timings, len(errors)
+
+
+def format_report(timings, seconds):
+    lines = [f"{'operation':<18}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}"]
+    for op, samples in sorted(timings.items()):
+        lines.append(f"{op:<18}{len(samples) / seconds:>10.0f}{percentile(samples, 50) * 1000:>10.2f}{percentile(samples, 99) * 1000:>10.2f}")
+    return "\n".join(lines)
+
+
+def test_concurrent_monitor_and_ingestion():
+    seconds = 1.5
+    timings, error_count = run_contention(seconds)
+    print("\n" + format_report(timings, seconds))
+
+    assert error_count == 0
+    assert {"add_task", "monitor_read", "ingest_batch"} <= set(timings)
+    for op, samples in timings.items():
+        assert percentile(samples, 99) < CONTENTION_P99_BUDGET_SECONDS, f"{op} p99 over budget"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Athena SQLite contention benchmark")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    with temp_data_dir():
+        timings, error_count = run_contention(args.seconds)
+    print(format_report(timings, args.seconds))
+    print(f"errors: {error_count}")
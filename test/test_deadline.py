@@ -0,0 +1,76 @@
+"""
+Turn deadline: a slow model must not push a turn past its budget.
+Runs offline against the fake LM Studio with a deliberately slow model.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace, make_responder, CORPUS
+
+from core import engine, router
+from core import logger as athena_logger
+from core.deadline import Deadline
+from config import MIN_LLM_STAGE_SECONDS
+from modules import scheduler
+
+# Enough budget to attempt the LLM call, but the model answers after the budget ran out
+BUDGET_SECONDS = 2.5
+SLOW_MODEL_SECONDS = 4.0
+
+
+def degrade_decisions():
+    athena_logger.flush_logs()
+    if not os.path.exists(athena_logger.DECISION_LOG):
+        return []
+    with open(athena_logger.DECISION_LOG, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return [r["result"] for r in records if r.get("state") == "DEADLINE" and r.get("action") == "DEGRADE"]
+
+
+def test_deadline_bounds_slow_turns():
+    assert BUDGET_SECONDS > MIN_LLM_STAGE_SECONDS # The LLM call is attempted, then times out
+    with FakeLLMServer(responder=make_responder(CORPUS), latency=SLOW_MODEL_SECONDS) as server, \
+            athena_workspace(server.url):
+        # NLU times out and falls back to the rule-based classifier
+        start = time.perf_counter()
+        nlu = engine.process_input("Remind me to call John in 20 minutes", deadline=Deadline(BUDGET_SECONDS))
+        assert BUDGET_SECONDS - 0.1 < time.perf_counter() - start < BUDGET_SECONDS + 0.5
+        assert server.request_count == 1
+        assert nlu["intent"] == "schedule_add"
+        assert nlu["relative_time"] == "in 20 minutes"
+        assert degrade_decisions()[-1] == "NLU timed out, using rule-based intent"
+
+        # Open-ended schedule question: the summary times out and degrades to the templated list
+        when = (datetime.now() + timedelta(hours=1)).replace(second=0, microsecond=0)
+        assert scheduler.add_task("Standup", when)
+        start = time.perf_counter()
+        reply = router.route_intent({"intent": "query_schedule", "original_input": "Summarize my plans in one sentence"},
+                                    deadline=Deadline(BUDGET_SECONDS))
+        assert time.perf_counter() - start < BUDGET_SECONDS + 0.5
+        assert server.request_count == 2
+        assert reply == f"Here is your schedule: {when:%Y-%m-%d %H:%M}: Standup (Status: pending)."
+        assert degrade_decisions()[-1] == "Summary timed out, using template"
+
+
+def test_exhausted_deadline_skips_llm():
+    with FakeLLMServer(responder=make_responder(CORPUS)) as server, athena_workspace(server.url):
+        nlu = engine.process_input("Turn on deep work", deadline=Deadline(0))
+        assert nlu["intent"] == "state_change" and nlu["new_state"] == "DEEP_WORK"
+        assert server.request_count == 0
+
+        reply = engine.generate_summary("[DATA START]\n- 10:00: Standup (Status: pending)\n[DATA END]", deadline=Deadline(0))
+        assert reply == "Here is your schedule: 10:00: Standup (Status: pending)."
+        assert server.request_count == 0
+
+
+if __name__ == "__main__":
+    test_deadline_bounds_slow_turns()
+    test_exhausted_deadline_skips_llm()
+    print("Deadline tests passed.")
@@ -0,0 +1,239 @@
+"""
+End-to-end latency benchmark: engine + router + scheduler + librarian, per intent.
+Runs fully offline against the fake LM Studio in test/fake_llm.py.
+
+Usage:
+    python test/test_e2e_benchmark.py                        # Zero-latency (pure Athena overhead)
+    python test/test_e2e_benchmark.py --latency 0.3 --tps 40 # Simulated local model
+    python test/test_e2e_benchmark.py --replay data/logs/llm_recording.jsonl
+
+Under pytest, the benchmark runs with a zero-latency model and checks the
+per-turn overhead against E2E_OVERHEAD_BUDGET_SECONDS.
+"""
+import argparse
+import contextlib
+import functools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer
+
+# Athena overhead per turn (p95) with an instant model. Generous for slow CI boxes.
+E2E_OVERHEAD_BUDGET_SECONDS = 2.0
+
+NOTES = """Project Athena is an offline-first assistant built on LM Studio.
+
+The Librarian stores notes in SQLite and vectors in FAISS.
+
+The Heart is a background monitor that fires reminders."""
+
+# Utterance -> NLU output the fake model should return
+CORPUS = [
+    ("Remind me to call John in 20 minutes", {"intent": "schedule_add", "task_name": "Call John", "relative_time": "20 minutes"}),
+    ("Set a reminder for 5 seconds", {"intent": "schedule_add", "task_name": "Reminder", "relative_time": "5 seconds"}),
+    ("Remind me to check emails at 5 PM", {"intent": "schedule_add", "task_name": "Check emails", "relative_time": "at 5 PM"}),
+    ("Do I have any tasks?", {"intent": "query_schedule", "task_name": None, "relative_time": None}),
+    ("What is on my schedule today?", {"intent": "query_schedule", "task_name": None, "relative_time": None}),
+    ("Turn on deep work", {"intent": "state_change", "new_state": "DEEP_WORK"}),
+    ("Go back to idle", {"intent": "state_change", "new_state": "IDLE"}),
+    ("What is Project Athena?", {"intent": "knowledge_query", "task_name": None, "relative_time": None}),
+    ("Where are vectors stored?", {"intent": "knowledge_query", "task_name": None, "relative_time": None}),
+    ("Always use 12 hour format", {"intent": "preference_update", "preference_data": "Always use 12 hour format"}),
+]
+
+# (label, module path, attribute) - wrapped with timers during the run
+STAGES = [
+    ("nlu", "core.engine", "process_input"),
+    ("route", "core.router", "route_intent"),
+    ("sanitize", "modules.sanitizer", "parse_relative_time"),
+    ("db_write", "modules.scheduler", "add_task"),
+    ("db_read", "modules.scheduler", "get_today_summary"),
+    ("summarize", "core.engine", "generate_summary"),
+    ("answer", "core.engine", "generate_answer_from_notes"),
+    ("ingest", "modules.librarian", "ingest_file"),
+    ("retrieve", "modules.librarian", "query_knowledge"),
+]
+
+
+def make_responder(corpus):
+    """Answers NLU prompts from the corpus and everything else with a short canned reply."""
+    nlu_answers = {utterance: json.dumps(nlu) for utterance, nlu in corpus}
+
+    def responder(path, body):
+        messages = body.get("messages", [])
+        is_nlu = any(m.get("role") == "system" and "You are a scheduler" in (m.get("content") or "") for m in messages)
+        if is_nlu:
+            return nlu_answers.get(messages[-1]["content"], '{"intent": "unknown"}')
+        return "You have a couple of things coming up."
+
+    return responder
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+@contextlib.contextmanager
+def athena_workspace(llm_url):
+    """
+    Isolated data directory and LM Studio URL for one benchmark run.
+    Athena resolves data/ relative to the working directory, so we chdir into a temp tree.
+    """
+    import importlib
+    from openai import OpenAI
+
+    workdir = tempfile.mkdtemp(prefix="athena_bench_")
+    for sub in ("knowledge_db", "logs", "notes", "vector_store"):
+        os.makedirs(os.path.join(workdir, "data", sub), exist_ok=True)
+    with open(os.path.join(workdir, "data", "notes", "athena.txt"), "w", encoding="utf-8") as f:
+        f.write(NOTES)
+    with open(os.path.join(workdir, "data", "profile.json"), "w") as f:
+        json.dump({"user_name": "Bench", "learned_preferences": {}}, f)
+
+    db_path = os.path.join(workdir, "data", "knowledge_db", "athena.db")
+    engine = importlib.import_module("core.engine")
+    database = importlib.import_module("modules.database")
+    scheduler = importlib.import_module("modules.scheduler")
+    librarian = importlib.import_module("modules.librarian")
+
+    saved = {
+        (engine, "LM_STUDIO_URL"): engine.LM_STUDIO_URL,
+        (engine, "ACTIVE_MODEL_ID"): engine.ACTIVE_MODEL_ID,
+        (database, "DB_PATH"): database.DB_PATH,
+        (librarian, "client"): librarian.client,
+    }
+    old_cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        engine.LM_STUDIO_URL = llm_url
+        engine.ACTIVE_MODEL_ID = "fake/athena-bench"
+        database.DB_PATH = db_path
+        librarian.client = OpenAI(base_url=llm_url, api_key="lm-studio")
+        scheduler.init_db()
+        yield workdir
+    finally:
+        database.close_connection(db_path)
+        os.chdir(old_cwd)
+        for (module, attr), value in saved.items():
+            setattr(module, attr, value)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def stage_timers(sink):
+    """Wraps each STAGES function so every call appends its duration to sink[label]."""
+    import importlib
+    originals = []
+    for label, module_name, attr in STAGES:
+        module = importlib.import_module(module_name)
+        original = getattr(module, attr)
+
+        def timed(*args, _original=original, _label=label, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                sink[_label].append(time.perf_counter() - start)
+
+        functools.update_wrapper(timed, original)
+        setattr(module, attr, timed)
+        originals.append((module, attr, original))
+    try:
+        yield
+    finally:
+        for module, attr, original in originals:
+            setattr(module, attr, original)
+
+
+def run_benchmark(iterations=3, latency=0.0, tokens_per_second=None, replay=None, corpus=CORPUS):
+    """
+    Drives every corpus utterance through engine.process_input -> router.route_intent.
+    Returns {intent: {"count", "total": {p50,p95,p99,mean}, "stages": {label: mean}}}.
+    """
+    from core import engine, router, monitor
+
+    server = FakeLLMServer(
+        responder=make_responder(corpus),
+        replay=replay,
+        latency=latency,
+        tokens_per_second=tokens_per_second,
+    )
+    totals = defaultdict(list)
+    stages = defaultdict(lambda: defaultdict(list))
+
+    with server, athena_workspace(server.url):
+        for _ in range(iterations):
+            for utterance, _nlu in corpus:
+                sink = defaultdict(list)
+                with stage_timers(sink):
+                    start = time.perf_counter()
+                    nlu_data = engine.process_input(utterance)
+                    if "error" not in nlu_data:
+                        router.route_intent(nlu_data)
+                    elapsed = time.perf_counter() - start
+
+                intent = nlu_data.get("intent", "error")
+                totals[intent].append(elapsed)
+                for label, durations in sink.items():
+                    stages[intent][label].append(sum(durations))
+        monitor.set_state(monitor.State.IDLE)
+
+    report = {}
+    for intent, samples in totals.items():
+        report[intent] = {
+            "count": len(samples),
+            "total": {
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+                "mean": sum(samples) / len(samples),
+            },
+            "stages": {label: sum(v) / len(v) for label, v in stages[intent].items()},
+        }
+    return report
+
+
+def format_report(report):
+    lines = [f"{'intent':<18}{'n':>4}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}   stages (mean ms, inclusive)"]
+    for intent in sorted(report):
+        row = report[intent]
+        t = row["total"]
+        stage_str = ", ".join(f"{k}={v * 1000:.1f}" for k, v in sorted(row["stages"].items(), key=lambda kv: -kv[1]))
+        lines.append(f"{intent:<18}{row['count']:>4}{t['p50'] * 1000:>10.1f}{t['p95'] * 1000:>10.1f}{t['p99'] * 1000:>10.1f}   {stage_str}")
+    return "\n".join(lines)
+
+
+def test_e2e_overhead_within_budget():
+    report = run_benchmark(iterations=2)
+    print("\n" + format_report(report))
+
+    expected = {nlu["intent"] for _, nlu in CORPUS}
+    assert expected <= set(report), f"Missing intents in run: {expected - set(report)}"
+    for intent, row in report.items():
+        assert row["total"]["p95"] < E2E_OVERHEAD_BUDGET_SECONDS, f"{intent} p95 {row['total']['p95']:.3f}s over budget"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Athena end-to-end latency benchmark")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--tps", type=float, default=None)
+    parser.add_argument("--replay", default=None)
+    parser.add_argument("--json", action="store_true", help="Print the raw report as JSON")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.iterations, args.latency, args.tps, args.replay)
+    print(json.dumps(result, indent=2) if args.json else format_report(result))
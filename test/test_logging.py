@@ -0,0 +1,95 @@
+"""
+Logging: records are structured JSON lines written off the calling thread,
+and log files rotate by size and age into gzip-compressed segments.
+"""
+import gzip
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import logger as athena_logger
+from core.logger import RollingFileHandler, JsonFormatter
+
+
+def test_log_decision_is_structured_and_off_thread():
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = os.path.dirname(athena_logger.DECISION_LOG)
+        athena_logger.configure_log_dir(tmp)
+        try:
+            check_log_decision(tmp)
+        finally:
+            athena_logger.configure_log_dir(saved)
+
+
+def check_log_decision(log_dir):
+    writers = []
+    slow_handler = logging.Handler()
+    slow_handler.emit = lambda record: (time.sleep(0.01), writers.append(threading.current_thread().name))
+    athena_logger._listener.handlers += (slow_handler,)
+    try:
+        athena_logger.set_turn_id("turn-42")
+        start = time.perf_counter()
+        for i in range(20):
+            athena_logger.log_decision("router", "QUERY_SCHEDULE", "TEMPLATE", f"answer {i}")
+        assert time.perf_counter() - start < 0.05, "log_decision waited for I/O"
+        athena_logger.flush_logs()
+        assert len(writers) == 20
+        assert threading.current_thread().name not in writers
+    finally:
+        athena_logger._listener.handlers = athena_logger._listener.handlers[:-1]
+        athena_logger.set_turn_id(None)
+
+    with open(os.path.join(log_dir, "decision_trace.jsonl"), encoding="utf-8") as f:
+        last = json.loads(f.readlines()[-1])
+    assert last["component"] == "ROUTER"
+    assert last["state"] == "QUERY_SCHEDULE" and last["action"] == "TEMPLATE"
+    assert last["result"] == "answer 19"
+    assert last["turn_id"] == "turn-42"
+    assert "timestamp" in last
+
+
+def make_record(message, created=None):
+    record = logging.LogRecord("athena", logging.INFO, __file__, 0, message, None, None)
+    record.turn_id = None
+    if created is not None:
+        record.created = created
+    return record
+
+
+def test_rotation_by_size_and_age_compresses_segments():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "decision_trace.jsonl")
+        handler = RollingFileHandler(path, max_bytes=500, interval=3600, backup_count=3)
+        handler.setFormatter(JsonFormatter())
+        try:
+            for i in range(20):
+                handler.handle(make_record(f"entry {i:02d}"))
+            # Size: current file stays under the cap, older lines are in .gz segments
+            assert os.path.getsize(path) <= 500
+            assert os.path.exists(path + ".1.gz")
+            assert not os.path.exists(path + ".4.gz") # backup_count
+            with gzip.open(path + ".1.gz", "rt", encoding="utf-8") as f:
+                assert all(json.loads(line)["message"].startswith("entry") for line in f)
+
+            # Age: a record from the next period starts a new segment
+            with open(path + ".1.gz", "rb") as f:
+                previous = f.read()
+            handler.handle(make_record("next hour", created=time.time() + 3600))
+            with open(path, encoding="utf-8") as f:
+                assert [json.loads(line)["message"] for line in f] == ["next hour"]
+            with open(path + ".2.gz", "rb") as f:
+                assert f.read() == previous
+        finally:
+            handler.close()
+
+
+if __name__ == "__main__":
+    test_log_decision_is_structured_and_off_thread()
+    test_rotation_by_size_and_age_compresses_segments()
+    print("Logging OK")
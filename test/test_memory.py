@@ -0,0 +1,96 @@
+"""
+Conversation memory: exchanges are stored in SQLite with a full-text index (and
+optional embeddings), recall returns only the relevant ones, and knowledge answers
+get them as bounded prompt context. Runs against the fake LM Studio server.
+"""
+import hashlib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import memory
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace
+
+# Words with the same meaning share a dimension, so paraphrases embed close together
+CONCEPTS = {
+    "wifi": "network", "wi-fi": "network", "network": "network", "internet": "network",
+    "password": "secret", "credentials": "secret", "login": "secret", "passphrase": "secret",
+}
+
+
+def concept_embedding(text, timeout=None):
+    import numpy as np
+    from modules import librarian
+    vec = np.zeros(librarian.VECTOR_DIMENSION, dtype="float32")
+    for word in text.lower().replace("?", " ").replace(".", " ").split():
+        concept = CONCEPTS.get(word, word)
+        vec[int(hashlib.sha1(concept.encode()).hexdigest()[:6], 16) % len(vec)] += 1.0
+    return (vec / max(np.linalg.norm(vec), 1e-6)).tolist()
+
+
+EXCHANGES = [
+    ("My sister's birthday is on March 3rd", "Noted, March 3rd."),
+    ("What's the weather like?", "I can't check the weather."),
+    ("The wifi password is hunter2", "Got it."),
+    ("Remind me to water the plants", "Saved."),
+]
+
+
+def test_recall_is_relevant_and_bounded():
+    with FakeLLMServer() as server, athena_workspace(server.url):
+        for i, (user_text, athena_text) in enumerate(EXCHANGES):
+            assert memory.remember(user_text, athena_text, turn_id=f"t{i}", timestamp=1_700_000_000 + i * 86400)
+
+        found = memory.recall("When is my sister's birthday?")
+        assert found[0]["user_text"] == EXCHANGES[0][0] and found[0]["turn_id"] == "t0"
+        assert all("weather" not in row["user_text"] for row in found)
+
+        assert memory.recall("what is the wifi password", since=1_700_000_000 + 3 * 86400) == []
+        assert memory.recall("the of to") == [] # Only stopwords: nothing to match
+        assert memory.recall('password" OR *') # User text is never parsed as FTS syntax
+
+        rows = memory.recall("birthday wifi plants", limit=5)
+        assert len(rows) == 3
+        context = memory.format_exchanges(rows, max_chars=150)
+        assert context.count("User:") == 2 and len(context) <= 150
+
+
+def test_embeddings_find_paraphrases():
+    from modules import librarian
+    saved = (librarian.get_embedding, memory.MEMORY_EMBEDDINGS)
+    with FakeLLMServer() as server, athena_workspace(server.url):
+        librarian.get_embedding = concept_embedding
+        memory.MEMORY_EMBEDDINGS = True
+        try:
+            for user_text, athena_text in EXCHANGES:
+                memory.remember(user_text, athena_text)
+            # No shared keywords with "The wifi password is hunter2": only the embedding matches
+            assert memory.recall("internet login", limit=1)[0]["user_text"] == EXCHANGES[2][0]
+            assert memory.recall("network credentials", limit=1)[0]["user_text"] == EXCHANGES[2][0]
+        finally:
+            librarian.get_embedding, memory.MEMORY_EMBEDDINGS = saved
+
+
+def test_answers_include_relevant_history():
+    from core import engine
+    prompts = []
+
+    def responder(path, body):
+        prompts.append(body["messages"][-1]["content"])
+        return "March 3rd."
+
+    with FakeLLMServer(responder=responder) as server, athena_workspace(server.url):
+        for user_text, athena_text in EXCHANGES:
+            memory.remember(user_text, athena_text)
+        assert engine.generate_answer_from_notes("When is my sister's birthday?") == "March 3rd."
+    assert "User: My sister's birthday is on March 3rd" in prompts[-1]
+    assert "wifi" not in prompts[-1]
+
+
+if __name__ == "__main__":
+    test_recall_is_relevant_and_bounded()
+    test_embeddings_find_paraphrases()
+    test_answers_include_relevant_history()
+    print("Memory OK")
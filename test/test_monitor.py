@@ -0,0 +1,330 @@
+"""
+Monitor: reminders fire on time without polling.
+Uses a temporary database and captures notifications/speech instead of hitting the OS.
+"""
+import contextlib
+import datetime
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import monitor, learner
+from core.delivery import DeliveryWorkers, Channel
+from modules import scheduler, actions, voice
+from temp_data import run_isolated
+
+MAX_JITTER_SECONDS = 0.25
+
+
+@contextlib.contextmanager
+def live_monitor():
+    """Yields (heart, fired) for a running Monitor. fired: list of (task_name, epoch)."""
+    fired = []
+    saved = (actions.send_notification, voice.speak)
+    actions.send_notification = lambda title, message: fired.append((message, time.time()))
+    voice.speak = lambda text, **kwargs: None
+    scheduler.init_db()
+    heart = monitor.Monitor()
+    heart.start()
+    try:
+        yield heart, fired
+    finally:
+        heart.stop()
+        heart.join(timeout=5)
+        actions.send_notification, voice.speak = saved
+
+
+@contextlib.contextmanager
+def manual_monitor():
+    """
+    Yields (heart, notified, spoken) for a Monitor driven by hand (reconcile/check_schedule)
+    with live delivery workers. notified: (title, message); spoken: (text, cache).
+    """
+    notified, spoken = [], []
+    saved = (actions.send_notification, voice.speak)
+    actions.send_notification = lambda title, message: notified.append((title, message))
+    voice.speak = lambda text, **kwargs: spoken.append((text, kwargs.get("cache", False)))
+    scheduler.init_db()
+    heart = monitor.Monitor()
+    heart.delivery.start()
+    try:
+        yield heart, notified, spoken
+    finally:
+        monitor.set_state(monitor.State.IDLE)
+        heart.delivery.stop()
+        actions.send_notification, voice.speak = saved
+
+
+def test_task_added_while_sleeping_fires_on_time():
+    with live_monitor() as (heart, fired):
+        time.sleep(0.1) # Let the monitor reconcile and go to sleep
+        due = datetime.datetime.now() + datetime.timedelta(seconds=0.5)
+        scheduler.add_task("Stretch", due)
+
+        deadline = time.time() + 3
+        while not fired and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert fired, "Reminder never fired"
+        name, fired_at = fired[0]
+        assert name == "Stretch"
+        assert abs(fired_at - due.timestamp()) < MAX_JITTER_SECONDS
+        assert scheduler.get_pending_tasks() == []
+
+
+def test_overdue_tasks_fire_on_startup():
+    with manual_monitor() as (heart, notified, spoken):
+        scheduler.add_task("Missed", datetime.datetime.now() - datetime.timedelta(minutes=5))
+        heart.reconcile()
+        heart.check_schedule()
+        heart.delivery.flush()
+        assert [message for _, message in notified] == ["Missed"]
+
+
+def test_slow_speech_does_not_block_notifications():
+    notified = []
+    saved = (actions.send_notification, voice.speak)
+    actions.send_notification = lambda title, message: notified.append(message)
+    voice.speak = lambda text, **kwargs: time.sleep(0.05) # Slow TTS
+    workers = DeliveryWorkers()
+    workers.start()
+    try:
+        start = time.perf_counter()
+        for i in range(10):
+            workers.submit(Channel.NOTIFICATION, f"Task {i}", title="Athena Reminder")
+            workers.submit(Channel.SPEECH, f"Reminder: Task {i}")
+        assert time.perf_counter() - start < 0.05, "submit blocked on delivery"
+
+        deadline = time.time() + 1
+        while len(notified) < 10 and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(notified) == 10, "Notifications were held up behind speech"
+
+        stats = workers.stats()
+        assert stats["notification"]["delivered"] == 10
+        assert stats["speech"]["queued"] > 0
+    finally:
+        workers.stop()
+        actions.send_notification, voice.speak = saved
+
+
+def test_stop_does_not_hang_on_a_full_queue():
+    release = threading.Event()
+    saved = actions.send_notification
+    actions.send_notification = lambda title, message: release.wait(5) # Stuck OS notifier
+    workers = DeliveryWorkers(maxsize=1)
+    workers.start()
+    try:
+        assert workers.submit(Channel.NOTIFICATION, "Task 0")
+        time.sleep(0.05) # Worker is now stuck on Task 0
+        assert workers.submit(Channel.NOTIFICATION, "Task 1")
+        assert not workers.submit(Channel.NOTIFICATION, "Task 2") # Full
+
+        start = time.perf_counter()
+        workers.stop(timeout=0.2)
+        assert time.perf_counter() - start < 1, "stop() blocked on a full queue"
+    finally:
+        release.set()
+        actions.send_notification = saved
+
+
+def test_deferred_delivery_is_retried_without_waiting_for_reconcile():
+    saved = monitor.DELIVERY_RETRY_SECONDS
+    monitor.DELIVERY_RETRY_SECONDS = 0.2
+
+    try:
+        with live_monitor() as (heart, fired):
+            rejected = []
+            submit = heart.delivery.submit
+
+            def full_once(channel, message, **kwargs):
+                if not rejected:
+                    rejected.append(message)
+                    return False
+                return submit(channel, message, **kwargs)
+
+            heart.delivery.submit = full_once
+            time.sleep(0.1)
+            scheduler.add_task("Stretch", datetime.datetime.now() + datetime.timedelta(seconds=0.2))
+
+            deadline = time.time() + 2
+            while not fired and time.time() < deadline:
+                time.sleep(0.01)
+            assert rejected == ["Stretch"]
+            assert [name for name, _ in fired] == ["Stretch"], "Deferred reminder was not retried"
+            assert scheduler.get_pending_tasks() == []
+    finally:
+        monitor.DELIVERY_RETRY_SECONDS = saved
+
+
+def test_pile_up_and_dnd_reminders_become_one_digest():
+    with manual_monitor() as (heart, notified, spoken):
+        # During DND nothing is delivered and nothing is marked complete
+        monitor.set_state(monitor.State.DO_NOT_DISTURB)
+        past = datetime.datetime.now() - datetime.timedelta(minutes=1)
+        for i in range(8):
+            scheduler.add_task(f"Task {i}", past)
+        heart.reconcile()
+        heart.check_schedule()
+        heart.reconcile() # Held tasks must not be re-queued
+        heart.check_schedule()
+        heart.delivery.flush()
+        assert notified == [] and spoken == []
+        assert len(scheduler.get_pending_tasks()) == 8
+
+        # DND ends: one notification + one utterance for all eight
+        monitor.set_state(monitor.State.IDLE)
+        heart.check_schedule()
+        heart.delivery.flush()
+        assert len(notified) == 1 and len(spoken) == 1
+        title, message = notified[0]
+        assert title == "Athena: 8 reminders"
+        assert message.endswith("+3 more")
+        text, cache = spoken[0]
+        assert text.startswith("You have 8 reminders: Task 0")
+        assert not cache # A digest is a one-off
+        assert scheduler.get_pending_tasks() == []
+
+
+def test_only_recurring_reminders_are_cached_for_speech():
+    with manual_monitor() as (heart, notified, spoken):
+        past = datetime.datetime.now() - datetime.timedelta(minutes=1)
+        for name, recurrence in (("Call the plumber", None), ("Stretch", "daily")):
+            scheduler.add_task(name, past, recurrence)
+            heart.reconcile()
+            heart.check_schedule()
+        heart.delivery.flush()
+        assert spoken == [("Reminder: Call the plumber", False), ("Reminder: Stretch", True)]
+
+
+def test_idle_reflection_runs_in_background_and_is_cancelled():
+    runs = []
+
+    def fake_reflect(cancel_event=None, progress=None, session=None):
+        runs.append("started")
+        for step in range(1, 51):
+            if cancel_event.wait(0.02):
+                runs.append("cancelled")
+                return "Reflection cancelled."
+            progress(step, 50, "map")
+        runs.append("finished")
+        return "Reflection complete."
+
+    saved = (learner.reflect, monitor.REFLECTION_IDLE_SECONDS)
+    learner.reflect = fake_reflect
+    monitor.REFLECTION_IDLE_SECONDS = 0.2
+
+    try:
+        with live_monitor() as (heart, fired):
+            heart.note_user_activity()
+            time.sleep(0.1)
+            assert runs == [] # Not idle long enough yet
+
+            deadline = time.time() + 2
+            while not runs and time.time() < deadline:
+                time.sleep(0.01)
+            assert runs == ["started"], "Reflection did not start when idle"
+            time.sleep(0.1)
+            assert 0 < heart.reflection.progress < 1
+
+            start = time.perf_counter()
+            heart.note_user_activity() # A new turn cancels it
+            heart.reflection.join(1)
+            assert time.perf_counter() - start < 0.2
+            assert runs == ["started", "cancelled"]
+
+            # Next idle period: runs again, to completion, and only once
+            deadline = time.time() + 3
+            while runs[-1] != "finished" and time.time() < deadline:
+                time.sleep(0.02)
+            assert runs == ["started", "cancelled", "started", "finished"]
+            assert not heart.maybe_reflect()
+    finally:
+        learner.reflect, monitor.REFLECTION_IDLE_SECONDS = saved
+
+
+def test_idle_deadline_does_not_spin_outside_idle():
+    runs = []
+
+    def fake_reflect(cancel_event=None, progress=None, session=None):
+        runs.append("started")
+        return "Reflection complete."
+
+    saved = (learner.reflect, monitor.REFLECTION_IDLE_SECONDS)
+    learner.reflect = fake_reflect
+    monitor.REFLECTION_IDLE_SECONDS = 0.1
+
+    monitor.set_state(monitor.State.DEEP_WORK)
+    try:
+        with live_monitor() as (heart, fired):
+            iterations = []
+            check_schedule = heart.check_schedule
+            heart.check_schedule = lambda: (iterations.append(1), check_schedule())
+            heart.note_user_activity()
+            time.sleep(0.5) # Well past the idle threshold, in DEEP_WORK
+            assert runs == []
+            assert len(iterations) <= 3, f"Monitor loop spun {len(iterations)} times"
+
+            monitor.set_state(monitor.State.IDLE) # Re-arms the idle deadline
+            deadline = time.time() + 2
+            while not runs and time.time() < deadline:
+                time.sleep(0.01)
+            assert runs == ["started"]
+    finally:
+        monitor.set_state(monitor.State.IDLE)
+        learner.reflect, monitor.REFLECTION_IDLE_SECONDS = saved
+
+
+class JumpingClock:
+    """Stands in for the `time` module; `offset` moves the wall clock (e.g. a suspend) but not the monotonic one."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def time(self):
+        return time.time() + self.offset
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def test_task_due_during_suspend_fires_after_resume():
+    clock = JumpingClock()
+    saved = (monitor.time, monitor.MONITOR_MAX_SLEEP_SECONDS)
+    monitor.time = clock
+    monitor.MONITOR_MAX_SLEEP_SECONDS = 0.2
+
+    try:
+        with live_monitor() as (heart, fired):
+            time.sleep(0.1)
+            # Beyond the reconcile horizon: only SQLite knows about it
+            scheduler.add_task("Standup", datetime.datetime.now() + datetime.timedelta(hours=1))
+            time.sleep(0.3)
+            assert fired == []
+
+            clock.offset = 3600 + 1 # The machine slept through the due time
+            deadline = time.time() + 2
+            while not fired and time.time() < deadline:
+                time.sleep(0.01)
+            assert [name for name, _ in fired] == ["Standup"], "Reminder missed after resume"
+    finally:
+        monitor.time, monitor.MONITOR_MAX_SLEEP_SECONDS = saved
+
+
+if __name__ == "__main__":
+    run_isolated(
+        test_task_added_while_sleeping_fires_on_time,
+        test_overdue_tasks_fire_on_startup,
+        test_slow_speech_does_not_block_notifications,
+        test_stop_does_not_hang_on_a_full_queue,
+        test_deferred_delivery_is_retried_without_waiting_for_reconcile,
+        test_pile_up_and_dnd_reminders_become_one_digest,
+        test_only_recurring_reminders_are_cached_for_speech,
+        test_idle_reflection_runs_in_background_and_is_cancelled,
+        test_idle_deadline_does_not_spin_outside_idle,
+        test_task_due_during_suspend_fires_after_resume,
+    )
+    print("Monitor tests passed.")
@@ -0,0 +1,91 @@
+"""
+Multi-command utterances: one NLU call returns every command, the router saves all
+reminders in a single transaction and answers with one combined reply.
+Runs a real turn against the fake LM Studio server.
+"""
+import datetime
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import monitor, tracing
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace
+
+UTTERANCE = "Remind me to call John in 20 minutes, email Sara in 1 hour and turn on deep work"
+NLU = {"intents": [
+    {"intent": "schedule_add", "task_name": "Call John", "relative_time": "20 minutes", "text": "Remind me to call John in 20 minutes"},
+    {"intent": "schedule_add", "task_name": "Email Sara", "relative_time": "1 hour", "text": "email Sara in 1 hour"},
+    {"intent": "state_change", "new_state": "DEEP_WORK", "text": "turn on deep work"},
+]}
+
+
+def test_compound_utterance_is_one_call_and_one_transaction():
+    import main
+    from modules import scheduler
+    calls = []
+
+    def responder(path, body):
+        calls.append(body)
+        return f"<think>three commands</think>```json\n{json.dumps(NLU)}\n```"
+
+    tracing.reset()
+    try:
+        with FakeLLMServer(responder=responder) as server, athena_workspace(server.url):
+            response, understood = main.handle_turn(UTTERANCE, "turn-multi")
+            tasks = scheduler.get_pending_tasks()
+    finally:
+        monitor.set_state(monitor.State.IDLE)
+
+    assert understood and len(calls) == 1
+    assert response.startswith("Saved. I will remind you to 'Call John' at ")
+    assert "and 'Email Sara' at " in response and response.endswith("State changed to DEEP_WORK.")
+    assert [task["task"] for task in tasks] == ["Call John", "Email Sara"]
+    stages, _ = tracing.snapshot()
+    assert stages["db.add_tasks"]["count"] == 1 and "db.add_task" not in stages
+
+
+def test_batch_reports_failures_per_command():
+    from core import router
+    from modules import scheduler
+    added = []
+    listener = lambda task_id, name, when: added.append(name)
+    with FakeLLMServer() as server, athena_workspace(server.url):
+        scheduler.add_task_listener(listener)
+        try:
+            response = router.route_intent({"intent": "batch", "intents": [
+                {"intent": "schedule_add", "task_name": "Stretch", "relative_time": "10 minutes", "recurrence": "every blue moon"},
+                {"intent": "schedule_add", "task_name": "Tea", "relative_time": "whenever"},
+                {"intent": "schedule_add", "task_name": "Walk", "relative_time": "30 minutes"},
+            ]})
+        finally:
+            scheduler.remove_task_listener(listener)
+    assert response.startswith("Could not understand how often to repeat 'Stretch': every blue moon "
+                               "Could not understand the time: whenever Saved. I will remind you to 'Walk' at ")
+    assert added == ["Walk"]
+
+    ended = router.route_intent({"intent": "schedule_add", "task_name": "Stretch", "relative_time": "10 minutes",
+                                 "recurrence": "FREQ=DAILY;UNTIL=20200101T000000"})
+    assert ended == "'Stretch' would never repeat: FREQ=DAILY;UNTIL=20200101T000000 has no future occurrences."
+
+
+def test_few_shot_times_parse_to_the_next_day():
+    # The model copies the examples' time format: each one must mean "soon", not months away
+    from core.prompts import SCHEDULER_PROMPT
+    from modules import sanitizer
+    now = datetime.datetime(2026, 10, 19, 10, 0)
+    times = re.findall(r'"relative_time": "([^"]+)"', SCHEDULER_PROMPT)
+    assert "3pm" in times and "4pm" in times
+    for relative_time in times:
+        parsed = sanitizer.parse_relative_time(relative_time, now=now)
+        assert parsed is not None and now <= parsed <= now + datetime.timedelta(hours=24), relative_time
+
+
+if __name__ == "__main__":
+    test_few_shot_times_parse_to_the_next_day()
+    test_compound_utterance_is_one_call_and_one_transaction()
+    test_batch_reports_failures_per_command()
+    print("Multi-intent OK")
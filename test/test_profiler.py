@@ -0,0 +1,45 @@
+"""
+Profiler: --profile saves per-turn artifacts and the summary ranks hot functions
+across the session, including Athena's own engine/router code.
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import profiler
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import CORPUS, make_responder, athena_workspace
+
+
+def test_profiled_turns_and_summary():
+    import main
+    with tempfile.TemporaryDirectory() as out:
+        with FakeLLMServer(responder=make_responder(CORPUS)) as server, athena_workspace(server.url):
+            for i, (utterance, _) in enumerate(CORPUS[:3]):
+                with profiler.profile_turn(f"turn/{i}", directory=out) as turn:
+                    main.handle_turn(utterance, f"turn/{i}")
+                assert turn.wall_seconds > 0
+
+        assert sorted(os.listdir(out)) == [f"turn_{i}.{ext}" for i in range(3) for ext in ("json", "pstats")]
+        with open(os.path.join(out, "turn_0.json")) as f:
+            report = json.load(f)
+        assert report["turn_id"] == "turn/0"
+        assert [span["name"] for span in report["spans"]][:2] == ["nlu", "llm.nlu"]
+        assert report["memory"]["peak_bytes"] > 0
+        assert report["memory"]["top_allocations"]
+
+        turns, rows = profiler.hottest_functions(out, top=50, sort="cumtime", project_only=True)
+        assert turns == 3
+        functions = {function for _, function, _, _, _ in rows}
+        assert {"handle_turn", "process_input", "route_intent"} <= functions
+
+        summary = profiler.format_summary(out, top=5)
+        assert "across 3 turn(s)" in summary
+
+
+if __name__ == "__main__":
+    test_profiled_turns_and_summary()
+    print("Profiler OK")
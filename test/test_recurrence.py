@@ -0,0 +1,73 @@
+"""
+Recurring tasks: stored once, expanded lazily one occurrence at a time.
+"""
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import database, scheduler, recurrence
+from temp_data import run_isolated
+
+
+def test_rule_normalization():
+    assert recurrence.normalize_rule("Daily") == "FREQ=DAILY"
+    assert recurrence.normalize_rule("every Monday") == "FREQ=WEEKLY;BYDAY=MO"
+    assert recurrence.normalize_rule("RRULE:FREQ=WEEKLY;BYDAY=MO,WE") == "FREQ=WEEKLY;BYDAY=MO,WE"
+    for bad in ("sometimes", "FREQ=DAILY;COUNT=3"):
+        try:
+            recurrence.normalize_rule(bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+
+    # COUNT becomes the equivalent UNTIL, computed from the series start
+    start = datetime.datetime(2030, 1, 6, 9, 0) # A Sunday
+    assert recurrence.count_to_until("RRULE:FREQ=WEEKLY;BYDAY=MO,WE;COUNT=3", start) == "FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20300114T090000"
+    assert recurrence.count_to_until("FREQ=DAILY", start) == "FREQ=DAILY"
+    try:
+        recurrence.count_to_until("FREQ=DAILY;COUNT=2;UNTIL=20300110T000000", start)
+        assert False, "COUNT with UNTIL should be rejected"
+    except ValueError:
+        pass
+
+
+def test_daily_task_is_one_row_and_advances():
+    scheduler.init_db()
+    now = datetime.datetime.now().replace(microsecond=0)
+    assert scheduler.add_task("Stand-up", now - datetime.timedelta(days=3), recurrence="daily")
+    conn = database.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0] == 1
+
+    # First occurrence is the anchor (in the past) -> due now
+    due = scheduler.get_due_tasks()
+    assert [t['task'] for t in due] == ["Stand-up"]
+
+    # Completing it skips the missed days and moves to the next future occurrence
+    scheduler.mark_tasks_complete([due[0]['id']])
+    task = scheduler.get_pending_tasks()[0]
+    assert now < task['time'] <= now + datetime.timedelta(days=1)
+    assert conn.execute("SELECT COUNT(*) FROM schedule").fetchone()[0] == 1
+
+
+def test_today_summary_expands_only_today():
+    scheduler.init_db()
+    start_of_day = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    scheduler.add_task("Drink water", start_of_day - datetime.timedelta(days=365), recurrence="hourly")
+    end_of_day = start_of_day + datetime.timedelta(days=1) - datetime.timedelta(seconds=1)
+    # The stored anchor is a year old, but only today's 24 hourly occurrences are generated
+    tasks, total = scheduler.get_schedule_window(start_of_day, end_of_day)
+    assert total == len(tasks) == 24
+    assert all(task['task'] == "Drink water" for task in tasks)
+
+    # The LLM data block is paginated
+    summary = scheduler.get_today_summary()
+    lines = [line for line in summary.splitlines() if line.startswith("- ")]
+    assert len(lines) == scheduler.SCHEDULE_PAGE_SIZE
+    assert f"+{24 - scheduler.SCHEDULE_PAGE_SIZE} more" in summary
+
+
+if __name__ == "__main__":
+    run_isolated(test_rule_normalization, test_daily_task_is_one_row_and_advances, test_today_summary_expands_only_today)
+    print("Recurrence tests passed.")
@@ -0,0 +1,186 @@
+"""
+Reflection: only interactions logged since the checkpoint are analyzed, large
+backlogs are map-reduced in chunks, and a failed update leaves the checkpoint alone.
+Profile updates are validated patches, written atomically with a version history.
+Runs against the fake LM Studio server in a temporary workspace.
+"""
+import contextlib
+import gzip
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import learner
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace
+
+
+def write_turns(path, start, count):
+    with open(path, "at", encoding="utf-8") as f:
+        for i in range(start, start + count):
+            f.write(json.dumps({"timestamp": f"2024-05-01T10:00:{i:02d}.000", "turn_id": str(i), "role": "user", "text": f"message {i}"}) + "\n")
+            f.write(json.dumps({"timestamp": f"2024-05-01T10:00:{i:02d}.500", "turn_id": str(i), "role": "athena", "text": f"reply {i}"}) + "\n")
+
+
+PATCH = '{"added": {"learned_preferences.tea": "green"}, "changed": {}, "removed": []}'
+
+
+@contextlib.contextmanager
+def reflection_workspace(profile_reply=PATCH):
+    """Yields (interaction_log_path, prompts) in a temp workspace whose fake model answers with `profile_reply`."""
+    prompts = []
+
+    def responder(path, body):
+        prompt = body["messages"][-1]["content"]
+        prompts.append(prompt)
+        if "Bullets ONLY" in prompt:
+            return "- likes green tea"
+        return profile_reply
+
+    saved = (learner.INTERACTION_LOG, learner.REFLECTION_CHUNK_CHARS)
+    with FakeLLMServer(responder=responder) as server, athena_workspace(server.url) as workdir:
+        learner.INTERACTION_LOG = os.path.join(workdir, "data", "logs", "interaction.jsonl")
+        try:
+            yield learner.INTERACTION_LOG, prompts
+        finally:
+            learner.INTERACTION_LOG, learner.REFLECTION_CHUNK_CHARS = saved
+
+
+def test_only_new_interactions_are_reflected_across_rotation():
+    with reflection_workspace() as (log_path, prompts):
+        write_turns(log_path, 0, 3)
+        assert learner.reflect() == "Reflection complete."
+        assert "message 0" in prompts[-1] and "message 2" in prompts[-1]
+        assert learner.load_profile()["learned_preferences"] == {"tea": "green"}
+
+        assert learner.reflect() == "No new interactions."
+        assert len(prompts) == 1
+
+        # Two more turns, then the log rotates (.1.gz) and a third lands in a fresh file
+        write_turns(log_path, 3, 2)
+        with open(log_path, "rb") as src, gzip.open(log_path + ".1.gz", "wb") as dst:
+            dst.write(src.read())
+        os.remove(log_path)
+        write_turns(log_path, 5, 1)
+
+        assert learner.reflect() == "Reflection complete."
+        assert "message 2" not in prompts[-1]
+        assert all(f"message {i}" in prompts[-1] for i in (3, 4, 5))
+
+
+def test_lost_checkpoint_segment_skips_older_segments():
+    with reflection_workspace() as (log_path, prompts):
+        write_turns(log_path, 0, 2)
+        os.rename(log_path, log_path + ".2.gz.tmp")
+        write_turns(log_path, 2, 2)
+        assert learner.reflect() == "Reflection complete."
+        assert learner.load_checkpoint()["timestamp"] == "2024-05-01T10:00:03.500"
+
+        # The segment the checkpoint points into is gone (e.g. cleaned up); an older one is still there
+        with open(log_path + ".2.gz.tmp", "rb") as src, gzip.open(log_path + ".2.gz", "wb") as dst:
+            dst.write(src.read())
+        os.remove(log_path + ".2.gz.tmp")
+        os.remove(log_path)
+        write_turns(log_path, 3, 2) # Turn 3 overlaps the checkpoint, turn 4 is new
+
+        records, checkpoint = learner.read_new_interactions(learner.load_checkpoint(), log_path)
+        assert [record["text"] for record in records] == ["message 4", "reply 4"]
+        assert checkpoint["timestamp"] == "2024-05-01T10:00:04.500"
+
+
+def test_large_backlog_is_map_reduced():
+    with reflection_workspace() as (log_path, prompts):
+        learner.REFLECTION_CHUNK_CHARS = 400
+        write_turns(log_path, 0, 20)
+        assert learner.reflect() == "Reflection complete."
+        maps = [p for p in prompts if "Bullets ONLY" in p]
+        assert len(maps) > 1 and len(prompts) == len(maps) + 1
+        assert "likes green tea" in prompts[-1] and "message 0" not in prompts[-1]
+
+
+def test_failed_update_keeps_checkpoint():
+    with reflection_workspace(profile_reply="I could not do that.") as (log_path, prompts):
+        write_turns(log_path, 0, 2)
+        assert learner.reflect() == "Reflection failed (No JSON)."
+        assert learner.load_checkpoint() == {"head": None, "offset": 0}
+        records, _ = learner.read_new_interactions(learner.load_checkpoint(), log_path)
+        assert len(records) == 4
+
+
+def test_patches_are_validated_and_versioned():
+    with reflection_workspace(profile_reply='{"removed": ["user_name"]}') as (log_path, prompts):
+        profile = learner.load_profile()
+        updated, changed = learner.apply_patch(profile, {
+            "added": {"learned_preferences.time_format": "12-hour"},
+            "changed": {"user_name": "Sam"},
+            "removed": ["learned_preferences.missing"],
+        })
+        assert changed == ["learned_preferences.time_format", "user_name"]
+        assert updated == {"user_name": "Sam", "learned_preferences": {"time_format": "12-hour"}}
+        assert profile["user_name"] == "Bench" # Input untouched
+
+        for bad in (
+            {"profile": {}},                                  # Not a patch
+            {"removed": ["learned_preferences"]},             # Required section
+            {"changed": {"learned_preferences": "none"}},     # Section replaced by a scalar
+            {"added": {"user_name.first": "Sam"}},            # Through a non-object
+            {"added": {f"learned_preferences.k{i}": i for i in range(100)}}, # Runaway output
+        ):
+            try:
+                learner.apply_patch(profile, bad)
+                raise AssertionError(f"accepted {bad}")
+            except ValueError:
+                pass
+
+        for name in ("A", "B", "C", "D", "E", "F", "G"):
+            learner.save_profile({**profile, "user_name": name})
+        assert learner.load_profile()["user_name"] == "G"
+        history = sorted(os.listdir(learner.PROFILE_HISTORY_DIR))
+        assert len(history) == learner.PROFILE_HISTORY_SIZE
+        with open(os.path.join(learner.PROFILE_HISTORY_DIR, history[-1])) as f:
+            assert json.load(f)["user_name"] == "F"
+        assert not os.path.exists(learner.PROFILE_PATH + ".tmp")
+
+        # A rejected patch changes nothing, and its records are not retried forever
+        write_turns(log_path, 0, 1)
+        assert learner.reflect() == "Reflection patch rejected."
+        assert learner.load_profile()["user_name"] == "G"
+        assert learner.load_checkpoint()["head"] is not None
+        assert learner.reflect() == "No new interactions."
+
+
+def test_cancel_aborts_an_llm_call_in_flight():
+    with FakeLLMServer(responder=lambda path, body: PATCH, latency=10) as server, athena_workspace(server.url) as workdir:
+        saved = learner.INTERACTION_LOG
+        learner.INTERACTION_LOG = os.path.join(workdir, "data", "logs", "interaction.jsonl")
+        try:
+            write_turns(learner.INTERACTION_LOG, 0, 2)
+            job = learner.ReflectionJob()
+            job.start()
+            deadline = time.time() + 2
+            while server.request_count == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            assert server.request_count == 1
+
+            start = time.perf_counter()
+            job.cancel()
+            job.join(1)
+            assert not job.is_alive(), "Cancel waited for the model"
+            assert time.perf_counter() - start < 0.5
+            assert job.result == "Reflection cancelled."
+            assert learner.load_checkpoint() == {"head": None, "offset": 0}
+        finally:
+            learner.INTERACTION_LOG = saved
+
+
+if __name__ == "__main__":
+    test_only_new_interactions_are_reflected_across_rotation()
+    test_lost_checkpoint_segment_skips_older_segments()
+    test_large_backlog_is_map_reduced()
+    test_failed_update_keeps_checkpoint()
+    test_patches_are_validated_and_versioned()
+    test_cancel_aborts_an_llm_call_in_flight()
+    print("Reflection OK")
@@ -0,0 +1,79 @@
+"""
+Knowledge retrieval: re-ingestion only adds new paragraphs, candidates are over-fetched,
+near-duplicates (overlapping notes) are dropped, the rest is diversified with MMR and capped by a
+token budget. Uses a bag-of-words embedding so similar texts get similar vectors.
+"""
+import contextlib
+import hashlib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import librarian
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace
+
+NOTES = """The Librarian stores notes in SQLite and vectors in FAISS.
+
+The Librarian stores notes in SQLite and its vectors in FAISS.
+
+FAISS vectors are searched with a flat L2 index, rebuilt on ingestion.
+
+The Heart is a background monitor that fires reminders."""
+
+
+def bow_embedding(text, timeout=None):
+    import numpy as np
+    vec = np.zeros(librarian.VECTOR_DIMENSION, dtype="float32")
+    for word in text.lower().replace(".", " ").replace(",", " ").split():
+        vec[int(hashlib.sha1(word.encode()).hexdigest()[:6], 16) % len(vec)] += 1.0
+    return (vec / max(np.linalg.norm(vec), 1e-6)).tolist()
+
+
+@contextlib.contextmanager
+def notes_workspace():
+    """Temp workspace with NOTES ingested and a bag-of-words embedding."""
+    saved = librarian.get_embedding
+    with FakeLLMServer() as server, athena_workspace(server.url) as workdir:
+        librarian.get_embedding = bow_embedding
+        try:
+            path = os.path.join(workdir, "data", "notes", "notes.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(NOTES)
+            assert librarian.ingest_file(path) == (True, "Ingested 4 chunks from notes.txt.")
+            # Re-ingesting an unchanged file stores (and embeds) nothing
+            assert librarian.ingest_file(path) == (True, "notes.txt is up to date.")
+            assert librarian.load_faiss_index().ntotal == 4
+            yield
+        finally:
+            librarian.get_embedding = saved
+
+
+def test_duplicates_dropped_and_results_diversified():
+    with notes_workspace():
+        results = librarian.search_knowledge("Where are the vectors stored, SQLite or FAISS?")
+        texts = [r["content"] for r in results]
+        assert len(texts) == len(set(texts))
+        # The two near-identical "stores notes" paragraphs collapse into one
+        assert sum("stores" in text for text in texts) == 1
+        assert any(text.startswith("FAISS vectors are searched") for text in texts)
+        assert results[0]["score"] >= results[-1]["score"]
+        assert all(isinstance(r["id"], int) for r in results)
+
+
+def test_context_is_capped_by_token_budget():
+    with notes_workspace():
+        # ~15 tokens: room for the best chunk only
+        assert len(librarian.query_knowledge("Where are vectors stored?", token_budget=15)) == 1
+        # Budget smaller than the best chunk: it is cut rather than dropped
+        assert librarian.query_knowledge("Where are vectors stored?", token_budget=3) == [
+            librarian.query_knowledge("Where are vectors stored?")[0][:3 * librarian.CHARS_PER_TOKEN]
+        ]
+        assert len(librarian.query_knowledge("reminders", n_results=2)) == 2
+
+
+if __name__ == "__main__":
+    test_duplicates_dropped_and_results_diversified()
+    test_context_is_capped_by_token_budget()
+    print("Retrieval OK")
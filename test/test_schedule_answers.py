@@ -0,0 +1,71 @@
+"""
+Schedule answers: common questions are rendered from the database without an LLM pass.
+"""
+import datetime
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import athena_workspace, make_responder, CORPUS
+
+from core import router, schedule_answers
+from modules import scheduler
+
+
+def test_classification():
+    cases = {
+        "Do I have any tasks?": ("list", "upcoming"),
+        "What's next?": ("next", "upcoming"),
+        "When is my next meeting?": ("next", "upcoming"),
+        "How many reminders do I have today?": ("count", "today"),
+        "What is on my schedule tomorrow?": ("list", "tomorrow"),
+        "Anything planned this week?": ("list", "week"),
+        "What were my tasks yesterday?": ("list", "yesterday"),
+        "How many meetings did I have last week?": ("count", "past_week"),
+        "What were my tasks?": ("list", "past_week"),
+        "Am I free for lunch with Sara or should I move the gym?": (None, None),
+    }
+    for question, expected in cases.items():
+        assert schedule_answers.classify_question(question) == expected, question
+
+
+def test_common_questions_skip_the_llm():
+    with FakeLLMServer(responder=make_responder(CORPUS)) as server, athena_workspace(server.url):
+        now = datetime.datetime.now()
+        scheduler.add_task("Call John", now + datetime.timedelta(minutes=20))
+        scheduler.add_task("Gym", now + datetime.timedelta(days=1, hours=1))
+
+        reply = router.route_intent({"intent": "query_schedule", "original_input": "What's next?"})
+        assert reply.startswith("Your next task is Call John")
+
+        reply = router.route_intent({"intent": "query_schedule", "original_input": "Do I have any tasks?"})
+        assert reply.startswith("You have 2 tasks coming up: Call John at")
+        assert "Gym" in reply
+        assert server.request_count == 0
+
+        # "Next" looks past the lookahead window
+        far = now + datetime.timedelta(days=60)
+        scheduler.add_task("Renew passport", far)
+        scheduler.mark_tasks_complete([task['id'] for task in scheduler.get_pending_tasks() if task['task'] != "Renew passport"])
+        reply = router.route_intent({"intent": "query_schedule", "original_input": "What's next?"})
+        assert reply == f"Your next task is Renew passport on {far.strftime('%A %d %b')} at {far.strftime('%H:%M')}."
+
+        # Past-tense questions look back
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        scheduler.add_task("Dentist", start_of_day - datetime.timedelta(hours=14)) # Yesterday 10:00
+        reply = router.route_intent({"intent": "query_schedule", "original_input": "What were my tasks yesterday?"})
+        assert reply == "You had 1 task yesterday: Dentist yesterday at 10:00."
+        assert server.request_count == 0
+
+        # Open-ended phrasing still goes through the LLM summary
+        router.route_intent({"intent": "query_schedule", "original_input": "Can I squeeze in a nap before my call?"})
+        assert server.request_count == 1
+
+
+if __name__ == "__main__":
+    test_classification()
+    test_common_questions_skip_the_llm()
+    print("Schedule answer tests passed.")
@@ -0,0 +1,76 @@
+"""
+Schedule storage: epoch-second times, the pending-time index, and migration of
+pre-epoch databases (times stored as adapted datetime strings).
+"""
+import datetime
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import database, scheduler
+from temp_data import run_isolated
+
+HISTORY_ROWS = 1_000_000
+DUE_CHECK_BUDGET_SECONDS = 0.001
+
+
+def test_due_check_uses_index_with_large_history():
+    scheduler.init_db()
+    conn = database.get_connection()
+    now = int(time.time())
+    with conn:
+        conn.executemany(
+            "INSERT INTO schedule (task, time, status) VALUES (?, ?, 'completed')",
+            ((f"Old task {i}", now - 60 - i) for i in range(HISTORY_ROWS))
+        )
+    scheduler.add_task("Due now", datetime.datetime.now() - datetime.timedelta(seconds=5))
+    scheduler.add_task("Later", datetime.datetime.now() + datetime.timedelta(hours=1))
+
+    plan = " ".join(row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM schedule WHERE status = 'pending' AND time <= ?", (now,)))
+    assert "idx_schedule_pending_time" in plan
+
+    scheduler.get_due_tasks() # Warm the page cache
+    runs = []
+    for _ in range(20):
+        start = time.perf_counter()
+        tasks = scheduler.get_due_tasks()
+        runs.append(time.perf_counter() - start)
+    assert [t['task'] for t in tasks] == ["Due now"]
+    assert min(runs) < DUE_CHECK_BUDGET_SECONDS, f"due check took {min(runs) * 1000:.2f} ms"
+
+
+def test_legacy_string_times_are_migrated():
+    os.makedirs(os.path.dirname(database.DB_PATH), exist_ok=True)
+    legacy = sqlite3.connect(database.DB_PATH)
+    legacy.execute('''
+        CREATE TABLE schedule (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            time TIMESTAMP NOT NULL,
+            status TEXT DEFAULT 'pending'
+        )
+    ''')
+    legacy.execute("INSERT INTO schedule (task, time, status) VALUES ('Call John', '2026-03-01 09:30:00.250000', 'pending')")
+    legacy.execute("INSERT INTO schedule (task, time, status) VALUES ('Gym', '2026-03-01 18:00:00', 'completed')")
+    legacy.commit()
+    legacy.close()
+
+    scheduler.init_db()
+    conn = database.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == database.SCHEMA_VERSION
+    rows = conn.execute("SELECT task, time, typeof(time) AS kind FROM schedule ORDER BY id").fetchall()
+    assert [r['kind'] for r in rows] == ["integer", "integer"]
+    assert scheduler.from_epoch(rows[0]['time']) == datetime.datetime(2026, 3, 1, 9, 30)
+    assert scheduler.from_epoch(rows[1]['time']) == datetime.datetime(2026, 3, 1, 18, 0)
+
+    due = scheduler.get_due_tasks(datetime.datetime(2026, 3, 1, 12, 0))
+    assert [t['task'] for t in due] == ["Call John"]
+
+
+if __name__ == "__main__":
+    run_isolated(test_due_check_uses_index_with_large_history, test_legacy_string_times_are_migrated)
+    print("Schedule storage tests passed.")
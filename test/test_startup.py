@@ -0,0 +1,26 @@
+"""
+Startup budget: importing main.py must stay within STARTUP_IMPORT_BUDGET_SECONDS
+and must not load the heavy, first-use-only dependencies.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import startup
+from config import STARTUP_IMPORT_BUDGET_SECONDS
+
+
+def test_import_main_within_budget():
+    rows, loaded = startup.profile_imports("main")
+    print("\n" + startup.format_import_report(rows, loaded))
+
+    seconds = startup.entry_import_seconds(rows, "main")
+    assert seconds is not None, "main.py failed to import"
+    assert loaded == [], f"Deferred modules imported at startup: {loaded}"
+    assert seconds <= STARTUP_IMPORT_BUDGET_SECONDS, f"import main took {seconds:.3f}s"
+
+
+if __name__ == "__main__":
+    test_import_main_within_budget()
+    print("Startup budget OK.")
@@ -0,0 +1,82 @@
+"""
+Relative-time parser: parity of the compiled fast path with dateparser, plus a micro-benchmark.
+
+Usage:
+    python test/test_time_parser.py   # Prints per-call cost of both parsers
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import sanitizer
+
+# Expressions the NLU emits; each must be handled by the fast path and agree with dateparser
+PARITY_CORPUS = [
+    "20 minutes", "in 20 minutes", "5 seconds", "30 secs", "2 hours", "2 hrs", "in 90 mins",
+    "an hour", "in a minute", "1 day", "3 days", "in 2 weeks", "in 1 hour 30 minutes",
+    "at 5 PM", "5pm", "5:30 pm", "at 8 am", "at 9am", "12 am", "12 pm", "at 17:30", "9:00",
+    "noon", "midnight",
+    "tomorrow", "tomorrow 9am", "tomorrow at 9am", "10 AM tomorrow",
+    "monday", "on monday", "tuesday", "friday at 3pm", "sunday 10:30", "monday at 9am",
+]
+
+# Several reference times so "today vs tomorrow" and weekday wrap-around are exercised
+BASES = [
+    datetime.datetime(2026, 10, 19, 10, 9, 29, 981393), # Monday morning
+    datetime.datetime(2026, 10, 23, 23, 45, 0),         # Friday night
+    datetime.datetime(2026, 10, 25, 0, 5, 0),           # Sunday just after midnight
+]
+
+
+def test_fast_path_matches_dateparser():
+    mismatches = []
+    for now in BASES:
+        for expr in PARITY_CORPUS:
+            fast = sanitizer.parse_fast(expr, now)
+            slow = sanitizer._parse_with_dateparser(expr, now)
+            assert fast is not None, f"fast path missed '{expr}'"
+            if fast != slow:
+                mismatches.append((now, expr, fast, slow))
+    assert not mismatches, "\n".join(f"{now} '{e}': fast={f} dateparser={s}" for now, e, f, s in mismatches)
+
+
+def test_unrecognized_forms_fall_back():
+    now = BASES[0]
+    assert sanitizer.parse_fast("next week", now) is None
+    assert sanitizer.parse_relative_time("next week", now) == sanitizer._parse_with_dateparser("next week", now)
+    assert sanitizer.parse_relative_time("whenever", now) is None
+
+
+def benchmark(repeat=200):
+    """Returns (fast_seconds_per_call, dateparser_seconds_per_call) over the corpus."""
+    now = BASES[0]
+    sanitizer._parse_with_dateparser("in 5 minutes", now) # Exclude import / warm-up
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for expr in PARITY_CORPUS:
+            sanitizer.parse_fast(expr, now)
+    fast = (time.perf_counter() - start) / (repeat * len(PARITY_CORPUS))
+
+    slow_repeat = max(1, repeat // 20)
+    start = time.perf_counter()
+    for _ in range(slow_repeat):
+        for expr in PARITY_CORPUS:
+            sanitizer._parse_with_dateparser(expr, now)
+    slow = (time.perf_counter() - start) / (slow_repeat * len(PARITY_CORPUS))
+    return fast, slow
+
+
+def test_fast_path_is_faster():
+    fast, slow = benchmark(repeat=50)
+    assert fast * 10 < slow, f"fast path {fast * 1e6:.1f}us vs dateparser {slow * 1e6:.1f}us"
+
+
+if __name__ == "__main__":
+    test_fast_path_matches_dateparser()
+    fast, slow = benchmark()
+    print(f"fast path:  {fast * 1e6:8.1f} us/call")
+    print(f"dateparser: {slow * 1e6:8.1f} us/call ({slow / fast:.0f}x slower)")
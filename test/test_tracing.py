@@ -0,0 +1,71 @@
+"""
+Tracing: a turn produces nested spans, per-stage percentiles, per-model token
+counts, a TRACE record in the decision log and a Prometheus text export.
+Runs a real turn against the fake LM Studio server.
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import tracing
+from core import logger as athena_logger
+from fake_llm import FakeLLMServer
+from test_e2e_benchmark import CORPUS, make_responder, athena_workspace
+
+
+def test_span_percentiles_and_nesting():
+    tracing.reset()
+    trace = tracing.start_trace("t-0")
+    for _ in range(10):
+        with tracing.span("outer"):
+            with tracing.span("inner"):
+                pass
+    assert tracing.end_trace() is trace
+    with tracing.span("untraced"): # No active trace: metrics only
+        pass
+
+    assert len(trace.spans) == 20
+    assert ("inner", 1) == (trace.spans[0][0], trace.spans[0][3]) # Depth 1 inside "outer"
+    stages, _ = tracing.snapshot()
+    assert stages["outer"]["count"] == 10 and stages["untraced"]["count"] == 1
+    assert stages["inner"]["p50"] <= stages["inner"]["p99"] <= stages["outer"]["sum"]
+
+
+def test_turn_trace_tokens_and_prometheus_export():
+    import main
+    tracing.reset()
+    with FakeLLMServer(responder=make_responder(CORPUS)) as server, athena_workspace(server.url):
+        response, understood = main.handle_turn("Remind me to call John in 20 minutes", "turn-trace-1")
+    assert understood and response.startswith("Saved.")
+
+    stages, tokens = tracing.snapshot()
+    for stage in ("nlu", "llm.nlu", "route", "time_parse", "db.add_task"):
+        assert stages[stage]["count"] == 1, stage
+    assert tokens[("fake/athena-bench", "prompt")] > 0
+    assert tokens[("fake/athena-bench", "completion")] > 0
+
+    athena_logger.flush_logs()
+    with open(athena_logger.DECISION_LOG, encoding="utf-8") as f:
+        traces = [json.loads(line) for line in f if '"TRACE"' in line]
+    last = traces[-1]
+    assert last["state"] == "turn-trace-1" and last["turn_id"] == "turn-trace-1"
+    assert "nlu=" in last["result"] and ">llm.nlu=" in last["result"] and ">db.add_task=" in last["result"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.prom")
+        tracing.export_prometheus(path)
+        with open(path) as f:
+            text = f.read()
+    assert '# TYPE athena_stage_seconds summary' in text
+    assert 'athena_stage_seconds{stage="nlu",quantile="0.95"}' in text
+    assert 'athena_stage_seconds_count{stage="db.add_task"} 1' in text
+    assert 'athena_llm_tokens_total{model="fake/athena-bench",kind="prompt"}' in text
+
+
+if __name__ == "__main__":
+    test_span_percentiles_and_nesting()
+    test_turn_trace_tokens_and_prometheus_export()
+    print("Tracing OK")
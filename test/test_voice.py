@@ -0,0 +1,159 @@
+"""
+Voice worker: speak() is non-blocking, reminders jump ahead of queued chat, and only
+recurring reminders, pre-rendered and repeated sentences go through the audio cache.
+Uses a fake engine and player instead of pyttsx3 so nothing is actually spoken.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import voice
+
+
+class FakeEngine:
+    def __init__(self, spoken, delay=0.05):
+        self.spoken = spoken
+        self.delay = delay
+        self._pending = []
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, text):
+        self._pending.append(text)
+
+    def save_to_file(self, text, path):
+        self._pending.append((text, path))
+
+    def runAndWait(self):
+        time.sleep(self.delay)
+        for item in self._pending:
+            if isinstance(item, tuple): # Rendered to a file instead of spoken
+                text, path = item
+                with open(path, "w") as f:
+                    f.write(text)
+            else:
+                self.spoken.append(item)
+        self._pending = []
+
+
+@contextlib.contextmanager
+def fake_engine(cache_bytes=1024 * 1024):
+    """Yields (spoken, inits, rendered) with a temp audio cache; playback appends the file's text to spoken."""
+    spoken, inits, rendered = [], [], []
+    saved = (voice._init_engine, voice._player, voice._play_file, voice._render,
+             voice.TTS_CACHE_DIR, voice.TTS_CACHE_MAX_BYTES)
+    real_render = voice._render
+
+    def fake_init():
+        inits.append(threading.current_thread().name)
+        return FakeEngine(spoken)
+
+    def fake_play(path):
+        with open(path) as f:
+            spoken.append(f.read())
+
+    def counting_render(engine, text, path):
+        rendered.append(text)
+        return real_render(engine, text, path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        voice._init_engine = fake_init
+        voice._player = "fake"
+        voice._play_file = fake_play
+        voice._render = counting_render
+        voice.TTS_CACHE_DIR = tmp
+        voice.TTS_CACHE_MAX_BYTES = cache_bytes
+        try:
+            yield spoken, inits, rendered
+        finally:
+            voice.shutdown()
+            (voice._init_engine, voice._player, voice._play_file, voice._render,
+             voice.TTS_CACHE_DIR, voice.TTS_CACHE_MAX_BYTES) = saved
+
+
+def test_speak_returns_immediately_and_reuses_one_engine():
+    with fake_engine() as (spoken, inits, rendered):
+        start = time.perf_counter()
+        first = voice.speak("Hello there.")
+        second = voice.speak("Second answer.")
+        assert time.perf_counter() - start < 0.02, "speak() blocked on synthesis"
+        assert not second.done()
+
+        assert second.wait(2) and first.done()
+        assert first.ok and second.ok
+        assert spoken == ["Hello there.", "Second answer."]
+        assert inits == ["athena-voice"] # One engine, owned by the worker thread
+
+
+def test_reminder_preempts_queued_chat():
+    with fake_engine() as (spoken, inits, rendered):
+        chat = voice.speak("One. Two. Three. Four. Five.")
+        time.sleep(0.02) # Worker is now speaking "One."
+        reminder = voice.speak("Reminder: Stretch", priority=voice.Priority.REMINDER)
+
+        assert chat.wait(2) and reminder.done()
+        assert spoken[:2] == ["One.", "Reminder: Stretch"]
+        assert spoken[2:] == ["Two.", "Three.", "Four.", "Five."]
+
+        stats = voice.stats()
+        assert stats["queued"] == 0
+        assert stats["spoken"] >= 6
+        assert stats["latency_max"] < 0.2
+
+
+def test_cache_renders_once_and_prerenders():
+    with fake_engine() as (spoken, inits, rendered):
+        warm = voice.prerender(["Got it. I've made a note of your preference."])
+        assert all(handle.wait(2) for handle in warm)
+        assert spoken == [] # Pre-rendering never plays anything
+
+        for _ in range(3):
+            voice.speak("Got it. I've made a note of your preference.").wait(2)
+            voice.speak("Reminder: Stretch", priority=voice.Priority.REMINDER, cache=True).wait(2)
+        assert spoken == ["Got it.", "I've made a note of your preference.", "Reminder: Stretch"] * 3
+        assert sorted(rendered) == ["Got it.", "I've made a note of your preference.", "Reminder: Stretch"]
+
+        # One-off chat is spoken live; a sentence is only rendered once it recurs
+        del spoken[:]
+        voice.speak("Your meeting is at 3 PM. Anything else?").wait(2)
+        assert spoken == ["Your meeting is at 3 PM.", "Anything else?"]
+        assert not os.path.exists(voice.cache_path("Your meeting is at 3 PM."))
+        voice.speak("Anything else?").wait(2)
+        assert rendered[-1] == "Anything else?" and len(rendered) == 4
+        assert spoken[-1] == "Anything else?"
+
+        # A one-off reminder is spoken live, not rendered and played back
+        del spoken[:]
+        voice.speak("Reminder: Call the plumber", priority=voice.Priority.REMINDER).wait(2)
+        assert spoken == ["Reminder: Call the plumber"]
+        assert len(rendered) == 4
+        assert not os.path.exists(voice.cache_path("Reminder: Call the plumber"))
+
+
+def test_cache_evicts_least_recently_played():
+    with fake_engine(cache_bytes=len("Reminder: A") * 2) as (spoken, inits, rendered):
+        voice.speak("Reminder: A", priority=voice.Priority.REMINDER, cache=True).wait(2)
+        time.sleep(0.01)
+        voice.speak("Reminder: B", priority=voice.Priority.REMINDER, cache=True).wait(2)
+        time.sleep(0.01)
+        voice.speak("Reminder: A", priority=voice.Priority.REMINDER, cache=True).wait(2) # A is now the most recently used
+        time.sleep(0.01)
+        voice.speak("Reminder: C", priority=voice.Priority.REMINDER, cache=True).wait(2) # Over the cap: B goes
+
+        assert os.path.exists(voice.cache_path("Reminder: A"))
+        assert not os.path.exists(voice.cache_path("Reminder: B"))
+        assert os.path.exists(voice.cache_path("Reminder: C"))
+
+
+if __name__ == "__main__":
+    test_speak_returns_immediately_and_reuses_one_engine()
+    test_reminder_preempts_queued_chat()
+    test_cache_renders_once_and_prerenders()
+    test_cache_evicts_least_recently_played()
+    print("Voice worker OK")